@@ -0,0 +1,67 @@
+# Benchmarks the cost of parsing one radio data block of every implemented subtype
+# Compares constructing the block enums and calling DataBlock.parse, as telemetry did per block, against the registry
+#
+# Run from the repository root with: python -m benchmarks.bench_block_parse
+
+# Imports
+import struct
+import timeit
+
+from modules.telemetry.block import BLOCK_HEADER_LENGTH, DataBlockSubtype, RadioBlockType
+from modules.telemetry.codec import decode
+from modules.telemetry.data_block import DataBlock
+
+# Constants
+REPEATS: int = 5
+MPU9250_SETTINGS: int = 9 | (1 << 8)  # 100Hz accelerometer/gyroscope, 8Hz magnetometer, all other fields zero
+GNSS_SATS_IN_VIEW: bytes = b"".join(struct.pack("<BBH", 45, 30, i | (180 << 5)) for i in range(12))
+KX134_SETTINGS: int = 7 | (1 << 4) | (1 << 7)  # 100Hz, +/-16g, 16 bit samples
+KX134_SAMPLES: bytes = b"".join(struct.pack("<hhh", 100 * i, -100 * i, 2048) for i in range(40))
+MPU9250_SAMPLE: bytes = struct.pack(">hhhhhhh", 120, -40, 16384, 321, 10, -10, 5) + struct.pack("<hhhB", 50, -50, 10, 8)
+
+# One representative block payload per subtype, as it appears after the block header
+PAYLOADS: dict[DataBlockSubtype, bytes] = {
+    DataBlockSubtype.DEBUG_MESSAGE: struct.pack("<I", 1000) + b"Deployment armed, waiting for ascent\x00\x00\x00\x00",
+    DataBlockSubtype.STATUS: struct.pack("<IIII", 1000, (2 << 16) | (2 << 19) | (2 << 22) | (2 << 25), 5000, 2),
+    DataBlockSubtype.STARTUP_MESSAGE: struct.pack("<I", 1000) + b"CU InSpace avionics v2\x00\x00",
+    DataBlockSubtype.ALTITUDE: struct.pack("<Iiii", 1000, 100810, 22000, 1234567),
+    DataBlockSubtype.ACCELERATION: struct.pack("<IBBhhh", 1000, 16, 0, 2048, -2048, 16384),
+    DataBlockSubtype.ANGULAR_VELOCITY: struct.pack("<IHhhh", 1000, 2000, 100, -100, 50),
+    DataBlockSubtype.GNSS: struct.pack(
+        "<IiiIihhHHHBB", 1000, 27012345, -45312345, 43200, 80000, 550, 9000, 150, 90, 120, 9, 3
+    ),
+    DataBlockSubtype.GNSS_META: struct.pack("<III", 1000, 0x0F0F, 0x00F0) + GNSS_SATS_IN_VIEW,
+    DataBlockSubtype.MPU9250_IMU: struct.pack("<II", 1000, MPU9250_SETTINGS) + MPU9250_SAMPLE * 10 + b"\x00\x00",
+    DataBlockSubtype.KX134_1211_ACCEL: struct.pack("<IH", 1000, KX134_SETTINGS) + KX134_SAMPLES,
+}
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'subtype':<18} {'bytes':>6} {'enum + parse':>14} {'registry':>10} {'speedup':>8}")
+    for subtype, payload in PAYLOADS.items():
+        # Blocks are parsed where they sit inside a received packet
+        packet = bytes(12 + BLOCK_HEADER_LENGTH) + payload
+        offset = 12 + BLOCK_HEADER_LENGTH
+        block_type = int(RadioBlockType.DATA)
+        block_subtype = int(subtype)
+        number = 2_000 if subtype in (DataBlockSubtype.MPU9250_IMU, DataBlockSubtype.KX134_1211_ACCEL) else 20_000
+
+        def before() -> DataBlock:
+            _ = RadioBlockType(block_type)
+            return DataBlock.parse(DataBlockSubtype(block_subtype), memoryview(packet)[offset:])
+
+        def after() -> DataBlock:
+            return decode(block_type, block_subtype, packet, offset, len(payload))
+
+        old = best_of(before, number)
+        new = best_of(after, number)
+        print(f"{subtype.name:<18} {len(payload):>6} {old:>11.2f} us {new:>7.2f} us {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Benchmarks serializing KX134 and MPU9250 data blocks of increasing size, as is done for every recorded block
+# Per-sample cost should stay flat as blocks grow
+#
+# Run from the repository root with: python -m benchmarks.bench_block_serialize
+
+# Imports
+import struct
+import timeit
+
+from modules.telemetry.data_block import KX134AccelerometerDataBlock, MPU9250IMUDataBlock
+
+# Constants
+REPEATS: int = 5
+SAMPLE_COUNTS: list[int] = [10, 100, 1000, 10000]
+KX134_SETTINGS: int = 7 | (1 << 4) | (1 << 6) | (1 << 7)  # 100Hz, +/-16g, 16 bit samples
+MPU9250_SETTINGS: int = 9 | (1 << 8)  # 100Hz accelerometer/gyroscope, 8Hz magnetometer
+MPU9250_SAMPLE: bytes = struct.pack(">hhhhhhh", 120, -40, 16384, 321, 10, -10, 5) + struct.pack("<hhhB", 50, -50, 10, 8)
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'block':<8} {'samples':>7} {'to_payload':>14} {'per sample':>12}")
+    for count in SAMPLE_COUNTS:
+        number = max(5, 20_000 // count)
+        kx134 = KX134AccelerometerDataBlock.from_payload(
+            struct.pack("<IH", 1000, KX134_SETTINGS) + struct.pack("<hhh", 100, -100, 2048) * count
+        )
+        mpu9250 = MPU9250IMUDataBlock.from_payload(struct.pack("<II", 1000, MPU9250_SETTINGS) + MPU9250_SAMPLE * count)
+
+        for name, block in (("KX134", kx134), ("MPU9250", mpu9250)):
+            elapsed = best_of(block.to_payload, number)
+            print(f"{name:<8} {count:>7} {elapsed:>11.1f} us {elapsed / count * 1000:>9.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Benchmarks the cost of parsing radio packet and block headers
+# Compares the original hex string parsers, which sliced a bin() string, against parsing the binary buffer in place
+#
+# Run from the repository root with: python -m benchmarks.bench_header_parse
+
+# Imports
+import struct
+import timeit
+
+from modules.telemetry.block import BlockHeader, PacketHeader
+
+# Constants
+REPEATS: int = 5
+NUMBER: int = 100_000
+PACKET_HEADER: str = "564133494E49140090070000"
+BLOCK_HEADER: str = "840C0000"
+
+
+def legacy_packet_header(payload: str) -> PacketHeader:
+    """The original packet header parser, which sliced bit fields out of a binary string."""
+    header = bin(int(payload, 16))[2:]
+    return PacketHeader(
+        callsign=bytes.fromhex(payload[:12]).decode("utf-8").upper(),
+        length=(int(header[47:53], 2) + 1) * 4,
+        version=int(header[53:58], 2),
+        src_addr=int(header[63:67], 2),
+        packet_num=int(header[67:79], 2),
+    )
+
+
+def legacy_block_header(payload: str) -> BlockHeader:
+    """The original block header parser, which converted the hex payload back to bytes first."""
+    unpacked_header: int = struct.unpack("<I", bytes.fromhex(payload))[0]
+    return BlockHeader(
+        length=((unpacked_header & 0x1F) + 1) * 4,
+        has_crypto=bool((unpacked_header >> 5) & 0x1),
+        message_type=(unpacked_header >> 6) & 0xF,
+        message_subtype=(unpacked_header >> 10) & 0x3F,
+        destination=(unpacked_header >> 16) & 0xF,
+    )
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    # Headers are parsed where they sit inside a received packet
+    packet = memoryview(bytes.fromhex(PACKET_HEADER + BLOCK_HEADER))
+    cases = {
+        "packet header": (lambda: legacy_packet_header(PACKET_HEADER), lambda: PacketHeader.from_buffer(packet)),
+        "block header": (lambda: legacy_block_header(BLOCK_HEADER), lambda: BlockHeader.from_buffer(packet, 12)),
+    }
+
+    print(f"{'header':<14} {'hex':>10} {'buffer':>10} {'speedup':>8}")
+    for name, (before, after) in cases.items():
+        old = best_of(before, NUMBER)
+        new = best_of(after, NUMBER)
+        print(f"{name:<14} {old:>7.3f} us {new:>7.3f} us {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
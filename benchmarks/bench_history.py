@@ -0,0 +1,69 @@
+# Benchmarks keeping a deep telemetry history of altitude blocks
+# Compares the trimmed list of dictionaries telemetry used to keep against the columnar ring buffer history
+#
+# Run from the repository root with: python -m benchmarks.bench_history
+
+# Imports
+import timeit
+import tracemalloc
+from typing import Any
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.history import BlockHistory
+
+# Constants
+REPEATS: int = 5
+DEPTHS: list[int] = [20, 2_000, 20_000]
+RECORD: dict[str, Any] = dict(AltitudeDataBlock(1000, 100810, 22000, 1234567))
+
+
+class ListHistory:
+    """The original history: a list of dictionaries, trimmed from the front once it is longer than the depth."""
+
+    def __init__(self, depth: int):
+        self.depth: int = depth
+        self.records: list[dict[str, Any]] = []
+
+    def append(self, record: dict[str, Any]) -> None:
+        self.records.append(record)
+        if len(self.records) > self.depth:
+            self.records.pop(0)
+
+
+def fill(history: ListHistory | BlockHistory, depth: int) -> None:
+    """Fills the history to its depth with records that, like received blocks, are all separate dictionaries."""
+    for mission_time in range(depth):
+        history.append(RECORD | {"mission_time": mission_time})
+
+
+def retained_bytes(history: ListHistory | BlockHistory, depth: int) -> int:
+    """Returns the number of bytes still allocated once the history has been filled."""
+    tracemalloc.start()
+    fill(history, depth)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'depth':>7} {'list append':>12} {'ring append':>12} {'list memory':>12} {'ring memory':>12}")
+    for depth in DEPTHS:
+        old, new = ListHistory(depth), BlockHistory(DataBlockSubtype.ALTITUDE, depth)
+        fill(old, depth)
+        fill(new, depth)
+
+        old_time = best_of(lambda: old.append(dict(RECORD)), 5_000)
+        new_time = best_of(lambda: new.append(dict(RECORD)), 5_000)
+        old_memory = retained_bytes(ListHistory(depth), depth) / 1024
+        new_memory = retained_bytes(BlockHistory(DataBlockSubtype.ALTITUDE, depth), depth) / 1024
+        print(f"{depth:>7} {old_time:>9.2f} us {new_time:>9.2f} us {old_memory:>9.0f} KB {new_memory:>9.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
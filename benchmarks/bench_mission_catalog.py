@@ -0,0 +1,53 @@
+# Benchmarks listing the mission recordings available for replay
+# Compares reading every recording, as every new status used to, against scanning through the sidecar catalog once
+# it is warm, when only the size and modification time of each recording are checked
+#
+# Run from the repository root with: python -m benchmarks.bench_mission_catalog
+
+# Imports
+import struct
+import tempfile
+import timeit
+from pathlib import Path
+
+from modules.telemetry.block import SDBlockSubtype
+from modules.telemetry.catalog import MissionCatalog, read_mission
+from modules.telemetry.superblock import Flight, SuperBlock
+
+# Constants
+REPEATS: int = 5
+NUMBER: int = 3
+RECORDINGS: list[int] = [10, 100, 300]
+FLIGHT_BLOCKS: int = 256  # 128 kB of telemetry per recording
+BLOCK_LENGTH: int = 32
+
+
+def write_recordings(missions_dir: Path, count: int) -> None:
+    """Writes count recordings of a single flight filled with telemetry blocks."""
+    header = struct.pack("<HH", SDBlockSubtype.TELEMETRY_DATA | (2 << 6), BLOCK_LENGTH)
+    blocks = b"".join(header + struct.pack("<I", time) + bytes(BLOCK_LENGTH - 8) for time in range(16 * FLIGHT_BLOCKS))
+    for index in range(count):
+        superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=FLIGHT_BLOCKS, timestamp=1668434478)])
+        missions_dir.joinpath(f"Flight {index}.mission").write_bytes(superblock.to_bytes() + blocks)
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in milliseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e3
+
+
+def main() -> None:
+    print(f"{'recordings':>10} {'read all':>12} {'cached':>12} {'speedup':>8}")
+    for count in RECORDINGS:
+        with tempfile.TemporaryDirectory() as directory:
+            missions_dir = Path(directory)
+            write_recordings(missions_dir, count)
+            _ = MissionCatalog(missions_dir).scan()  # Warms the sidecar
+
+            old = best_of(lambda: [read_mission(path) for path in sorted(missions_dir.glob("*.mission"))], NUMBER)
+            new = best_of(lambda: MissionCatalog(missions_dir).scan(), NUMBER)
+            print(f"{count:>10} {old:>9.1f} ms {new:>9.2f} ms {old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
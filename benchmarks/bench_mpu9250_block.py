@@ -0,0 +1,57 @@
+# Benchmarks constructing MPU9250 data blocks with 1, 10 and 100 samples
+# Blocks that are only re-serialized into a recording never need the averaged sensor values, so both are timed
+#
+# Run from the repository root with: python -m benchmarks.bench_mpu9250_block
+
+# Imports
+import timeit
+
+from modules.telemetry.data_block import (
+    MPU9250AccelBW,
+    MPU9250AccelFSR,
+    MPU9250GyroBW,
+    MPU9250GyroFSR,
+    MPU9250IMUDataBlock,
+    MPU9250MagResolution,
+    MPU9250MagSR,
+    MPU9250Sample,
+)
+
+# Constants
+REPEATS: int = 5
+SAMPLE_COUNTS: list[int] = [1, 10, 100]
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def make_block(samples: list[MPU9250Sample]) -> MPU9250IMUDataBlock:
+    return MPU9250IMUDataBlock(
+        1000,
+        100,
+        MPU9250MagSR.SR_8,
+        MPU9250AccelFSR.ACCEL_4G,
+        MPU9250GyroFSR.AV_500DPS,
+        MPU9250AccelBW.BW_99_HZ,
+        MPU9250GyroBW.BW_92_HZ,
+        samples,
+    )
+
+
+def main() -> None:
+    print(f"{'samples':>7} {'construct':>12} {'with sensor':>14}")
+    for count in SAMPLE_COUNTS:
+        samples = [
+            MPU9250Sample(0.1 * i, -0.1 * i, 1.0, 22.5, i, -i, 0.5, 10.0, -10.0, 2.0, False, MPU9250MagResolution(1))
+            for i in range(count)
+        ]
+        number = 20_000 // count
+        construct = best_of(lambda: make_block(samples), number)
+        with_sensor = best_of(lambda: make_block(samples).sensor, number)
+        print(f"{count:>7} {construct:>9.2f} us {with_sensor:>11.2f} us")
+
+
+if __name__ == "__main__":
+    main()
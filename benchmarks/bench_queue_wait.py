@@ -0,0 +1,79 @@
+# Benchmarks the idle CPU usage and wake-up latency of a process reading from several multiprocessing queues
+# Compares the old busy-polling loop (Queue.empty()) against blocking with wait_for_queues
+#
+# Run from the repository root with: python -m benchmarks.bench_queue_wait
+
+# Imports
+import multiprocessing as mp
+import statistics
+import time
+from multiprocessing import Process
+from queue import Queue
+from typing import Any
+
+from modules.misc.queue_wait import wait_for_queues
+
+# Constants
+NUM_QUEUES: int = 4  # The telemetry process reads from four input queues
+IDLE_SECONDS: float = 3.0
+NUM_MESSAGES: int = 200
+MESSAGE_SPACING: float = 0.005
+STOP: str = "stop"
+
+
+def consumer(mode: str, queues: list[Queue[Any]], results: Queue[Any]) -> None:
+    """Consumes timestamped messages from the queues and reports CPU time used while idle and wake-up latencies."""
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    idle_cpu: float | None = None
+    latencies: list[float] = []
+
+    while True:
+        ready = queues if mode == "spin" else wait_for_queues(queues)
+        for queue in ready:
+            while not queue.empty():
+                message = queue.get()
+                received = time.perf_counter()
+
+                if idle_cpu is None:
+                    idle_cpu = (time.process_time() - cpu_start) / (received - wall_start)
+
+                if message == STOP:
+                    results.put((idle_cpu, latencies))
+                    return
+                latencies.append(received - message)
+
+
+def run(mode: str) -> tuple[float, list[float]]:
+    """Runs the consumer in the given mode and returns its idle CPU fraction and wake-up latencies."""
+
+    queues: list[Queue[Any]] = [mp.Queue() for _ in range(NUM_QUEUES)]  # type: ignore
+    results: Queue[Any] = mp.Queue()  # type: ignore
+
+    process = Process(target=consumer, args=(mode, queues, results))
+    process.start()
+    time.sleep(IDLE_SECONDS)
+
+    for i in range(NUM_MESSAGES):
+        queues[i % NUM_QUEUES].put(time.perf_counter())
+        time.sleep(MESSAGE_SPACING)
+    queues[0].put(STOP)
+
+    idle_cpu, latencies = results.get()
+    process.join()
+    return idle_cpu, latencies
+
+
+def main() -> None:
+    print(f"{NUM_QUEUES} queues, {IDLE_SECONDS} s idle, {NUM_MESSAGES} messages")
+    print(f"{'Mode':<6} {'Idle CPU':>9} {'Median wake-up':>15} {'p99 wake-up':>12}")
+    for mode in ("spin", "wait"):
+        idle_cpu, latencies = run(mode)
+        median = statistics.median(latencies) * 1e6
+        p99 = statistics.quantiles(latencies, n=100)[98] * 1e6
+        print(f"{mode:<6} {idle_cpu:>8.1%} {median:>12.1f} us {p99:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
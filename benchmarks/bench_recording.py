@@ -0,0 +1,90 @@
+# Benchmarks the time the telemetry process spends recording data blocks
+# Compares writing every filled 512 byte block inline, rewriting the superblock each time, against handing whole blocks
+# to the writer thread of the mission recorder, with each of its fsync policies
+#
+# Run from the repository root with: python -m benchmarks.bench_recording
+
+# Imports
+import math
+import tempfile
+import timeit
+from pathlib import Path
+
+from modules.misc.config import FsyncPolicy
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.recorder import MissionRecorder
+from modules.telemetry.sd_block import LoggingMetadataSpacerBlock, TelemetryDataBlock
+from modules.telemetry.superblock import Flight, SuperBlock
+
+# Constants
+REPEATS: int = 5
+NUM_BLOCKS: int = 20_000
+EPOCH: int = 1668434478
+
+
+def inline_recording(path: Path, blocks: list[bytes]) -> None:
+    """Records the blocks the way the telemetry process used to, writing from the parsing loop."""
+
+    superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=0, timestamp=EPOCH)])
+    with open(path, "wb") as file:
+        _ = file.write(superblock.to_bytes())
+        file.flush()
+        buffer = bytearray(b"")
+
+        def write_bytes(num_bytes: int) -> None:
+            nonlocal buffer
+            superblock.flights[0].num_blocks += int(math.ceil(num_bytes / 512))
+            _ = file.seek(0)
+            _ = file.write(superblock.to_bytes())
+            blocks = buffer[:num_bytes]
+            buffer = buffer[num_bytes:]
+            _ = file.seek(0, 2)
+            _ = file.write(blocks)
+            if num_bytes < 512:
+                _ = file.write(LoggingMetadataSpacerBlock(512 - (num_bytes % 512)).to_bytes())
+
+        for block in blocks:
+            buffer += block
+            if len(buffer) >= 512:
+                write_bytes(len(buffer) - (len(buffer) % 512))
+        write_bytes(len(buffer))
+
+
+def recorder_recording(path: Path, blocks: list[bytes], policy: FsyncPolicy) -> float:
+    """Records the blocks through the mission recorder, and returns the time the parsing loop spent on them in ms."""
+
+    recorder = MissionRecorder(path, EPOCH, fsync_policy=policy)
+    parsing = timeit.default_timer()
+    for block in blocks:
+        recorder.write(block)
+    parsing = timeit.default_timer() - parsing
+    recorder.close()
+    return parsing * 1e3
+
+
+def best_of(statement) -> float:
+    """Returns the fastest time of the statement, in milliseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=1, repeat=REPEATS)) * 1e3
+
+
+def main() -> None:
+    blocks = [
+        TelemetryDataBlock(DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(time, 100_000, 22, 120)).to_bytes()
+        for time in range(NUM_BLOCKS)
+    ]
+    print(f"{NUM_BLOCKS} altitude blocks, {sum(map(len, blocks)) // 1024} kB")
+    print(f"{'Writer':<20} {'parsing loop':>13} {'per block':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("Benchmark.mission")
+        inline = best_of(lambda: inline_recording(path, blocks))
+        print(f"{'inline':<20} {inline:>10.1f} ms {inline / NUM_BLOCKS * 1e3:>7.2f} us")
+
+        for policy in FsyncPolicy:
+            threaded = min(recorder_recording(path, blocks, policy) for _ in range(REPEATS))
+            print(f"{f'recorder ({policy})':<20} {threaded:>10.1f} ms {threaded / NUM_BLOCKS * 1e3:>7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
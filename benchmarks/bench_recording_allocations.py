@@ -0,0 +1,130 @@
+# Benchmarks the memory allocated by the telemetry process while recording a mission, traced with tracemalloc
+# Simulates an hour of recording at the peak data rate, and compares the original recording buffer, which grew with +=
+# and was sliced into a new copy on every flush, against the preallocated staging buffers of the mission recorder that
+# blocks are packed straight into
+#
+# Run from the repository root with: python -m benchmarks.bench_recording_allocations
+
+# Imports
+import math
+import struct
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import (
+    AccelerationDataBlock,
+    AltitudeDataBlock,
+    AngularVelocityDataBlock,
+    DataBlock,
+    KX134AccelerometerDataBlock,
+)
+from modules.telemetry.recorder import MissionRecorder
+from modules.telemetry.sd_block import LoggingMetadataSpacerBlock, TelemetryDataBlock
+from modules.telemetry.superblock import Flight, SuperBlock
+
+# Constants
+SIMULATED_SECONDS: int = 3600
+PEAK_BLOCKS_PER_SECOND: int = 100  # Every block of a full rate stream of LoRa packets, at the fastest radio settings
+EPOCH: int = 1668434478
+
+
+def peak_blocks() -> list[TelemetryDataBlock]:
+    """Returns one second of the blocks received at the peak data rate."""
+
+    kx134 = KX134AccelerometerDataBlock.from_payload(
+        struct.pack("<IH", 1000, 7 | (1 << 4) | (1 << 7)) + struct.pack("<hhh", 100, -100, 2048) * 10
+    )
+    kinds: list[DataBlock] = [
+        AltitudeDataBlock(1000, 100_000, 22, 120),
+        AccelerationDataBlock(1000, 16, 1, 2, 3),
+        AngularVelocityDataBlock(1000, 2000, 1, 2, 3),
+        kx134,
+    ]
+    return [
+        TelemetryDataBlock(DataBlockSubtype(kinds[i % len(kinds)].subtype), data=kinds[i % len(kinds)])
+        for i in range(PEAK_BLOCKS_PER_SECOND)
+    ]
+
+
+class OriginalRecording:
+    """The recording buffer of the telemetry process as it was, writing from the parsing loop."""
+
+    def __init__(self, path: Path):
+        self.file = open(path, "wb")
+        self.superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=0, timestamp=EPOCH)])
+        _ = self.file.write(self.superblock.to_bytes())
+        self.buffer = bytearray(b"")
+
+    def write_block(self, block: TelemetryDataBlock) -> None:
+        self.buffer += block.to_bytes()
+        if len(self.buffer) >= 512:
+            self.write_bytes(len(self.buffer) - (len(self.buffer) % 512))
+
+    def write_bytes(self, num_bytes: int) -> None:
+        self.superblock.flights[0].num_blocks += int(math.ceil(num_bytes / 512))
+        _ = self.file.seek(0)
+        _ = self.file.write(self.superblock.to_bytes())
+        blocks = self.buffer[:num_bytes]
+        self.buffer = self.buffer[num_bytes:]
+        _ = self.file.seek(0, 2)
+        _ = self.file.write(blocks)
+        if num_bytes < 512:
+            _ = self.file.write(LoggingMetadataSpacerBlock(512 - (num_bytes % 512)).to_bytes())
+
+    def close(self) -> None:
+        self.write_bytes(len(self.buffer))
+        self.file.close()
+
+
+def record(recording: OriginalRecording | MissionRecorder, blocks: list[TelemetryDataBlock], traced: bool) -> int:
+    """
+    Records an hour of blocks, and returns the bytes allocated while recording them when traced. Allocations are
+    measured per block, as the peak of traced memory above what was allocated before the block was recorded.
+    """
+
+    allocated = 0
+    for _ in range(SIMULATED_SECONDS):
+        for block in blocks:
+            if traced:
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            recording.write_block(block)
+            if traced:
+                allocated += tracemalloc.get_traced_memory()[1] - before
+    recording.close()
+    return allocated
+
+
+def measure(name: str, open_recording: Callable[[Path], OriginalRecording | MissionRecorder]) -> None:
+    blocks = peak_blocks()
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("Benchmark.mission")
+
+        start = time.perf_counter()
+        _ = record(open_recording(path), blocks, traced=False)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        recording = open_recording(path)
+        tracemalloc.reset_peak()
+        allocated = record(recording, blocks, traced=True)
+        tracemalloc.stop()
+
+    count = SIMULATED_SECONDS * len(blocks)
+    print(f"{name:<14} {elapsed:>7.2f} s {allocated / 2**20:>11.1f} MiB {allocated / count:>9.0f} B")
+
+
+def main() -> None:
+    count = SIMULATED_SECONDS * PEAK_BLOCKS_PER_SECOND
+    print(f"{SIMULATED_SECONDS} s at {PEAK_BLOCKS_PER_SECOND} blocks/s, {count} blocks")
+    print(f"{'Buffer':<14} {'time':>9} {'allocated':>15} {'per block':>11}")
+    measure("original", OriginalRecording)
+    measure("preallocated", lambda path: MissionRecorder(path, EPOCH))
+
+
+if __name__ == "__main__":
+    main()
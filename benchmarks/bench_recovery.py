@@ -0,0 +1,76 @@
+# Benchmarks recovering a recording left by a crash, whose superblock still says no blocks were recorded
+# Compares walking only the block headers against reading every block of the flight through its payload
+#
+# Run from the repository root with: python -m benchmarks.bench_recovery
+
+# Imports
+import logging
+import mmap
+import tempfile
+import timeit
+from pathlib import Path
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.recovery import BLOCK_SIZE, end_of_blocks, recover_mission
+from modules.telemetry.sd_block import SDBlock, TelemetryDataBlock
+from modules.telemetry.superblock import Flight, SuperBlock
+
+# Constants
+REPEATS: int = 3
+RECORDED_BLOCKS: list[int] = [36_000, 360_000]  # Six minutes and an hour at 100 blocks/s
+EPOCH: int = 1668434478
+
+
+def write_crashed(path: Path, count: int) -> bytes:
+    """Writes a recording of count altitude blocks whose flight has no blocks recorded, and returns its contents."""
+    block = TelemetryDataBlock(DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(1000, 100_000, 22, 120)).to_bytes()
+    blocks = block * count
+    blocks = blocks[: len(blocks) - len(blocks) % BLOCK_SIZE]  # Only whole blocks reach the file
+    superblock = bytearray(SuperBlock(flights=[Flight(first_block=1, num_blocks=1, timestamp=EPOCH)]).to_bytes())
+    superblock[0x64:0x68] = bytes(4)  # No blocks recorded
+    data = bytes(superblock) + blocks
+    path.write_bytes(data)
+    return data
+
+
+def decode_all(path: Path) -> int:
+    """Finds the end of the blocks by decoding every block, as a reader of the whole flight would."""
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        offset = BLOCK_SIZE
+        while offset + 4 <= len(data):
+            length = SDBlock.parse_length(data[offset : offset + 4])
+            if length < 4 or offset + length > len(data):
+                break
+            _ = SDBlock.from_bytes(data[offset : offset + length])
+            offset += length
+    return offset
+
+
+def best_of(statement) -> float:
+    """Returns the fastest time of the statement, in milliseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=1, repeat=REPEATS)) * 1e3
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)  # Every recovery is logged
+    print(f"{'blocks':>8} {'size':>9} {'decode all':>12} {'headers':>10} {'recover':>10}")
+    for count in RECORDED_BLOCKS:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory).joinpath("Crashed.mission")
+            data = write_crashed(path, count)
+
+            decoded = best_of(lambda: decode_all(path))
+            with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                headers = best_of(lambda: end_of_blocks(mapped, BLOCK_SIZE, len(data)))
+
+            def recover() -> None:
+                path.write_bytes(data)
+                assert recover_mission(path)
+
+            recovered = best_of(recover)
+            print(f"{count:>8} {len(data) // 1024:>6} kB {decoded:>9.0f} ms {headers:>7.0f} ms {recovered:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Benchmarks moving the replay of a full flight to a mission time
+# Compares fast forwarding, which outputs every block from the start of the flight, against seeking with the time index
+# and outputting only the pre-roll window. Both are timed up to the block at the mission time, including decoding the
+# blocks output into the telemetry history, as the telemetry process does
+#
+# Run from the repository root with: python -m benchmarks.bench_replay_seek
+
+# Imports
+import tempfile
+import timeit
+from pathlib import Path
+from queue import Queue
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.codec import get_decoder
+from modules.telemetry.data_block import AccelerationDataBlock, AltitudeDataBlock, AngularVelocityDataBlock
+from modules.telemetry.history import TelemetryHistory
+from modules.telemetry.recorder import BLOCK_SIZE, MissionRecorder
+from modules.telemetry.replay import REPLAY_SEEK_FRAME, TelemetryReplay, parse_replay_frame
+from modules.telemetry.sd_block import TelemetryDataBlock
+
+# Constants
+REPEATS: int = 5
+SIMULATED_SECONDS: int = 3600
+BLOCKS_PER_SECOND: int = 100
+EPOCH: int = 1668434478
+HISTORY_DEPTH: int = 20  # The default telemetry buffer size
+TARGETS: list[int] = [60_000, 1_800_000, 2_700_000, 3_590_000]  # Mission times seeked to, in ms
+
+
+def record_flight(path: Path) -> None:
+    """Records an hour of altitude, acceleration and angular velocity blocks at the peak data rate."""
+
+    recorder = MissionRecorder(path, EPOCH)
+    for i in range(SIMULATED_SECONDS * BLOCKS_PER_SECOND):
+        mission_time = 10 * i
+        match i % 3:
+            case 0:
+                data = AltitudeDataBlock(mission_time, 100_000, 22, 120)
+            case 1:
+                data = AccelerationDataBlock(mission_time, 16, 1, 2, 3)
+            case _:
+                data = AngularVelocityDataBlock(mission_time, 2000, 1, 2, 3)
+        recorder.write_block(TelemetryDataBlock(DataBlockSubtype(data.subtype), data=data))
+    recorder.close()
+
+
+class BenchmarkReplay(TelemetryReplay):
+    """A replay that is set up without starting to play, so that it can be driven one block at a time."""
+
+    def replay(self) -> None:
+        self.flight_index = None if self.index is None else self.index.flights[0]
+
+
+def play_until(replay: TelemetryReplay, file, mission_time: int) -> int:
+    """
+    Plays the replay until it outputs the block at the mission time, decoding every block output into a telemetry
+    history. Returns the number of blocks output.
+    """
+
+    history = TelemetryHistory(HISTORY_DEPTH)
+    num_blocks = replay.mission_sb.flights[0].num_blocks
+    count = 0
+    while True:
+        while not replay.replay_payloads.empty():
+            block_type, block_subtype, block_data = parse_replay_frame(replay.replay_payloads.get())
+            if block_type == REPLAY_SEEK_FRAME:
+                history.clear()
+                continue
+            block = get_decoder(block_type, block_subtype)(block_data, 0, len(block_data))  # type: ignore
+            history.append(block.subtype, dict(block))
+            count += 1
+            if block.mission_time >= mission_time:
+                return count
+        replay.read_next_sd_block(file, num_blocks)
+
+
+def fast_forward(replay: TelemetryReplay, file, mission_time: int) -> int:
+    """Plays the flight from its start, as fast as it can be read, until the mission time."""
+
+    _ = file.seek(BLOCK_SIZE)
+    replay.block_count = 0
+    replay.total_time_offset = mission_time  # No block before the mission time is waited for
+    replay.pre_roll_start = 0
+    return play_until(replay, file, mission_time)
+
+
+def seek(replay: TelemetryReplay, file, mission_time: int) -> int:
+    """Seeks to the mission time with the time index, which outputs the pre-roll window up to it."""
+
+    replay.seek(file, mission_time)
+    return play_until(replay, file, mission_time)
+
+
+def best_of(statement) -> float:
+    """Returns the fastest time of the statement, in milliseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=1, repeat=REPEATS)) * 1e3
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("Benchmark.mission")
+        record_flight(path)
+        replay = BenchmarkReplay(Queue(), Queue(), 1, path)  # type: ignore
+        print(f"{SIMULATED_SECONDS} s at {BLOCKS_PER_SECOND} blocks/s, {path.stat().st_size >> 20} MiB")
+        print(f"{'mission time':>12} {'fast forward':>14} {'blocks':>8} {'seek':>10} {'blocks':>8}")
+
+        with open(path, "rb") as file:
+            for target in TARGETS:
+                forwarded = fast_forward(replay, file, target)
+                forward = best_of(lambda: fast_forward(replay, file, target))
+                seeked = seek(replay, file, target)
+                seeking = best_of(lambda: seek(replay, file, target))
+                print(f"{target // 1000:>10} s {forward:>11.1f} ms {forwarded:>8} {seeking:>7.2f} ms {seeked:>8}")
+
+
+if __name__ == "__main__":
+    main()
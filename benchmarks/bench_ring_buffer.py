@@ -0,0 +1,83 @@
+# Benchmarks moving radio sized frames from a producer process to a consumer process
+# Compares a multiprocessing queue against the shared memory ring buffer at several frame rates
+#
+# Run from the repository root with: python -m benchmarks.bench_ring_buffer
+
+# Imports
+import multiprocessing as mp
+import statistics
+import struct
+import time
+from multiprocessing import Process
+from queue import Queue
+from typing import Any
+
+from modules.misc.queue_wait import wait_for_queues
+from modules.misc.ring_buffer import SharedRingBuffer
+
+# Constants
+FRAME_RATES: list[int] = [1_000, 10_000, 100_000]
+FRAME_SIZE: int = 64  # Bytes, about the size of a small radio packet
+DURATION: float = 2.0  # Seconds of frames produced at each rate
+TIMESTAMP = struct.Struct("<d")
+STOP: bytes = b""
+
+
+def producer(transport: Any, rate: int) -> None:
+    """Puts timestamped frames on the transport at the requested rate, then a stop frame."""
+
+    padding = bytes(FRAME_SIZE - TIMESTAMP.size)
+    total = int(rate * DURATION)
+    start = time.perf_counter()
+    sent = 0
+    while sent < total:
+        # Catch up to the number of frames that should have been sent by now
+        due = min(total, int((time.perf_counter() - start) * rate))
+        while sent < due:
+            transport.put(TIMESTAMP.pack(time.perf_counter()) + padding)
+            sent += 1
+    transport.put(STOP)
+
+
+def consume(transport: Any) -> tuple[int, float, list[float], float]:
+    """Consumes frames until the stop frame, returning the frame count, elapsed time, latencies and CPU time."""
+
+    latencies: list[float] = []
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    while True:
+        _ = wait_for_queues([transport])
+        while not transport.empty():
+            frame = transport.get()
+            if frame == STOP:
+                return len(latencies), time.perf_counter() - start, latencies, time.process_time() - cpu_start
+            latencies.append(time.perf_counter() - TIMESTAMP.unpack_from(frame)[0])
+
+
+def run(name: str, transport: Any, rate: int) -> None:
+    process = Process(target=producer, args=(transport, rate))
+    process.start()
+    count, elapsed, latencies, cpu = consume(transport)
+    process.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(
+        f"{name:<12} {rate:>8} fps: received {count / elapsed:>9.0f} fps, "
+        f"latency median {statistics.median(latencies) * 1e6:>8.1f} us, p99 {p99 * 1e6:>9.1f} us, "
+        f"consumer CPU {cpu / count * 1e6:>5.2f} us/frame"
+    )
+
+
+def main() -> None:
+    for rate in FRAME_RATES:
+        queue: Queue[bytes] = mp.Queue()  # type: ignore
+        run("mp.Queue", queue, rate)
+
+        ring = SharedRingBuffer()
+        run("ring buffer", ring, rate)
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
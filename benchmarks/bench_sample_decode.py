@@ -0,0 +1,50 @@
+# Benchmarks decoding the samples of KX134 and MPU9250 data blocks of increasing size
+# Compares unpacking one sample at a time with struct against decoding the whole sample region with NumPy
+#
+# Run from the repository root with: python -m benchmarks.bench_sample_decode
+
+# Imports
+import struct
+import timeit
+
+import modules.telemetry.data_block as data_block
+from modules.telemetry.data_block import KX134AccelerometerDataBlock, MPU9250IMUDataBlock
+
+# Constants
+REPEATS: int = 5
+SAMPLE_COUNTS: list[int] = [1, 10, 100, 1000]
+KX134_SETTINGS: int = 7 | (1 << 4) | (1 << 6) | (1 << 7)  # 100Hz, +/-16g, 16 bit samples
+MPU9250_SETTINGS: int = 9 | (1 << 8)  # 100Hz accelerometer/gyroscope, 8Hz magnetometer
+MPU9250_SAMPLE: bytes = struct.pack(">hhhhhhh", 120, -40, 16384, 321, 10, -10, 5) + struct.pack("<hhhB", 50, -50, 10, 8)
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def compare(name: str, count: int, decode) -> None:
+    number = max(10, 20_000 // count)
+    numpy = data_block.np
+    data_block.np = None
+    unpacked = best_of(decode, number)
+    data_block.np = numpy
+    vectorized = best_of(decode, number)
+    print(f"{name:<8} {count:>6} {unpacked:>12.1f} us {vectorized:>9.1f} us {unpacked / vectorized:>7.1f}x")
+
+
+def main() -> None:
+    if data_block.np is None:
+        raise SystemExit("NumPy is not installed.")
+
+    print(f"{'block':<8} {'samples':>6} {'struct':>15} {'numpy':>12} {'speedup':>8}")
+    for count in SAMPLE_COUNTS:
+        kx134 = struct.pack("<IH", 1000, KX134_SETTINGS) + struct.pack("<hhh", 100, -100, 2048) * count
+        compare("KX134", count, lambda: KX134AccelerometerDataBlock.from_payload(kx134))
+
+        mpu9250 = struct.pack("<II", 1000, MPU9250_SETTINGS) + MPU9250_SAMPLE * count
+        compare("MPU9250", count, lambda: MPU9250IMUDataBlock.from_payload(mpu9250))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Benchmarks reading the length of a mission, and finding the block to replay a mission time from
+# Compares reading the flight from its start, as the catalog and replay did, against the sidecar time index, both when
+# the index has to be built and once it is saved
+#
+# Run from the repository root with: python -m benchmarks.bench_time_index
+
+# Imports
+import tempfile
+import timeit
+from pathlib import Path
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.json_packets import get_last_mission_time
+from modules.telemetry.recorder import MissionRecorder
+from modules.telemetry.replay import parse_sd_block_header
+from modules.telemetry.sd_block import TelemetryDataBlock
+from modules.telemetry.superblock import find_superblock
+from modules.telemetry.time_index import build_index, get_time_index, index_path
+
+# Constants
+REPEATS: int = 5
+SIMULATED_SECONDS: int = 3600
+BLOCKS_PER_SECOND: int = 100
+EPOCH: int = 1668434478
+
+
+def best_of(statement) -> float:
+    """Returns the fastest time of the statement, in milliseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=1, repeat=REPEATS)) * 1e3
+
+
+def linear_length(path: Path) -> int:
+    """Reads the length of the mission the way the catalog used to, reading every block of every flight."""
+
+    address, superblock = find_superblock(path)  # type: ignore
+    mission_time = -1
+    with open(path, "rb") as file:
+        for flight in superblock.flights:
+            _ = file.seek((address + flight.first_block) * 512)
+            mission_time += get_last_mission_time(file, flight.num_blocks)  # type: ignore
+    return mission_time
+
+
+def linear_seek(path: Path, mission_time: int) -> int:
+    """Returns the offset of the first block at the mission time, reading block by block from the flight start."""
+
+    address, superblock = find_superblock(path)  # type: ignore
+    offset = (address + superblock.flights[0].first_block) * 512
+    with open(path, "rb") as file:
+        _ = file.seek(offset)
+        while header := file.read(4):
+            _, _, block_length = parse_sd_block_header(header)
+            data = file.read(block_length - 4)
+            if int.from_bytes(data[:4], "little") >= mission_time:
+                break
+            offset += block_length
+    return offset
+
+
+def main() -> None:
+    count = SIMULATED_SECONDS * BLOCKS_PER_SECOND
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory).joinpath("Benchmark.mission")
+        recorder = MissionRecorder(path, EPOCH)
+        for i in range(count):
+            recorder.write_block(
+                TelemetryDataBlock(DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(10 * i, 100_000, 22, 120))
+            )
+        recorder.close()
+        address, superblock = find_superblock(path)  # type: ignore
+        index = get_time_index(path)
+        assert index is not None and index.mission_length == linear_length(path)
+        target = 10 * count * 3 // 4
+
+        print(f"{SIMULATED_SECONDS} s at {BLOCKS_PER_SECOND} blocks/s, {count} blocks, {path.stat().st_size >> 20} MiB")
+        print(f"{'Lookup':<24} {'time':>11}")
+        print(f"{'length, linear read':<24} {best_of(lambda: linear_length(path)):>8.2f} ms")
+        print(f"{'index build':<24} {best_of(lambda: build_index(path, address, superblock)):>8.2f} ms")
+        saved = best_of(lambda: get_time_index(path).mission_length)  # type: ignore
+        print(f"{'length, saved index':<24} {saved:>8.3f} ms")
+        print(f"{'seek 45 min, linear read':<24} {best_of(lambda: linear_seek(path, target)):>8.2f} ms")
+        print(f"{'seek 45 min, index':<24} {best_of(lambda: index.flights[0].seek(target)) * 1e3:>8.2f} us")
+        print(f"sidecar index: {index_path(path).stat().st_size} bytes")
+
+
+if __name__ == "__main__":
+    main()
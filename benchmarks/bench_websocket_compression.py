@@ -0,0 +1,66 @@
+# Benchmarks compressing a websocket snapshot broadcast to every connected client
+# Compares Tornado's permessage-deflate, which compresses the frame again for each connection with a context of its
+# own, against compressing it once and writing the same bytes to every connection
+#
+# Run from the repository root with: python -m benchmarks.bench_websocket_compression
+
+# Imports
+import timeit
+import zlib
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock, AngularVelocityDataBlock, GNSSLocationBlock
+from modules.telemetry.history import TelemetryHistory
+from modules.websocket.compression import COMPRESSION_LEVEL
+from modules.websocket.subscription import FrameEncodings
+
+# Constants
+REPEATS: int = 5
+NUMBER: int = 20
+DEPTH: int = 200
+CLIENTS: list[int] = [1, 5, 20]
+
+
+def snapshot_frame() -> str:
+    """Returns a snapshot frame holding DEPTH altitude, angular velocity and GNSS entries."""
+    history = TelemetryHistory(DEPTH)
+    for mission_time in range(DEPTH):
+        altitude = AltitudeDataBlock(mission_time * 100, 100810 - mission_time, 22000, 1234567 + mission_time * 91)
+        history.append(DataBlockSubtype.ALTITUDE, dict(altitude))
+        history.append(DataBlockSubtype.ANGULAR_VELOCITY, dict(AngularVelocityDataBlock(mission_time, 2000, 1, 2, 3)))
+        gnss = GNSSLocationBlock(mission_time, 27012345, -45312345, 43200, 80000, 550, 9000, 150, 90, 120, 9, 3)
+        history.append(DataBlockSubtype.GNSS, dict(gnss))
+    return f'{{"type":"snapshot","seq":1,"telemetry":{history.encode()}}}'
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    message = snapshot_frame()
+    compressors = [zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS) for _ in range(max(CLIENTS))]
+    compressed = FrameEncodings(message).get(None, compress=True)
+    assert compressed is not None
+    print(f"frame: {len(message)} bytes, {len(compressed)} bytes compressed ({len(message) / len(compressed):.1f}x)")
+
+    def per_connection(clients: int) -> None:
+        data = message.encode("utf-8")  # Tornado encodes the frame for every connection too
+        for compressor in compressors[:clients]:
+            _ = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def once(clients: int) -> None:
+        encodings = FrameEncodings(message)
+        for _ in range(clients):
+            _ = encodings.get(None, compress=True)
+
+    print(f"{'clients':>8} {'per client':>13} {'once':>13} {'speedup':>8}")
+    for clients in CLIENTS:
+        old = best_of(lambda: per_connection(clients), NUMBER)
+        new = best_of(lambda: once(clients), NUMBER)
+        print(f"{clients:>8} {old:>10.1f} us {new:>10.1f} us {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Benchmarks encoding the telemetry history of a websocket snapshot
+# Compares json.dumps over the nested dictionaries, as the websocket process did every frame, against joining the
+# record encodings the history caches when records are appended. Also times appending a record and encoding the delta
+# frame that carries it, which is what every received block costs the telemetry process
+#
+# Run from the repository root with: python -m benchmarks.bench_websocket_encode
+
+# Imports
+import json
+import timeit
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock, AngularVelocityDataBlock, GNSSLocationBlock
+from modules.telemetry.history import TelemetryHistory
+
+# Constants
+REPEATS: int = 5
+DEPTHS: list[int] = [20, 200, 2_000]
+SUBTYPES: int = 3
+
+
+def filled_history(depth: int) -> TelemetryHistory:
+    """Returns a telemetry history holding depth altitude, angular velocity and GNSS entries."""
+    history = TelemetryHistory(depth)
+    for mission_time in range(depth):
+        history.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(mission_time, 100810, 22000, 1234567)))
+        history.append(DataBlockSubtype.ANGULAR_VELOCITY, dict(AngularVelocityDataBlock(mission_time, 2000, 1, 2, 3)))
+        gnss = GNSSLocationBlock(mission_time, 27012345, -45312345, 43200, 80000, 550, 9000, 150, 90, 120, 9, 3)
+        history.append(DataBlockSubtype.GNSS, dict(gnss))
+    return history
+
+
+def append_and_delta(history: TelemetryHistory, mission_time: int) -> str:
+    """Appends one record of each subtype and encodes the delta holding them."""
+    totals = history.totals()
+    history.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(mission_time, 100810, 22000, 1234567)))
+    history.append(DataBlockSubtype.ANGULAR_VELOCITY, dict(AngularVelocityDataBlock(mission_time, 2000, 1, 2, 3)))
+    gnss = GNSSLocationBlock(mission_time, 27012345, -45312345, 43200, 80000, 550, 9000, 150, 90, 120, 9, 3)
+    history.append(DataBlockSubtype.GNSS, dict(gnss))
+    return history.encode(totals)
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    print(f"{'entries':>8} {'json.dumps':>13} {'fragments':>13} {'speedup':>8}")
+    for depth in DEPTHS:
+        history = filled_history(depth)
+        records = dict(history)  # The websocket process received the dictionaries already built
+        number = max(10, 20_000 // depth)
+
+        old = best_of(lambda: json.dumps(records), number)
+        new = best_of(history.encode, number)
+        print(f"{depth * SUBTYPES:>8} {old:>10.1f} us {new:>10.1f} us {old / new:>7.2f}x")
+
+    history = filled_history(DEPTHS[-1])
+    delta = best_of(lambda: append_and_delta(history, DEPTHS[-1]), 1000)
+    print(f"append {SUBTYPES} records and encode their delta: {delta:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# Benchmarks the end to end latency from a payload arriving at telemetry to a websocket client receiving its frame
+# Runs the real websocket server process. A producer process decodes altitude payloads, records them in a telemetry
+# history and queues the delta frames built from it, stamping each frame with the time its payload was ingested.
+#
+# Run from the repository root with: python -m benchmarks.bench_websocket_latency
+
+# Imports
+import asyncio
+import json
+import multiprocessing as mp
+import random
+import statistics
+import struct
+import time
+from multiprocessing import Process
+from multiprocessing.synchronize import Event
+from queue import Queue
+from typing import Any
+
+import tornado.websocket
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.codec import decode
+from modules.telemetry.history import TelemetryHistory
+from modules.websocket.websocket import WebSocketHandler
+
+# Constants
+URL: str = "ws://localhost:33845/websocket"
+NUM_FRAMES: int = 200
+MAX_SPACING: float = 0.02  # Payloads arrive at random intervals of up to this many seconds
+CONNECT_ATTEMPTS: int = 50
+
+
+def producer(frames: Queue[Any], connected: Event) -> None:
+    """Decodes payloads into a telemetry history and queues a delta frame for each one, once the client connected."""
+
+    history = TelemetryHistory(20)
+    connected.wait()
+    frames.put(("snapshot", '{"type":"snapshot","seq":0}'))
+
+    for seq in range(1, NUM_FRAMES + 1):
+        time.sleep(random.uniform(0, MAX_SPACING))
+        payload = struct.pack("<Iiii", seq, 100810, 22000, 1234567)
+
+        ingest = time.monotonic()
+        totals = history.totals()
+        block = decode(2, int(DataBlockSubtype.ALTITUDE), payload, 0, len(payload))
+        history.append(block.subtype, dict(block))
+        message = f'{{"type":"delta","seq":{seq},"ingest":{ingest},"telemetry":{history.encode(totals)}}}'
+        frames.put(("delta", message))
+
+
+async def client(connected: Event) -> list[float]:
+    """Connects to the websocket server and returns the latency of every delta frame it receives, in milliseconds."""
+
+    for _ in range(CONNECT_ATTEMPTS):
+        try:
+            connection = await tornado.websocket.websocket_connect(URL)
+            break
+        except OSError:
+            await asyncio.sleep(0.1)
+    else:
+        raise ConnectionError(f"Could not connect to {URL}")
+
+    connected.set()
+    latencies: list[float] = []
+    while len(latencies) < NUM_FRAMES:
+        message = await connection.read_message()
+        if message is None:
+            raise ConnectionError("The websocket server closed the connection")
+
+        received = time.monotonic()
+        frame = json.loads(message)
+        if frame["type"] == "delta":
+            latencies.append((received - frame["ingest"]) * 1000)
+
+    connection.close()
+    return latencies
+
+
+def main() -> None:
+    frames: Queue[Any] = mp.Queue()  # type: ignore
+    ws_commands: Queue[Any] = mp.Queue()  # type: ignore
+    connected = mp.Event()
+
+    server = Process(target=WebSocketHandler, args=(frames, ws_commands), daemon=True)
+    source = Process(target=producer, args=(frames, connected), daemon=True)
+    server.start()
+    source.start()
+
+    try:
+        latencies = asyncio.run(client(connected))
+    finally:
+        source.terminate()
+        server.terminate()
+
+    latencies.sort()
+    print(f"frames received:  {len(latencies)}")
+    print(f"median latency:   {statistics.median(latencies):.2f} ms")
+    print(f"95th percentile:  {latencies[int(len(latencies) * 0.95)]:.2f} ms")
+    print(f"maximum latency:  {latencies[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
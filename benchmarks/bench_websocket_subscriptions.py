@@ -0,0 +1,73 @@
+# Benchmarks sending a delta frame to a room of subscribed websocket clients
+# Eight wall displays subscribe to altitude and status, and two IMU dashboards to the MPU9250 records. Compares the
+# bytes written per frame and the websocket process time to prepare them against sending every client the full frame
+#
+# Run from the repository root with: python -m benchmarks.bench_websocket_subscriptions
+
+# Imports
+import struct
+import timeit
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import (
+    AltitudeDataBlock,
+    AngularVelocityDataBlock,
+    GNSSLocationBlock,
+    MPU9250IMUDataBlock,
+)
+from modules.telemetry.history import TelemetryHistory
+from modules.websocket.subscription import FrameEncodings, parse_subscription
+
+# Constants
+REPEATS: int = 5
+NUMBER: int = 200
+BLOCKS_PER_FRAME: int = 5
+CLIENTS: list[str] = ["websocket subscribe altitude status"] * 8 + ["websocket subscribe mpu9250_imu"] * 2
+
+
+def mpu9250_block(mission_time: int) -> MPU9250IMUDataBlock:
+    """Returns an MPU9250 block with 20 samples."""
+    settings = 9 | (1 << 8) | (1 << 9) | (1 << 11)
+    samples = b"".join(
+        struct.pack(">hhhhhhh", 100 * i, -100 * i, 16384, 321 * i, 7 * i, -7 * i, 0) + struct.pack("<hhhB", 1, 2, 3, 0)
+        for i in range(20)
+    )
+    return MPU9250IMUDataBlock.from_payload(struct.pack("<II", mission_time, settings) + samples)
+
+
+def delta_frame() -> str:
+    """Returns a delta frame holding a few blocks of every subtype, as the telemetry process encodes it."""
+    history = TelemetryHistory(BLOCKS_PER_FRAME)
+    for mission_time in range(BLOCKS_PER_FRAME):
+        history.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(mission_time, 100810, 22000, 1234567)))
+        history.append(DataBlockSubtype.ANGULAR_VELOCITY, dict(AngularVelocityDataBlock(mission_time, 2000, 1, 2, 3)))
+        gnss = GNSSLocationBlock(mission_time, 27012345, -45312345, 43200, 80000, 550, 9000, 150, 90, 120, 9, 3)
+        history.append(DataBlockSubtype.GNSS, dict(gnss))
+        history.append(DataBlockSubtype.MPU9250_IMU, dict(mpu9250_block(mission_time)))
+    return f'{{"type":"delta","seq":1,"status":{{"mission":{{"last_mission_time":4}}}},"telemetry":{history.encode()}}}'
+
+
+def best_of(statement, number: int) -> float:
+    """Returns the fastest time per call, in microseconds, over several repeats."""
+    return min(timeit.repeat(statement, number=number, repeat=REPEATS)) / number * 1e6
+
+
+def main() -> None:
+    message = delta_frame()
+    subscriptions = [parse_subscription(command) for command in CLIENTS]
+
+    def subscribed() -> int:
+        encodings = FrameEncodings(message)
+        return sum(len(encodings.get(subscription)) for subscription in subscriptions)  # type: ignore
+
+    def unsubscribed() -> int:
+        encodings = FrameEncodings(message)
+        return sum(len(encodings.get(None)) for _ in subscriptions)  # type: ignore
+
+    print(f"{'':>14} {'bytes/frame':>12} {'time/frame':>14}")
+    print(f"{'everything':>14} {unsubscribed():>12} {best_of(unsubscribed, NUMBER):>11.1f} us")
+    print(f"{'subscribed':>14} {subscribed():>12} {best_of(subscribed, NUMBER):>11.1f} us")
+
+
+if __name__ == "__main__":
+    main()
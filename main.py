@@ -12,6 +12,8 @@ from re import sub
 import logging
 from typing import TypeAlias, Any
 from modules.misc.config import load_config
+from modules.misc.frame_counters import FrameCounters
+from modules.misc.ring_buffer import SharedRingBuffer
 
 from modules.misc.messages import print_cu_rocket
 from modules.serial.serial_manager import SerialManager
@@ -58,8 +60,9 @@ def main():
 
     radio_signal_report: Queue[str] = mp.Queue()  # type: ignore
     rn2483_radio_input: Queue[str] = mp.Queue()  # type: ignore
-    rn2483_radio_payloads: Queue[str] = mp.Queue()  # type: ignore
-    telemetry_json_output: Queue[JSON] = mp.Queue()  # type: ignore
+    rn2483_radio_payloads: SharedRingBuffer = SharedRingBuffer()
+    telemetry_json_output: Queue[tuple[str, str | bytes]] = mp.Queue()  # type: ignore
+    frame_counters: FrameCounters = FrameCounters()
 
     # Print display screen
     print_cu_rocket("No Name (Gas Propelled Launching Device)", VERSION)
@@ -69,7 +72,7 @@ def main():
 
     # Initialize Serial process to communicate with board
     # Incoming information comes directly from RN2483 LoRa radio module over serial UART
-    # Outputs information in hexadecimal payload format to rn2483_radio_payloads
+    # Outputs information in binary payload format to rn2483_radio_payloads
     serial = Process(
         target=SerialManager,
         args=(
@@ -97,6 +100,7 @@ def main():
             telemetry_json_output,
             telemetry_ws_commands,
             config,
+            frame_counters,
         ),
     )
     telemetry.start()
@@ -106,24 +110,24 @@ def main():
     # This is PURELY a pass through of data for connectivity. No format conversion is done here.
     # Incoming information comes from telemetry_json_output from telemetry
     # Outputs information to connected websocket clients
-    websocket = Process(target=WebSocketHandler, args=(telemetry_json_output, ws_commands), daemon=True)
+    websocket = Process(target=WebSocketHandler, args=(telemetry_json_output, ws_commands, frame_counters), daemon=True)
     websocket.start()
     logger.info(f"{'WebSocket':.<13} started.")
 
     while True:
         # Messages sent to main process for handling
 
-        # WS Commands
-        while not ws_commands.empty():
-            try:
-                parse_ws_command(ws_commands.get(), serial_ws_commands, telemetry_ws_commands)
-            except ShutdownException:
-                logger.info("Ground Station shutting down...")
-                serial.terminate()
-                telemetry.terminate()
-                websocket.terminate()
-                logger.info("Ground Station shutdown.")
-                exit(0)
+        # WS Commands (blocks until a command arrives)
+        ws_cmd = ws_commands.get()
+        try:
+            parse_ws_command(ws_cmd, serial_ws_commands, telemetry_ws_commands)
+        except ShutdownException:
+            logger.info("Ground Station shutting down...")
+            serial.terminate()
+            telemetry.terminate()
+            websocket.terminate()
+            logger.info("Ground Station shutdown.")
+            exit(0)
 
 
 def parse_ws_command(ws_cmd: str, serial_commands: Queue[list[str]], telemetry_commands: Queue[list[str]]) -> None:
@@ -7,6 +7,8 @@ from dataclasses import dataclass, field
 from enum import StrEnum
 from typing import Any, Self
 
+from modules.telemetry.block import DataBlockSubtype
+
 # Constants (note that trailing +1 is for inclusivity in range() object)
 POWER_RANGE: tuple[int, int] = (-3, 16 + 1)
 VALID_SPREADING_FACTORS: list[int] = [7, 8, 9, 10, 11, 12]
@@ -15,6 +17,7 @@ SYNC_RANGE: tuple[int, int] = (0, 256 + 1)
 PREAMBLE_RANGE: tuple[int, int] = (0, 65_535 + 1)
 LF_RANGE: tuple[int, int] = (433_050_000, 434_790_000 + 1)
 HF_RANGE: tuple[int, int] = (863_000_000, 870_000_000 + 1)
+HISTORY_SUBTYPES: list[str] = [subtype.name.lower() for subtype in DataBlockSubtype]
 
 # Types
 JSON = dict[str, Any]
@@ -36,6 +39,14 @@ class CodingRates(StrEnum):
     FOUR_EIGHTS = "4/8"
 
 
+class FsyncPolicy(StrEnum):
+    """How often mission recordings are synced to disk."""
+
+    NONE = "none"  # Left to the operating system
+    INTERVAL = "interval"  # At most once every recording sync interval
+    BLOCK = "block"  # After every write of new blocks
+
+
 @dataclass
 class RadioParameters:
 
@@ -123,6 +134,10 @@ class Config:
     """Contains settings for the ground station process."""
 
     telemetry_buffer_size: int = 20
+    telemetry_buffer_sizes: dict[str, int] = field(default_factory=dict)  # Per data block subtype overrides
+    websocket_max_rate: float = 30.0  # Most websocket frames published per second
+    recording_fsync: FsyncPolicy = FsyncPolicy.INTERVAL
+    recording_sync_interval: float = 1.0  # Seconds between syncs of mission recordings with the interval policy
     radio_parameters: RadioParameters = field(default_factory=RadioParameters)
     approved_callsigns: dict[str, str] = field(default_factory=dict)
 
@@ -130,12 +145,31 @@ class Config:
         if len(self.approved_callsigns) == 0:
             raise ValueError("You must provide at least one approved callsign.")
 
+        if self.telemetry_buffer_size < 1:
+            raise ValueError(f"Telemetry buffer size '{self.telemetry_buffer_size}' must be at least 1")
+
+        for subtype, size in self.telemetry_buffer_sizes.items():
+            if subtype not in HISTORY_SUBTYPES:
+                raise ValueError(f"Telemetry buffer subtype '{subtype}' invalid; must be one of {HISTORY_SUBTYPES}")
+            if size < 1:
+                raise ValueError(f"Telemetry buffer size '{size}' for '{subtype}' must be at least 1")
+
+        if self.websocket_max_rate <= 0:
+            raise ValueError(f"Websocket max rate '{self.websocket_max_rate}' must be greater than 0")
+
+        if self.recording_sync_interval <= 0:
+            raise ValueError(f"Recording sync interval '{self.recording_sync_interval}' must be greater than 0")
+
     @classmethod
     def from_json(cls, data: JSON) -> Self:
         """Creates a new Config object from the JSON data contained in the user config file."""
 
         return cls(
             telemetry_buffer_size=data.get("telemetry_buffer_size", int(20)),
+            telemetry_buffer_sizes=data.get("telemetry_buffer_sizes", dict()),  # type:ignore
+            websocket_max_rate=data.get("websocket_max_rate", 30.0),
+            recording_fsync=FsyncPolicy(data.get("recording_fsync", "interval")),
+            recording_sync_interval=data.get("recording_sync_interval", 1.0),
             radio_parameters=RadioParameters.from_json(data.get("radio_params", dict())),  # type:ignore
             approved_callsigns=data.get("approved_callsigns", dict()),  # type:ignore
         )
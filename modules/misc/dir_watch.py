@@ -0,0 +1,188 @@
+# Watches a folder for files that are added, removed or finish being written
+# On Linux the kernel reports changes through inotify. Elsewhere, or when inotify is not available, a thread polls the
+# folder instead. Either way the watcher exposes a file descriptor or pipe that becomes readable when there are changes,
+# so a process can sleep on it alongside its queues with wait_for_queues
+
+# Imports
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import threading
+from abc import ABC, abstractmethod
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from pathlib import Path
+from typing import Iterator
+
+# Constants
+POLL_INTERVAL: float = 2.0
+INOTIFY_EVENT: struct.Struct = struct.Struct("iIII")  # wd, mask, cookie, len, followed by len bytes of name
+READ_SIZE: int = 64 * 1024
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE: int = 0x00000008  # A file opened for writing was closed, i.e. a recording finished
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+WATCH_MASK: int = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+logger = logging.getLogger(__name__)
+
+
+class DirectoryWatcher(ABC):
+    """
+    Reports the names of the files with the given suffix that were added, removed or finished being written in a
+    folder. Files that are still being written are only reported once they are complete.
+    """
+
+    def __init__(self, directory: Path, suffix: str):
+        self.directory: Path = directory
+        self.suffix: str = suffix
+        self._reader: Connection | int = -1  # Readable when there are changes, named like multiprocessing queues
+
+    @abstractmethod
+    def changes(self) -> set[str] | None:
+        """
+        Returns the names of the files that changed since the last call, without blocking.
+        Returns:
+            None if changes were lost, in which case the whole folder must be scanned again.
+        """
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stops watching the folder."""
+
+    def watched(self, name: str) -> bool:
+        return name.endswith(self.suffix)
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Watches a folder using the inotify interface of the Linux kernel."""
+
+    def __init__(self, directory: Path, suffix: str):
+        super().__init__(directory, suffix)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        self.fd: int = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Can not watch {directory}")
+        self._reader = self.fd
+
+    def events(self, data: bytes) -> Iterator[tuple[int, str]]:
+        """Yields the mask and file name of every event in the data read from the inotify file descriptor."""
+
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\x00"))
+            offset += length
+            yield mask, name
+
+    def changes(self) -> set[str] | None:
+        names: set[str] = set()
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return names
+
+            for mask, name in self.events(data):
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning(f"Missed changes to {self.directory}, scanning it again")
+                    return None
+                if self.watched(name):
+                    names.add(name)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher(DirectoryWatcher):
+    """
+    Watches a folder by listing it from a thread every poll interval. A file is only reported once its size and
+    modification time stayed the same for a whole interval, since there is no way to tell when it was closed.
+    """
+
+    def __init__(self, directory: Path, suffix: str, poll_interval: float = POLL_INTERVAL):
+        super().__init__(directory, suffix)
+        self.poll_interval: float = poll_interval
+        self.reader, self.writer = Pipe(duplex=False)
+        self._reader = self.reader
+
+        self.pending: set[str] = set()
+        self.lock: threading.Lock = threading.Lock()
+        self.stopped: threading.Event = threading.Event()
+
+        self.reported: dict[str, tuple[int, int]] = self.listing()  # Files are known as they were when watching began
+        self.thread: threading.Thread = threading.Thread(target=self.poll, name="directory watcher", daemon=True)
+        self.thread.start()
+
+    def listing(self) -> dict[str, tuple[int, int]]:
+        """Returns the size and modification time of every watched file in the folder."""
+
+        files: dict[str, tuple[int, int]] = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if self.watched(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def poll(self) -> None:
+        previous = self.reported
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                current = self.listing()
+            except OSError as e:
+                logger.warning(f"Could not list {self.directory}: {e}")
+                continue
+
+            # Files that settled since they were last reported, and files that were removed
+            changed = {name for name, stat in current.items() if stat == previous.get(name) != self.reported.get(name)}
+            changed |= self.reported.keys() - current.keys()
+            previous = current
+            if not changed:
+                continue
+
+            for name in changed:
+                if name in current:
+                    self.reported[name] = current[name]
+                else:
+                    del self.reported[name]
+
+            with self.lock:
+                # A single wake-up is written until the changes are read
+                if not self.pending:
+                    self.writer.send_bytes(b"\x00")
+                self.pending |= changed
+
+    def changes(self) -> set[str] | None:
+        with self.lock:
+            while self.reader.poll():
+                _ = self.reader.recv_bytes()
+            names, self.pending = self.pending, set()
+        return names
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.reader.close()
+        self.writer.close()
+
+
+def watch_directory(directory: Path, suffix: str) -> DirectoryWatcher:
+    """Returns an inotify watcher for the folder, or a polling watcher if inotify is not available."""
+
+    try:
+        return InotifyWatcher(directory, suffix)
+    except (OSError, AttributeError, TypeError) as e:
+        logger.info(f"inotify is not available ({e}), polling {directory} every {POLL_INTERVAL}s instead")
+        return PollingWatcher(directory, suffix)
@@ -0,0 +1,40 @@
+# Counters of the websocket frames the telemetry process publishes, kept in shared memory
+# Telemetry coalesces the updates to its state into frames published at a capped rate. It counts both here, so that the
+# websocket process can report how many updates were saved from being sent, without a message per frame
+
+# Imports
+import multiprocessing as mp
+
+# Constants
+UPDATES: int = 0
+FRAMES: int = 1
+
+
+class FrameCounters:
+    """
+    The number of websocket state updates made by the telemetry process, and of the frames it published for them. Only
+    the telemetry process writes the counters, any process it was passed to may read them.
+    """
+
+    def __init__(self) -> None:
+        self.values = mp.RawArray("Q", 2)
+
+    @property
+    def updates(self) -> int:
+        return self.values[UPDATES]
+
+    @updates.setter
+    def updates(self, value: int) -> None:
+        self.values[UPDATES] = value
+
+    @property
+    def frames(self) -> int:
+        return self.values[FRAMES]
+
+    @frames.setter
+    def frames(self, value: int) -> None:
+        self.values[FRAMES] = value
+
+    def stats(self) -> dict[str, int]:
+        """Returns the counters for monitoring."""
+        return {"updates": self.updates, "frames": self.frames}
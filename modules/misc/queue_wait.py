@@ -0,0 +1,70 @@
+# Blocking wait utilities for the multiprocessing queues shared between processes
+# Lets a process sleep until any one of its input queues has data, instead of busy-polling Queue.empty()
+
+# Imports
+import os
+import signal
+from multiprocessing.connection import Connection, wait
+from queue import Queue
+from typing import Any, Sequence, TypeVar
+
+from modules.misc.dir_watch import DirectoryWatcher
+from modules.misc.ring_buffer import SharedRingBuffer
+
+
+class SignalWakeup:
+    """
+    Lets a process waiting on its queues wake up to run its signal handlers. The kernel may deliver a signal to any
+    thread of the process, such as a queue feeder thread, in which case the main thread would sleep on in its wait
+    without running the handler. Every signal received is written to a pipe that can be waited on like a queue instead.
+    Must be set up from the main thread.
+    """
+
+    def __init__(self):
+        self._reader, self.writer = os.pipe()  # Named like multiprocessing queues
+        os.set_blocking(self._reader, False)
+        os.set_blocking(self.writer, False)
+        _ = signal.set_wakeup_fd(self.writer)
+
+    def clear(self) -> None:
+        """Empties the pipe once the wait returned, since the signal handlers run as soon as the main thread wakes."""
+
+        try:
+            while os.read(self._reader, 512):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        _ = signal.set_wakeup_fd(-1)
+        os.close(self._reader)
+        os.close(self.writer)
+
+
+# Types
+Q = TypeVar("Q", bound=Queue[Any] | SharedRingBuffer | DirectoryWatcher | SignalWakeup)
+
+
+def queue_reader(queue: Queue[Any] | SharedRingBuffer | DirectoryWatcher | SignalWakeup) -> Connection | int:
+    """Returns the connection or file descriptor that a process reads from when getting items from the passed queue."""
+
+    # multiprocessing.Queue objects read from a pipe connection, which can be waited on like any other file handle
+    # SharedRingBuffer and SignalWakeup expose their wake-up pipe under the same name, and DirectoryWatcher its file
+    # descriptor
+    try:
+        return getattr(queue, "_reader")
+    except AttributeError:
+        raise TypeError(
+            f"Cannot wait on {type(queue).__name__}, only multiprocessing queues and ring buffers are supported."
+        )
+
+
+def wait_for_queues(queues: Sequence[Q], timeout: float | None = None) -> list[Q]:
+    """
+    Blocks until at least one of the passed queues has data available, or until the timeout (in seconds) expires.
+    Returns the queues that are ready to be read from; an empty list means that the wait timed out.
+    """
+
+    readers: dict[Connection | int, Q] = {queue_reader(queue): queue for queue in queues}
+    ready = wait(list(readers), timeout)
+    return [readers[reader] for reader in ready]  # type: ignore
@@ -0,0 +1,155 @@
+# Single-producer/single-consumer ring buffer in shared memory for passing byte frames between processes
+# Frames are copied straight into shared memory instead of being pickled and written through a pipe per frame
+
+# Imports
+import multiprocessing as mp
+import struct
+import time
+from multiprocessing import util
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty, Full
+from typing import Any
+
+# Constants
+DEFAULT_CAPACITY: int = 1 << 20  # 1 MiB of frame storage
+FULL_RETRY_INTERVAL: float = 0.001  # Seconds a blocked producer sleeps before checking for space again
+WAKE_UP: bytes = b"\x01"
+
+INDEX = struct.Struct("<Q")  # Head and tail are free-running byte counters
+HEAD_OFFSET: int = 0  # Written only by the producer
+TAIL_OFFSET: int = INDEX.size  # Written only by the consumer
+DATA_OFFSET: int = 2 * INDEX.size
+FRAME_LENGTH = struct.Struct("<I")
+
+
+def _release(shm: SharedMemory) -> None:
+    """Closes and removes the shared memory block."""
+    shm.close()
+    shm.unlink()
+
+
+class SharedRingBuffer:
+    """
+    A single-producer/single-consumer queue of length-prefixed byte frames stored in shared memory.
+
+    The put/get/empty interface matches the multiprocessing queues it replaces. The producer only rings a wake-up pipe
+    when the consumer has caught up with it, and that pipe is exposed as _reader like a multiprocessing queue so that
+    the consumer can block on it with wait_for_queues. empty() and get() may only be called by the consumer, and put()
+    only by the producer.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity: int = capacity
+        self._shm: SharedMemory = SharedMemory(create=True, size=DATA_OFFSET + capacity)
+        self._shm.buf[:DATA_OFFSET] = bytes(DATA_OFFSET)
+        self._reader: Connection
+        self._writer: Connection
+        self._reader, self._writer = mp.Pipe(duplex=False)
+
+        # The creating process removes the shared memory block when it exits or closes the buffer
+        self._finalizer: util.Finalize | None = util.Finalize(self, _release, args=(self._shm,), exitpriority=0)
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "name": self._shm.name,
+            "reader": self._reader,
+            "writer": self._writer,
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.capacity = state["capacity"]
+        self._shm = SharedMemory(name=state["name"])
+        self._reader = state["reader"]
+        self._writer = state["writer"]
+        self._finalizer = None
+
+    def close(self) -> None:
+        """Releases the shared memory block. Only has an effect in the process that created the buffer."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def _load(self, offset: int) -> int:
+        return INDEX.unpack_from(self._shm.buf, offset)[0]
+
+    def _store(self, offset: int, value: int) -> None:
+        INDEX.pack_into(self._shm.buf, offset, value)
+
+    def _write(self, position: int, data: bytes | memoryview) -> None:
+        """Copies data into the ring starting at the given free-running position, wrapping around the end."""
+        start = DATA_OFFSET + (position % self.capacity)
+        first = min(len(data), DATA_OFFSET + self.capacity - start)
+        self._shm.buf[start : start + first] = data[:first]
+        if first < len(data):
+            self._shm.buf[DATA_OFFSET : DATA_OFFSET + len(data) - first] = data[first:]
+
+    def _read(self, position: int, length: int) -> bytes:
+        """Copies length bytes out of the ring starting at the given free-running position."""
+        start = DATA_OFFSET + (position % self.capacity)
+        first = min(length, DATA_OFFSET + self.capacity - start)
+        if first == length:
+            return bytes(self._shm.buf[start : start + length])
+        return bytes(self._shm.buf[start : start + first]) + bytes(
+            self._shm.buf[DATA_OFFSET : DATA_OFFSET + length - first]
+        )
+
+    def qsize(self) -> int:
+        """Returns the number of bytes currently stored in the ring, including frame length prefixes."""
+        return self._load(HEAD_OFFSET) - self._load(TAIL_OFFSET)
+
+    def put(self, frame: bytes, block: bool = True, timeout: float | None = None) -> None:
+        """
+        Appends a frame to the ring. If there is no room, waits for the consumer to make some when blocking, otherwise
+        raises queue.Full.
+        """
+
+        size = FRAME_LENGTH.size + len(frame)
+        if size > self.capacity:
+            raise ValueError(f"Frame of {len(frame)} bytes does not fit in a {self.capacity} byte ring buffer.")
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        head = self._load(HEAD_OFFSET)
+        while self.capacity - (head - self._load(TAIL_OFFSET)) < size:
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise Full
+            time.sleep(FULL_RETRY_INTERVAL)
+
+        self._write(head, FRAME_LENGTH.pack(len(frame)))
+        self._write(head + FRAME_LENGTH.size, memoryview(frame))
+        self._store(HEAD_OFFSET, head + size)  # Publish the frame only once it is fully written
+
+        # Ring the consumer only if it had caught up before this frame, since that is the only time it may be waiting
+        if self._load(TAIL_OFFSET) == head:
+            self._writer.send_bytes(WAKE_UP)
+
+    def empty(self) -> bool:
+        """Returns True if there are no frames waiting to be read."""
+
+        if self._load(HEAD_OFFSET) != self._load(TAIL_OFFSET):
+            return False
+
+        # Clear stale wake-ups before checking again, so a frame published after the check still wakes the consumer
+        while self._reader.poll():
+            _ = self._reader.recv_bytes()
+        return self._load(HEAD_OFFSET) == self._load(TAIL_OFFSET)
+
+    def get(self, block: bool = True, timeout: float | None = None) -> bytes:
+        """Removes and returns the oldest frame. Raises queue.Empty if none arrives in time or if not blocking."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.empty():
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not block or not self._reader.poll(remaining):
+                raise Empty
+
+        tail = self._load(TAIL_OFFSET)
+        length = FRAME_LENGTH.unpack(self._read(tail, FRAME_LENGTH.size))[0]
+        frame = self._read(tail + FRAME_LENGTH.size, length)
+        self._store(TAIL_OFFSET, tail + FRAME_LENGTH.size + length)
+        return frame
+
+    def clear(self) -> None:
+        """Discards all frames in the ring. Only safe to call once the producer has stopped."""
+        self._store(TAIL_OFFSET, self._load(HEAD_OFFSET))
+        _ = self.empty()
@@ -11,6 +11,7 @@ from queue import Queue
 from multiprocessing import Process, active_children
 from serial import Serial, SerialException
 from modules.misc.config import Config
+from modules.misc.ring_buffer import SharedRingBuffer
 from modules.serial.serial_rn2483_radio import SerialRN2483Radio
 from modules.serial.serial_rn2483_emulator import SerialRN2483Emulator
 from signal import signal, SIGTERM
@@ -33,7 +34,7 @@ class SerialManager(Process):
         serial_ws_commands: Queue[list[str]],
         radio_signal_report: Queue[str],
         rn2483_radio_input: Queue[str],
-        rn2483_radio_payloads: Queue[str],
+        rn2483_radio_payloads: SharedRingBuffer,
         config: Config,
     ):
         super().__init__()
@@ -45,7 +46,7 @@ class SerialManager(Process):
         self.radio_signal_report: Queue[str] = radio_signal_report
 
         self.rn2483_radio_input: Queue[str] = rn2483_radio_input
-        self.rn2483_radio_payloads: Queue[str] = rn2483_radio_payloads
+        self.rn2483_radio_payloads: SharedRingBuffer = rn2483_radio_payloads
         self.rn2483_radio: Process | None = None
 
         self.config = config
@@ -60,9 +61,8 @@ class SerialManager(Process):
 
     def run(self):
         while True:
-            while not self.serial_ws_commands.empty():
-                ws_cmd = self.serial_ws_commands.get()
-                self.parse_ws_command(ws_cmd)
+            ws_cmd = self.serial_ws_commands.get()  # Blocks until a command arrives
+            self.parse_ws_command(ws_cmd)
 
     def parse_ws_command(self, ws_cmd: list[str]):
         """Parses the serial websocket commands"""
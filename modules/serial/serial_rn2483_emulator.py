@@ -7,18 +7,22 @@
 import random
 import struct
 import time
-from queue import Queue
+from queue import Full, Queue
 from multiprocessing import Process
 from datetime import datetime
 
+from modules.misc.ring_buffer import SharedRingBuffer
+
 
 class SerialRN2483Emulator(Process):
-    def __init__(self, serial_status: Queue[str], radio_signal_report: Queue[str], rn2483_radio_payloads: Queue[str]):
+    def __init__(
+        self, serial_status: Queue[str], radio_signal_report: Queue[str], rn2483_radio_payloads: SharedRingBuffer
+    ):
         super().__init__()
 
         self.serial_status: Queue[str] = serial_status
 
-        self.rn2483_radio_payloads: Queue[str] = rn2483_radio_payloads
+        self.rn2483_radio_payloads: SharedRingBuffer = rn2483_radio_payloads
         self.radio_signal_report: Queue[str] = radio_signal_report
 
         # Emulation Variables
@@ -53,17 +57,20 @@ class SerialRN2483Emulator(Process):
 
         self.altitude += random.uniform(0, 4)
 
-        packet_call_sign = b"Devils".hex()
-        six_byte_spacer = b"      ".hex()  # Should be packet header data!!!
-        packet_header = f"{packet_call_sign}{six_byte_spacer}"
-        block_header = "840C0000"  # Should be struct generated header data!!!
+        packet_call_sign = b"Devils"
+        six_byte_spacer = b"      "  # Should be packet header data!!!
+        packet_header = packet_call_sign + six_byte_spacer
+        block_header = bytes.fromhex("840C0000")  # Should be struct generated header data!!!
 
         offset = datetime.now() - self.startup_time
 
-        # self.rn2483_radio_payloads.put(f"{packet_header}{block_header}{'E01F00008D540100BC57FF0010FEFFFF'}")
+        # byte_contents = bytes.fromhex("E01F00008D540100BC57FF0010FEFFFF")
         formatted_secs = int(offset.total_seconds() * 1000)
         formatted_temp = int(87181 + self.temp * 50)
         formatted_temp2 = int(self.temp * 1000)
         formatted_alt = int(self.altitude * 1000)
         byte_contents = struct.pack("<Iiii", formatted_secs, formatted_temp, formatted_temp2, formatted_alt)
-        self.rn2483_radio_payloads.put(f"{packet_header}{block_header}{byte_contents.hex().upper()}")
+        try:
+            self.rn2483_radio_payloads.put(packet_header + block_header + byte_contents, block=False)
+        except Full:
+            pass  # Drop the payload like a real radio would if telemetry has fallen behind
@@ -8,14 +8,16 @@
 # Zacchaeus Liang
 
 # Imports
+import binascii
 import time
 import logging
-from queue import Queue
+from queue import Full, Queue
 from multiprocessing import Process
 from typing import Optional
 from serial import Serial, SerialException, EIGHTBITS, PARITY_NONE
 
 from modules.misc.config import RadioParameters
+from modules.misc.ring_buffer import SharedRingBuffer
 
 # Constants
 MODULATION_MODES: list[str] = ["lora", "fsk"]
@@ -40,6 +42,7 @@ SETTING_KW: dict[str, str] = {
     "iqi": "iqi",
     "sync_word": "sync",
 }
+RADIO_RX_PREFIX: bytes = b"radio_rx"  # Prefix of received radio transmissions on the UART line
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -52,7 +55,7 @@ class SerialRN2483Radio(Process):
         serial_status: Queue[str],
         radio_signal_report: Queue[str],
         rn2483_radio_input: Queue[str],
-        rn2483_radio_payloads: Queue[str],
+        rn2483_radio_payloads: SharedRingBuffer,
         serial_port: str,
         settings: RadioParameters,
     ):
@@ -61,7 +64,7 @@ class SerialRN2483Radio(Process):
         self.serial_status: Queue[str] = serial_status
         self.radio_signal_report: Queue[str] = radio_signal_report
         self.rn2483_radio_input: Queue[str] = rn2483_radio_input
-        self.rn2483_radio_payloads: Queue[str] = rn2483_radio_payloads
+        self.rn2483_radio_payloads: SharedRingBuffer = rn2483_radio_payloads
 
         self.serial_port = serial_port
         self.settings = settings
@@ -221,15 +224,29 @@ class SerialRN2483Radio(Process):
     def check_for_transmissions(self) -> None:
         """Checks for new transmissions on the line."""
 
-        message = str(self.serial.readline())
+        message = self.serial.readline()
 
-        if message == "b''":
+        if not message:
             logger.info("Nothing received.")
             return
         logger.debug(f"Received a serial message: {message}")
-        message = message[10:-5]  # Trim unnecessary elements of the message
-        logger.debug(f"Cleaned serial message: {message}")
-        self.rn2483_radio_payloads.put(message)  # Put serial message in data queue for telemetry
+
+        if not message.startswith(RADIO_RX_PREFIX):
+            logger.warning(f"Unexpected serial message: {message}")
+            return
+
+        # The transmission is hex encoded on the UART line; this is the only place it is decoded
+        try:
+            payload = binascii.unhexlify(message[len(RADIO_RX_PREFIX) :].strip())
+        except binascii.Error:
+            logger.error(f"Could not decode serial message: {message}")
+            return
+
+        # Put raw payload in data buffer for telemetry, without stalling the serial line if telemetry has fallen behind
+        try:
+            self.rn2483_radio_payloads.put(payload, block=False)
+        except Full:
+            logger.warning("Telemetry payload buffer full, dropping radio payload.")
 
     def _tx(self, data: str) -> None:
         """
@@ -4,6 +4,14 @@ from enum import IntEnum
 from typing import Self
 import struct
 
+# Constants
+PACKET_HEADER_LENGTH: int = 12  # Length of a radio packet header in bytes
+BLOCK_HEADER_LENGTH: int = 4  # Length of a radio block header in bytes
+
+# Header layouts, compiled once so that parsing a header is a single unpack_from call
+PACKET_HEADER_FORMAT: struct.Struct = struct.Struct(">6sI")  # Call sign, then bit fields packed MSB first
+BLOCK_HEADER_FORMAT: struct.Struct = struct.Struct("<I")
+
 
 class BlockException(Exception):
     pass
@@ -104,7 +112,7 @@ class DiagnosticDataBlockSubtype(IntEnum):
     INCOMING_RADIO_PACKET = 0x2
 
 
-@dataclass
+@dataclass(slots=True)
 class PacketHeader:
     """Represents a packet header."""
 
@@ -121,13 +129,22 @@ class PacketHeader:
         Returns:
             A newly constructed packet header object.
         """
-        header = bin(int(payload, 16))[2:]
+        return cls.from_buffer(bytes.fromhex(payload))
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int = 0) -> Self:
+        """
+        Constructs a new packet header from a binary buffer, starting at the given byte offset.
+        Returns:
+            A newly constructed packet header object.
+        """
+        callsign, fields = PACKET_HEADER_FORMAT.unpack_from(buffer, offset)
         return cls(
-            callsign=bytes.fromhex(payload[:12]).decode("utf-8").upper(),
-            length=(int(header[47:53], 2) + 1) * 4,
-            version=int(header[53:58], 2),
-            src_addr=int(header[63:67], 2),
-            packet_num=int(header[67:79], 2),
+            callsign=callsign.decode("utf-8").upper(),
+            length=(((fields >> 26) & 0x3F) + 1) * 4,
+            version=(fields >> 21) & 0x1F,
+            src_addr=(fields >> 12) & 0xF,
+            packet_num=fields & 0xFFF,
         )
 
     def __len__(self) -> int:
@@ -138,7 +155,7 @@ class PacketHeader:
         return self.length
 
 
-@dataclass
+@dataclass(slots=True)
 class BlockHeader:
     """Represents a header for a telemetry block."""
 
@@ -155,7 +172,16 @@ class BlockHeader:
         Returns:
             A newly constructed block header.
         """
-        unpacked_header: int = struct.unpack("<I", bytes.fromhex(payload))[0]
+        return cls.from_buffer(bytes.fromhex(payload))
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int = 0) -> Self:
+        """
+        Constructs a block header object from a binary buffer, starting at the given byte offset.
+        Returns:
+            A newly constructed block header.
+        """
+        unpacked_header: int = BLOCK_HEADER_FORMAT.unpack_from(buffer, offset)[0]
         return cls(
             length=((unpacked_header & 0x1F) + 1) * 4,
             has_crypto=bool((unpacked_header >> 5) & 0x1),
@@ -0,0 +1,188 @@
+# Catalog of the mission recordings available for replay
+# Reading the details of a recording means finding its superblock and the last mission time of every flight, which
+# comes from the time index of the recording. The details are cached in a sidecar file in the missions folder, keyed by
+# the name, size and modification time of each recording. Only recordings that are new or changed since the last scan
+# are read again. Recordings made with the old SD block header length, or left with blocks past the end of their last
+# flight, are flagged for repair. Reading the catalog never changes a recording.
+
+# Imports
+import json
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterable, Self
+
+from modules.telemetry.json_packets import MISSION_EXTENSION, MissionEntry
+from modules.telemetry.recovery import needs_repair
+from modules.telemetry.superblock import SuperBlock, find_superblock
+from modules.telemetry.time_index import time_index
+
+# Constants
+CATALOG_FILE: str = ".catalog.json"
+CATALOG_VERSION: int = 2
+
+logger = logging.getLogger(__name__)
+
+
+def read_mission(mission_file: Path, save_index: bool = True) -> MissionEntry | None:
+    """
+    Reads the details of a mission recording, or returns None if the file is not a valid recording. The recording is
+    indexed if it has no up to date time index, which is saved unless save_index is False.
+    """
+
+    # Find superblock from file
+    superblock_result = find_superblock(mission_file)
+    if superblock_result is None:
+        logger.warning(f"Could not find superblock in {mission_file.name}. Not adding to mission list.")
+        return None
+    sb_addr, mission_sb = superblock_result
+
+    if type(mission_sb) is not SuperBlock:
+        logger.warning(f"{mission_file.name} invalid. Not adding to mission list.")
+        return None
+
+    if len(mission_sb.flights) == 0:
+        logger.warning(f"Flight list for {mission_file.name} is empty. Not adding to mission list.")
+        return None
+
+    # Last mission time of every flight
+    try:
+        mission_time = time_index(mission_file, sb_addr, mission_sb, save=save_index).mission_length
+    except (OSError, ValueError) as e:
+        logger.info(f"Unable to index {mission_file.name}, defaulting to -1: {e}")
+        mission_time = -1
+
+    return MissionEntry(name=mission_file.stem, length=mission_time, epoch=mission_sb.flights[0].timestamp)
+
+
+@dataclass
+class CatalogEntry:
+    """The details of a mission recording, as of the file size and modification time they were read at."""
+
+    size: int
+    mtime_ns: int
+    mission: MissionEntry | None  # None if the file is not a valid recording, so that it is not read again either
+
+    def __iter__(self):
+        yield "size", self.size
+        yield "mtime_ns", self.mtime_ns
+        yield "mission", None if self.mission is None else dict(self.mission)
+
+    @classmethod
+    def from_json(cls, entry: dict[str, Any]) -> Self:
+        mission = entry["mission"]
+        return cls(
+            size=entry["size"],
+            mtime_ns=entry["mtime_ns"],
+            mission=None if mission is None else MissionEntry(**mission),
+        )
+
+    def matches(self, stat: os.stat_result) -> bool:
+        """Returns True if the recording has not changed since its details were read."""
+        return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+
+class MissionCatalog:
+    """The mission recordings in a folder, read through the sidecar cache of the folder."""
+
+    def __init__(self, missions_dir: Path):
+        self.missions_dir: Path = missions_dir
+        self.path: Path = missions_dir.joinpath(CATALOG_FILE)
+        self.entries: dict[str, CatalogEntry] = self.load()
+        self.recording: str | None = None  # The recording being written, which is not flagged for repair
+
+    def load(self) -> dict[str, CatalogEntry]:
+        """Returns the cached entries of the sidecar file, or no entries if it is missing, outdated or corrupt."""
+
+        try:
+            with open(self.path, "r") as file:
+                catalog = json.load(file)
+            if catalog["version"] != CATALOG_VERSION:
+                return {}
+            return {name: CatalogEntry.from_json(entry) for name, entry in catalog["missions"].items()}
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable mission catalog {self.path}: {e}")
+            return {}
+
+    def save(self) -> None:
+        """Writes the entries to the sidecar file, replacing it in one step so that it is never left half written."""
+
+        catalog = {"version": CATALOG_VERSION, "missions": {name: dict(entry) for name, entry in self.entries.items()}}
+        temporary = self.path.with_suffix(".tmp")
+        try:
+            with open(temporary, "w") as file:
+                json.dump(catalog, file)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write mission catalog {self.path}: {e}")
+
+    def scan(self) -> list[MissionEntry]:
+        """
+        Returns the valid mission recordings of the folder, sorted by name. Only the recordings that are new or have
+        changed since they were last read are opened.
+        """
+
+        entries: dict[str, CatalogEntry] = {}
+        changed = False
+        for mission_file in sorted(self.missions_dir.glob(f"*.{MISSION_EXTENSION}")):
+            if not mission_file.is_file():
+                continue
+
+            entry = self.entries.get(mission_file.name)
+            if entry is None or not entry.matches(mission_file.stat()):
+                entry = self.read(mission_file)
+                changed = True
+            entries[mission_file.name] = entry
+
+        # Recordings that were removed are dropped from the cache too
+        if changed or entries.keys() != self.entries.keys():
+            self.entries = entries
+            self.save()
+
+        return self.missions()
+
+    def update(self, names: Iterable[str]) -> bool:
+        """
+        Reads the named recordings again if they were added or changed, and drops them if they were removed, without
+        listing the rest of the folder.
+        Returns:
+            True if the catalog changed.
+        """
+
+        changed = False
+        for name in names:
+            mission_file = self.missions_dir.joinpath(name)
+            try:
+                stat = mission_file.stat()
+            except FileNotFoundError:
+                changed |= self.entries.pop(name, None) is not None
+                continue
+
+            entry = self.entries.get(name)
+            if entry is None or not entry.matches(stat):
+                self.entries[name] = self.read(mission_file)
+                changed = True
+
+        if changed:
+            self.save()
+        return changed
+
+    def read(self, mission_file: Path) -> CatalogEntry:
+        """Reads the details of a recording, and flags it if it needs repairing."""
+
+        # The recording being written keeps its own time index up to date as it is written
+        recording = mission_file.name == self.recording
+        stat = mission_file.stat()
+        mission = read_mission(mission_file, save_index=not recording)
+        if not recording and needs_repair(mission_file):
+            if mission is None:  # A recording whose superblock was never brought up to date has no flights to read
+                mission = MissionEntry(name=mission_file.stem, length=-1)
+            mission.repair = True
+        return CatalogEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, mission=mission)
+
+    def missions(self) -> list[MissionEntry]:
+        """Returns the valid mission recordings in the catalog, sorted by file name."""
+        return [entry.mission for _, entry in sorted(self.entries.items()) if entry.mission is not None]
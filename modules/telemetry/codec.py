@@ -0,0 +1,34 @@
+# Registry of radio block decoders, keyed by block type and subtype
+# Built once at import so that parsing a block is a single dictionary lookup on the raw header integers
+
+# Imports
+from typing import Callable, TypeAlias
+
+from modules.telemetry.block import BlockUnknownException, RadioBlockType
+from modules.telemetry.data_block import SUBTYPE_CLASSES, DataBlock
+
+# Types
+Decoder: TypeAlias = Callable[[bytes | memoryview, int, int], DataBlock]
+
+# Keys are plain integers so that lookups never construct enum members
+DECODERS: dict[tuple[int, int], Decoder] = {
+    (int(RadioBlockType.DATA), int(subtype)): block_class.from_buffer
+    for subtype, block_class in SUBTYPE_CLASSES.items()
+}
+
+
+def get_decoder(block_type: int, block_subtype: int) -> Decoder | None:
+    """Returns the decoder for the block type and subtype, or None if no decoder is registered for them."""
+    return DECODERS.get((block_type, block_subtype))
+
+
+def decode(block_type: int, block_subtype: int, buffer: bytes | memoryview, offset: int, length: int) -> DataBlock:
+    """
+    Decodes the block contents that are length bytes long and start at offset in the buffer. The contents do not
+    include the block header.
+    """
+
+    decoder = DECODERS.get((block_type, block_subtype))
+    if decoder is None:
+        raise BlockUnknownException(f"No decoder for block type {block_type} with subtype {block_subtype}.")
+    return decoder(buffer, offset, length)
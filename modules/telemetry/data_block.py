@@ -9,10 +9,50 @@ from __future__ import annotations
 import struct
 from abc import ABC, abstractmethod
 from enum import Enum, IntEnum
-from typing import Generator, Self, Type
+from functools import cached_property
+from operator import attrgetter
+from typing import Any, Generator, Iterator, Self, Type
 from modules.telemetry.block import DataBlockSubtype, BlockException, BlockUnknownException
 from modules.misc import converter
 
+# NumPy is optional; when it is installed, sensor samples are decoded a whole block at a time
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Precompiled payload formats, so that format strings are not parsed again for every block
+MISSION_TIME_FORMAT = struct.Struct("<I")
+STATUS_FORMAT = struct.Struct("<IIII")
+ALTITUDE_FORMAT = struct.Struct("<Iiii")
+ACCELERATION_FORMAT = struct.Struct("<IBBhhh")
+ANGULAR_VELOCITY_FORMAT = struct.Struct("<IHhhh")
+GNSS_LOCATION_FORMAT = struct.Struct("<IiiIihhHHHBB")
+GNSS_META_FORMAT = struct.Struct("<III")
+GNSS_SAT_INFO_FORMAT = struct.Struct("<BBH")
+KX134_HEADER_FORMAT = struct.Struct("<IH")
+KX134_8_BIT_SAMPLE_FORMAT = struct.Struct("<bbb")
+KX134_16_BIT_SAMPLE_FORMAT = struct.Struct("<hhh")
+MPU9250_HEADER_FORMAT = struct.Struct("<II")
+MPU9250_AG_FORMAT = struct.Struct(">hhhhhhh")
+MPU9250_MAG_FORMAT = struct.Struct("<hhhB")
+MPU9250_SAMPLE_LENGTH: int = MPU9250_AG_FORMAT.size + MPU9250_MAG_FORMAT.size
+PADDING: bytes = bytes(4)  # Zeroes that pad payloads to a multiple of 4 bytes
+VECTORIZE_MIN_SAMPLES: int = 8  # Below this many samples NumPy's per-call overhead outweighs decoding them one by one
+MPU9250_COLUMNS: tuple[str, ...] = (
+    "accel_x",
+    "accel_y",
+    "accel_z",
+    "temperature",
+    "gyro_x",
+    "gyro_y",
+    "gyro_z",
+    "mag_x",
+    "mag_y",
+    "mag_z",
+)
+MPU9250_MEASUREMENTS = attrgetter(*MPU9250_COLUMNS)  # Reads the measurements of an MPU9250Sample in column order
+
 
 class DataBlockException(BlockException):
     pass
@@ -38,28 +78,25 @@ class DataBlock(ABC):
     def to_payload(self) -> bytes:
         """Marshal block to a bytes object."""
 
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        """Marshals the block into the len(self) bytes of the buffer starting at offset."""
+        payload = self.to_payload()
+        buffer[offset : offset + len(payload)] = payload
+
     @classmethod
     @abstractmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int) -> DataBlock:
+        """Returns a DataBlock initialized from the length bytes of the buffer starting at offset."""
+
+    @classmethod
     def from_payload(cls, payload: bytes) -> DataBlock:
         """Returns a DataBlock initialized from a payload of bytes."""
+        return cls.from_buffer(payload, 0, len(payload))
 
     @staticmethod
     def parse(block_subtype: DataBlockSubtype, payload: bytes) -> DataBlock:
         """Unmarshal a bytes object to appropriate block class."""
 
-        SUBTYPE_CLASSES: dict[DataBlockSubtype, Type[DataBlock]] = {
-            DataBlockSubtype.DEBUG_MESSAGE: DebugMessageDataBlock,
-            DataBlockSubtype.STATUS: StatusDataBlock,
-            DataBlockSubtype.STARTUP_MESSAGE: StartupMessageDataBlock,
-            DataBlockSubtype.ALTITUDE: AltitudeDataBlock,
-            DataBlockSubtype.ACCELERATION: AccelerationDataBlock,
-            DataBlockSubtype.GNSS: GNSSLocationBlock,
-            DataBlockSubtype.GNSS_META: GNSSMetadataBlock,
-            DataBlockSubtype.MPU9250_IMU: MPU9250IMUDataBlock,
-            DataBlockSubtype.KX134_1211_ACCEL: KX134AccelerometerDataBlock,
-            DataBlockSubtype.ANGULAR_VELOCITY: AngularVelocityDataBlock,
-        }
-
         subtype = SUBTYPE_CLASSES.get(block_subtype)
 
         if subtype is None:
@@ -78,14 +115,14 @@ class DebugMessageDataBlock(DataBlock):
         return ((len(self.debug_msg.encode("utf-8")) + 3) & ~0x3) + 4
 
     @classmethod
-    def from_payload(cls, payload: bytes) -> Self:
-        mission_time = struct.unpack("<I", payload[0:4])[0]
-        return cls(mission_time, payload[4:].decode("utf-8"))
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int) -> Self:
+        mission_time = MISSION_TIME_FORMAT.unpack_from(buffer, offset)[0]
+        return cls(mission_time, bytes(buffer[offset + 4 : offset + length]).decode("utf-8"))
 
     def to_payload(self) -> bytes:
         b = self.debug_msg.encode("utf-8")
         b = b + (b"\x00" * (((len(b) + 3) & ~0x3) - len(b)))
-        return struct.pack("<I", self.mission_time) + b
+        return MISSION_TIME_FORMAT.pack(self.mission_time) + b
 
     def __str__(self):
         return f'{self.__class__.__name__} -> time: {self.mission_time} ms, message: "{self.debug_msg}"'
@@ -104,14 +141,14 @@ class StartupMessageDataBlock(DataBlock):
         return ((len(self.startup_msg.encode("utf-8")) + 3) & ~0x3) + 4
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        mission_time = struct.unpack("<I", payload[0:4])[0]
-        return StartupMessageDataBlock(mission_time, payload[4:].decode("utf-8"))
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        mission_time = MISSION_TIME_FORMAT.unpack_from(buffer, offset)[0]
+        return StartupMessageDataBlock(mission_time, bytes(buffer[offset + 4 : offset + length]).decode("utf-8"))
 
     def to_payload(self) -> bytes:
         b = self.startup_msg.encode("utf-8")
         b = b + (b"\x00" * (((len(b) + 3) & ~0x3) - len(b)))
-        return struct.pack("<I", self.mission_time) + b
+        return MISSION_TIME_FORMAT.pack(self.mission_time) + b
 
     def __str__(self):
         return f'{self.__class__.__name__} -> time: {self.mission_time} ms, message: "{self.startup_msg}"'
@@ -208,8 +245,8 @@ class StatusDataBlock(DataBlock):
         return 16
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<IIII", payload)
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = STATUS_FORMAT.unpack_from(buffer, offset)
 
         try:
             kx134_state = SensorStatus((parts[1] >> 16) & 0x7)
@@ -242,6 +279,13 @@ class StatusDataBlock(DataBlock):
 
     def to_payload(self) -> bytes:
         """Transforms a StatusData block into a byte payload."""
+        return STATUS_FORMAT.pack(*self.payload_fields())
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        STATUS_FORMAT.pack_into(buffer, offset, *self.payload_fields())
+
+    def payload_fields(self) -> tuple[int, int, int, int]:
+        """Returns the values of the payload, in STATUS_FORMAT order."""
         kx134_state = (self.kx134_state.value & 0x7) << 16
         alt_state = (self.alt_state.value & 0x7) << 19
         imu_state = (self.imu_state.value & 0x7) << 22
@@ -250,7 +294,7 @@ class StatusDataBlock(DataBlock):
 
         states = kx134_state | alt_state | imu_state | sd_state | deployment_state
 
-        return struct.pack("<IIII", self.mission_time, states, self.sd_blocks_recorded, self.sd_checkouts_missed)
+        return self.mission_time, states, self.sd_blocks_recorded, self.sd_checkouts_missed
 
     def __str__(self):
         return (
@@ -286,14 +330,19 @@ class AltitudeDataBlock(DataBlock):
         return 16
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<Iiii", payload)
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = ALTITUDE_FORMAT.unpack_from(buffer, offset)
         return AltitudeDataBlock(parts[0], parts[1], parts[2] / 1000, parts[3] / 1000)
 
     def to_payload(self) -> bytes:
-        return struct.pack(
-            "<Iiii", self.mission_time, int(self.pressure), int(self.temperature * 1000), int(self.altitude * 1000)
-        )
+        return ALTITUDE_FORMAT.pack(*self.payload_fields())
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        ALTITUDE_FORMAT.pack_into(buffer, offset, *self.payload_fields())
+
+    def payload_fields(self) -> tuple[int, int, int, int]:
+        """Returns the values of the payload, in ALTITUDE_FORMAT order."""
+        return self.mission_time, int(self.pressure), int(self.temperature * 1000), int(self.altitude * 1000)
 
     def __str__(self):
         return (
@@ -324,8 +373,8 @@ class AccelerationDataBlock(DataBlock):
         return 12
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<IBBhhh", payload)
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = ACCELERATION_FORMAT.unpack_from(buffer, offset)
         fsr = parts[1]
         x = parts[3] * (fsr / (2**15))
         y = parts[4] * (fsr / (2**15))
@@ -333,10 +382,17 @@ class AccelerationDataBlock(DataBlock):
         return AccelerationDataBlock(parts[0], fsr, x, y, z)
 
     def to_payload(self) -> bytes:
+        return ACCELERATION_FORMAT.pack(*self.payload_fields())
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        ACCELERATION_FORMAT.pack_into(buffer, offset, *self.payload_fields())
+
+    def payload_fields(self) -> tuple[int, int, int, int, int, int]:
+        """Returns the values of the payload, in ACCELERATION_FORMAT order."""
         x = round(self.x * ((2**15) / self.fsr))
         y = round(self.y * ((2**15) / self.fsr))
         z = round(self.z * ((2**15) / self.fsr))
-        return struct.pack("<IBBhhh", self.mission_time, self.fsr, 0, x, y, z)
+        return self.mission_time, self.fsr, 0, x, y, z
 
     def __str__(self):
         return (
@@ -365,8 +421,8 @@ class AngularVelocityDataBlock(DataBlock):
         return 12
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<IHhhh", payload)
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = ANGULAR_VELOCITY_FORMAT.unpack_from(buffer, offset)
         fsr = parts[1]
         x = parts[2] * (fsr / (2**15))
         y = parts[3] * (fsr / (2**15))
@@ -374,10 +430,17 @@ class AngularVelocityDataBlock(DataBlock):
         return AngularVelocityDataBlock(parts[0], fsr, x, y, z)
 
     def to_payload(self) -> bytes:
+        return ANGULAR_VELOCITY_FORMAT.pack(*self.payload_fields())
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        ANGULAR_VELOCITY_FORMAT.pack_into(buffer, offset, *self.payload_fields())
+
+    def payload_fields(self) -> tuple[int, int, int, int, int]:
+        """Returns the values of the payload, in ANGULAR_VELOCITY_FORMAT order."""
         x = round(self.x * ((2**15) / self.fsr))
         y = round(self.y * ((2**15) / self.fsr))
         z = round(self.z * ((2**15) / self.fsr))
-        return struct.pack("<IHhhh", self.mission_time, self.fsr, x, y, z)
+        return self.mission_time, self.fsr, x, y, z
 
     def __str__(self):
         return (
@@ -436,8 +499,8 @@ class GNSSLocationBlock(DataBlock):
         return 32
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<IiiIihhHHHBB", payload)
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = GNSS_LOCATION_FORMAT.unpack_from(buffer, offset)
 
         try:
             fix_type = GNSSLocationFixType(parts[11] & 0x3)
@@ -460,8 +523,14 @@ class GNSSLocationBlock(DataBlock):
         )
 
     def to_payload(self) -> bytes:
-        return struct.pack(
-            "<IiiIihhHHHBB",
+        return GNSS_LOCATION_FORMAT.pack(*self.payload_fields())
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        GNSS_LOCATION_FORMAT.pack_into(buffer, offset, *self.payload_fields())
+
+    def payload_fields(self) -> tuple[int, ...]:
+        """Returns the values of the payload, in GNSS_LOCATION_FORMAT order."""
+        return (
             self.mission_time,
             self.latitude,
             self.longitude,
@@ -539,7 +608,11 @@ class GNSSSatInfo:
 
     @classmethod
     def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<BBH", payload)
+        return cls.from_buffer(payload, 0)
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int):
+        parts = GNSS_SAT_INFO_FORMAT.unpack_from(buffer, offset)
         identifier = parts[2] & 0x1F
 
         try:
@@ -552,11 +625,17 @@ class GNSSSatInfo:
         elif sat_type == GNSSSatType.GLONASS:
             identifier = identifier + GNSSSatInfo.GLONASS_SV_OFFSET
 
-        azimuth = (parts[2] << 5) & 0x1FF
+        azimuth = (parts[2] >> 5) & 0x1FF
 
         return GNSSSatInfo(sat_type, parts[0], parts[1], identifier, azimuth)
 
     def to_payload(self) -> bytes:
+        payload = bytearray(GNSS_SAT_INFO_FORMAT.size)
+        self.pack_into(payload, 0)
+        return bytes(payload)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        """Writes the satellite info into the buffer starting at offset."""
         if self.sat_type == GNSSSatType.GPS:
             id_adjusted = self.identifier - GNSSSatInfo.GPS_SV_OFFSET
         else:
@@ -564,7 +643,7 @@ class GNSSSatInfo:
 
         id_and_azimuth = (id_adjusted & 0x1F) | ((self.azimuth & 0x1FF) << 5) | (self.sat_type << 15)
 
-        return struct.pack("<BBH", self.elevation, self.snr, id_and_azimuth)
+        GNSS_SAT_INFO_FORMAT.pack_into(buffer, offset, self.elevation, self.snr, id_and_azimuth)
 
     def __str__(self):
         return (
@@ -598,13 +677,11 @@ class GNSSMetadataBlock(DataBlock):
         return 12 + (len(self.sats_in_view) * 4)
 
     @classmethod
-    def from_payload(cls, payload: bytes):
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
         # There are 3 uint32_t variables, one for time, gps sats in use, and glonass sats in use
         # The remaining of the payload is an array for sats in view, each 4 bytes being a unique GNSSSatInfo struct
         # 12 bytes is 96 bits (3 x 32)
-        offset = 12
-
-        parts = struct.unpack("<III", payload[0:offset])
+        parts = GNSS_META_FORMAT.unpack_from(buffer, offset)
         payload_time = parts[0]
         gps_sats_in_use: list[int] = list()
         glonass_sats_in_use: list[int] = list()
@@ -618,13 +695,17 @@ class GNSSMetadataBlock(DataBlock):
                 glonass_sats_in_use.append(i + GNSSSatInfo.GLONASS_SV_OFFSET)
 
         # Check satellites in view array
-        while offset < len(payload):
-            sats_in_view.append(GNSSSatInfo.from_payload(payload[offset : offset + 4]))
-            offset += 4
+        for sat_offset in range(offset + GNSS_META_FORMAT.size, offset + length, GNSS_SAT_INFO_FORMAT.size):
+            sats_in_view.append(GNSSSatInfo.from_buffer(buffer, sat_offset))
 
         return GNSSMetadataBlock(payload_time, gps_sats_in_use, glonass_sats_in_use, sats_in_view)
 
     def to_payload(self) -> bytes:
+        payload = bytearray(len(self))
+        self.pack_into(payload, 0)
+        return bytes(payload)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
         gps_sats_in_use_bitfield = 0
         for n in self.gps_sats_in_use:
             gps_sats_in_use_bitfield |= 1 << (n - GNSSSatInfo.GPS_SV_OFFSET)
@@ -633,12 +714,12 @@ class GNSSMetadataBlock(DataBlock):
         for n in self.glonass_sats_in_use:
             glonass_sats_in_use_bitfield |= 1 << (n - GNSSSatInfo.GLONASS_SV_OFFSET)
 
-        payload = struct.pack("<III", self.mission_time, gps_sats_in_use_bitfield, glonass_sats_in_use_bitfield)
-
-        for sat in self.sats_in_view:
-            payload = payload + sat.to_payload()
+        GNSS_META_FORMAT.pack_into(
+            buffer, offset, self.mission_time, gps_sats_in_use_bitfield, glonass_sats_in_use_bitfield
+        )
 
-        return payload
+        for i, sat in enumerate(self.sats_in_view):
+            sat.pack_into(buffer, offset + GNSS_META_FORMAT.size + i * GNSS_SAT_INFO_FORMAT.size)
 
     def __str__(self):
         s = (
@@ -731,6 +812,56 @@ class KX134Resolution(IntEnum):
         return f"{self.bits} bits per sample"
 
 
+class KX134SampleArray:
+    """
+    KX134 samples stored as one NumPy array per axis, decoded and scaled a whole block at a time. Indexing and iterating
+    produce (x, y, z) tuples, so it can be used wherever a list of samples is expected.
+    """
+
+    def __init__(self, x: Any, y: Any, z: Any):
+        super().__init__()
+        self.x: Any = x
+        self.y: Any = y
+        self.z: Any = z
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, count: int, bits: int, sensitivity: float) -> Self:
+        raw = np.frombuffer(buffer, dtype=f"<i{bits // 8}", count=count * 3, offset=offset).reshape(count, 3)
+        return cls(raw[:, 0] / sensitivity, raw[:, 1] / sensitivity, raw[:, 2] / sensitivity)
+
+    @classmethod
+    def from_samples(cls, samples: list[tuple[float, float, float]]) -> Self:
+        values = np.asarray(samples, dtype=float).reshape(len(samples), 3)
+        return cls(values[:, 0], values[:, 1], values[:, 2])
+
+    def to_bytes(self, sensitivity: float, bits: int) -> bytes | None:
+        """
+        Encodes all samples at once, byte for byte the same as packing them one at a time. Returns None if any value
+        does not fit in a sample, so that the caller can fall back to packing the samples one at a time.
+        """
+
+        # Scale and truncate every sample at once, like int() does for each value
+        scaled = np.trunc(np.column_stack((self.x, self.y, self.z)) * sensitivity)
+        sample_dtype = np.dtype(f"<i{bits // 8}")
+        limits = np.iinfo(sample_dtype)
+        if scaled.size and not (scaled.min() >= limits.min and scaled.max() <= limits.max):
+            return None
+        return scaled.astype(sample_dtype).tobytes()
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, index: int) -> tuple[float, float, float]:
+        return float(self.x[index]), float(self.y[index]), float(self.z[index])
+
+    def __iter__(self) -> Iterator[tuple[float, float, float]]:
+        return zip(self.x.tolist(), self.y.tolist(), self.z.tolist())
+
+
+# Either a list of (x, y, z) tuples or, when decoded with NumPy, one array per axis
+KX134Samples = list[tuple[float, float, float]] | KX134SampleArray
+
+
 class KX134AccelerometerDataBlock(DataBlock):
     def __init__(
         self,
@@ -739,14 +870,18 @@ class KX134AccelerometerDataBlock(DataBlock):
         accel_range: KX134Range,
         rolloff: KX134LPFRolloff,
         resolution: KX134Resolution,
-        samples: list[tuple[float, float, float]],
+        samples: KX134Samples,
+        raw_samples: bytes | memoryview | None = None,
     ):
         super().__init__(DataBlockSubtype.KX134_1211_ACCEL, mission_time)
         self.odr: KX134ODR = odr
         self.accel_range: KX134Range = accel_range
         self.rolloff: KX134LPFRolloff = rolloff
         self.resolution: KX134Resolution = resolution
-        self.samples: list[tuple[float, float, float]] = samples
+        self.samples: KX134Samples = samples
+        # The little endian readings the samples were decoded from, as the sensor reported them. None for blocks built
+        # from scaled samples rather than decoded
+        self.raw_samples: bytes | memoryview | None = raw_samples
 
         self.sample_period = 1 / self.odr.samples_per_sec
 
@@ -755,8 +890,8 @@ class KX134AccelerometerDataBlock(DataBlock):
         return (sample_bytes + 6 + 3) & ~0x3
 
     @classmethod
-    def from_payload(cls, payload: bytes):
-        parts = struct.unpack("<IH", payload[0:6])
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int):
+        parts = KX134_HEADER_FORMAT.unpack_from(buffer, offset)
 
         try:
             odr = KX134ODR(parts[1] & 0xF)
@@ -774,37 +909,54 @@ class KX134AccelerometerDataBlock(DataBlock):
             raise DataBlockException(f"Invalid KX134 rolloff: {(parts[1] >> 6) & 0x1}") from error
 
         try:
-            resolution = KX134Resolution((parts[1] >> 6) & 0x1)
+            resolution = KX134Resolution((parts[1] >> 7) & 0x1)
         except ValueError as error:
             raise DataBlockException(f"Invalid KX134 res: {(parts[1] >> 7) & 0x1}") from error
 
         padding = (parts[1] >> 14) & 0x3
-        num_samples = (len(payload) - (6 + padding)) // ((resolution.bits // 8) * 3)
+        if resolution == KX134Resolution.RES_8_BIT:
+            sample_format = KX134_8_BIT_SAMPLE_FORMAT
+        else:
+            sample_format = KX134_16_BIT_SAMPLE_FORMAT
+        num_samples = max(0, (length - (KX134_HEADER_FORMAT.size + padding)) // sample_format.size)
 
-        samples: list[tuple[float, float, float]] = list()
         sensitivity = (2 ** (resolution.bits - 1)) // accel_range.acceleration
-        for i in range(num_samples):
-            if resolution == KX134Resolution.RES_8_BIT:
-                samp_start = 6 + (i * 3)
-                samp_parts = struct.unpack("<bbb", payload[samp_start : samp_start + 3])
-            else:
-                samp_start = 6 + (i * 6)
-                samp_parts = struct.unpack("<hhh", payload[samp_start : samp_start + 6])
+        samples_start = offset + KX134_HEADER_FORMAT.size
+        raw_samples = memoryview(buffer)[samples_start : samples_start + num_samples * sample_format.size]
+        if np is not None and num_samples >= VECTORIZE_MIN_SAMPLES:
+            # Scale every axis of every sample at once
+            samples_array = KX134SampleArray.from_buffer(
+                buffer, samples_start, num_samples, resolution.bits, sensitivity
+            )
+            return KX134AccelerometerDataBlock(
+                parts[0], odr, accel_range, rolloff, resolution, samples_array, raw_samples
+            )
+
+        samples: list[tuple[float, float, float]] = list()
+        for samp_start in range(samples_start, samples_start + num_samples * sample_format.size, sample_format.size):
+            samp_parts = sample_format.unpack_from(buffer, samp_start)
 
             x = samp_parts[0] / sensitivity
             y = samp_parts[1] / sensitivity
             z = samp_parts[2] / sensitivity
 
-            # print(f"i: {i}, samp_start: {samp_start}, x: {x}, y: {y}, z: {z}, samp_parts: {samp_parts}")
-
             samples.append((x, y, z))
 
-        return KX134AccelerometerDataBlock(parts[0], odr, accel_range, rolloff, resolution, samples)
+        return KX134AccelerometerDataBlock(parts[0], odr, accel_range, rolloff, resolution, samples, raw_samples)
 
     def to_payload(self) -> bytes:
         """Transforms a KX134AccelerometerDataBlock into a bytes payload."""
-        sample_bytes = len(self.samples) * int(self.resolution.bits // 8) * 3
-        padding = len(self) - (sample_bytes + 6)
+        payload = bytearray(len(self))
+        self.pack_into(payload, 0)
+        return bytes(payload)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        if self.resolution == KX134Resolution.RES_8_BIT:
+            sample_format = KX134_8_BIT_SAMPLE_FORMAT
+        else:
+            sample_format = KX134_16_BIT_SAMPLE_FORMAT
+        samples_end = KX134_HEADER_FORMAT.size + len(self.samples) * sample_format.size
+        padding = len(self) - samples_end
         odr = self.odr & 0xF
         accel_range = (self.accel_range & 0x3) << 4
         rolloff = (self.rolloff & 0x1) << 6
@@ -812,20 +964,25 @@ class KX134AccelerometerDataBlock(DataBlock):
         pad = (padding & 0x3) << 14
 
         settings = odr | accel_range | rolloff | resolution | pad
-        head = struct.pack("<IH", self.mission_time, settings)
+        KX134_HEADER_FORMAT.pack_into(buffer, offset, self.mission_time, settings)
+        buffer[offset + samples_end : offset + len(self)] = PADDING[:padding]
 
         sensitivity = (2 ** (self.resolution.bits - 1)) // self.accel_range.acceleration
-        for sample in self.samples:
+        samples = self.samples
+        if not isinstance(samples, KX134SampleArray) and np is not None and len(samples) >= VECTORIZE_MIN_SAMPLES:
+            samples = KX134SampleArray.from_samples(samples)
+        if isinstance(samples, KX134SampleArray):
+            sample_bytes = samples.to_bytes(sensitivity, self.resolution.bits)
+            if sample_bytes is not None:
+                buffer[offset + KX134_HEADER_FORMAT.size : offset + samples_end] = sample_bytes
+                return
+
+        # Values that do not fit the sample format raise struct.error here
+        for i, sample in enumerate(self.samples):
             x = int(sample[0] * sensitivity)
             y = int(sample[1] * sensitivity)
             z = int(sample[2] * sensitivity)
-
-            if self.resolution == KX134Resolution.RES_8_BIT:
-                head = head + struct.pack("<bbb", x, y, z)
-            else:
-                head = head + struct.pack("<hhh", x, y, z)
-
-        return head + (b"\x00" * padding)
+            sample_format.pack_into(buffer, offset + KX134_HEADER_FORMAT.size + i * sample_format.size, x, y, z)
 
     def gen_samples(self):
         count = len(self.samples)
@@ -1045,8 +1202,12 @@ class MPU9250Sample:
 
     @classmethod
     def from_bytes(cls, payload: bytes, accel_sense: float, gyro_sense: float) -> Self:
-        ag_parts = struct.unpack(">hhhhhhh", payload[0:14])
-        mag_parts = struct.unpack("<hhhB", payload[14:21])
+        return cls.from_buffer(payload, 0, accel_sense, gyro_sense)
+
+    @classmethod
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, accel_sense: float, gyro_sense: float) -> Self:
+        ag_parts = MPU9250_AG_FORMAT.unpack_from(buffer, offset)
+        mag_parts = MPU9250_MAG_FORMAT.unpack_from(buffer, offset + MPU9250_AG_FORMAT.size)
 
         accel_x = ag_parts[0] / accel_sense
         accel_y = ag_parts[1] / accel_sense
@@ -1070,6 +1231,12 @@ class MPU9250Sample:
         )
 
     def to_payload(self, accel_sense: float, gyro_sense: float) -> bytes:
+        payload = bytearray(MPU9250_SAMPLE_LENGTH)
+        self.pack_into(payload, 0, accel_sense, gyro_sense)
+        return bytes(payload)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int, accel_sense: float, gyro_sense: float) -> None:
+        """Writes the sample into the buffer starting at offset."""
         accel_x = int(self.accel_x * accel_sense)
         accel_y = int(self.accel_y * accel_sense)
         accel_z = int(self.accel_z * accel_sense)
@@ -1085,9 +1252,8 @@ class MPU9250Sample:
         mag_z = int(self.mag_z * self.mag_res.sensitivity)
         mag_flags = (int(self.mag_ovf) << 4) | (self.mag_res.value << 3)
 
-        ag_bytes = struct.pack(">hhhhhhh", accel_x, accel_y, accel_z, temperature, gyro_x, gyro_y, gyro_z)
-        mag_bytes = struct.pack("<hhhB", mag_x, mag_y, mag_z, mag_flags)
-        return ag_bytes + mag_bytes
+        MPU9250_AG_FORMAT.pack_into(buffer, offset, accel_x, accel_y, accel_z, temperature, gyro_x, gyro_y, gyro_z)
+        MPU9250_MAG_FORMAT.pack_into(buffer, offset + MPU9250_AG_FORMAT.size, mag_x, mag_y, mag_z, mag_flags)
 
     def __iter__(self) -> Generator[tuple[str, float], None, None]:
         yield "accel_x", self.accel_x
@@ -1104,6 +1270,100 @@ class MPU9250Sample:
         yield "mag_res", self.mag_res
 
 
+class MPU9250SampleArray:
+    """
+    MPU9250 samples stored as a NumPy array with one row per sample and one column per measurement, decoded and scaled
+    a whole block at a time. Indexing and iterating produce MPU9250Sample objects, so it can be used wherever a list of
+    samples is expected.
+    """
+
+    def __init__(self, values: Any, mag_ovf: Any, mag_res: Any):
+        super().__init__()
+        self.values: Any = values  # Columns are in the order of MPU9250_COLUMNS
+        self.mag_ovf: Any = mag_ovf
+        self.mag_res: Any = mag_res
+
+    @classmethod
+    def from_buffer(
+        cls, buffer: bytes | memoryview, offset: int, count: int, accel_sense: float, gyro_sense: float
+    ) -> Self:
+        raw = np.frombuffer(buffer, dtype=np.uint8, count=count * MPU9250_SAMPLE_LENGTH, offset=offset)
+        raw = raw.reshape(count, MPU9250_SAMPLE_LENGTH)
+
+        # The accelerometer and gyroscope are big endian but the magnetometer is little endian
+        ag_end = MPU9250_AG_FORMAT.size
+        mag_end = ag_end + MPU9250_MAG_FORMAT.size - 1
+        ag_parts = raw[:, :ag_end].copy().view(">i2")
+        mag_parts = raw[:, ag_end:mag_end].copy().view("<i2")
+        mag_flags = raw[:, mag_end]
+
+        mag_res = (mag_flags >> 3) & 1
+        mag_sense = np.where(
+            mag_res == MPU9250MagResolution.RES_16_BIT,
+            MPU9250MagResolution.RES_16_BIT.sensitivity,
+            MPU9250MagResolution.RES_14_BIT.sensitivity,
+        )
+
+        values = np.empty((count, len(MPU9250_COLUMNS)))
+        values[:, : ag_end // 2] = ag_parts / np.array(
+            [accel_sense, accel_sense, accel_sense, 321, gyro_sense, gyro_sense, gyro_sense]
+        )
+        values[:, 3] += 21  # Temperature offset
+        values[:, ag_end // 2 :] = mag_parts / mag_sense[:, np.newaxis]
+
+        return cls(values, ((mag_flags >> 4) & 1).astype(bool), mag_res)
+
+    def to_bytes(self, accel_sense: float, gyro_sense: float) -> bytes | None:
+        """
+        Encodes all samples at once, byte for byte the same as MPU9250Sample.to_payload. Returns None if any value does
+        not fit in a sample, so that the caller can fall back to packing the samples one at a time.
+        """
+
+        ag_end = MPU9250_AG_FORMAT.size
+        mag_end = ag_end + MPU9250_MAG_FORMAT.size - 1
+
+        ag_values = self.values[:, : ag_end // 2].copy()
+        ag_values[:, 3] -= 21  # Temperature offset
+        ag_parts = np.trunc(
+            ag_values * np.array([accel_sense, accel_sense, accel_sense, 321, gyro_sense, gyro_sense, gyro_sense])
+        )
+        mag_sense = np.where(
+            self.mag_res == MPU9250MagResolution.RES_16_BIT,
+            MPU9250MagResolution.RES_16_BIT.sensitivity,
+            MPU9250MagResolution.RES_14_BIT.sensitivity,
+        )
+        mag_parts = np.trunc(self.values[:, ag_end // 2 :] * mag_sense[:, np.newaxis])
+
+        limits = np.iinfo(np.int16)
+        for parts in (ag_parts, mag_parts):
+            if parts.size and not (parts.min() >= limits.min and parts.max() <= limits.max):
+                return None
+
+        raw = np.empty((len(self), MPU9250_SAMPLE_LENGTH), dtype=np.uint8)
+        raw[:, :ag_end] = ag_parts.astype(">i2").view(np.uint8)
+        raw[:, ag_end:mag_end] = mag_parts.astype("<i2").view(np.uint8)
+        raw[:, mag_end] = (self.mag_ovf.astype(np.uint8) << 4) | (self.mag_res.astype(np.uint8) << 3)
+        return raw.tobytes()
+
+    def column(self, name: str) -> Any:
+        """Returns the array of one measurement, such as accel_x, across all samples."""
+        return self.values[:, MPU9250_COLUMNS.index(name)]
+
+    def __len__(self) -> int:
+        return len(self.mag_res)
+
+    def __getitem__(self, index: int) -> MPU9250Sample:
+        return MPU9250Sample(
+            *self.values[index].tolist(),
+            mag_ovf=bool(self.mag_ovf[index]),
+            mag_res=MPU9250MagResolution(int(self.mag_res[index])),
+        )
+
+    def __iter__(self) -> Iterator[MPU9250Sample]:
+        for i in range(len(self)):
+            yield self[i]
+
+
 class MPU9250IMUDataBlock(DataBlock):
     def __init__(
         self,
@@ -1114,7 +1374,7 @@ class MPU9250IMUDataBlock(DataBlock):
         gyro_fsr: MPU9250GyroFSR,
         accel_bw: MPU9250AccelBW,
         gyro_bw: MPU9250GyroBW,
-        samples: list[MPU9250Sample],
+        samples: list[MPU9250Sample] | MPU9250SampleArray,
     ):
         super().__init__(DataBlockSubtype.MPU9250_IMU, mission_time)
         self.ag_sample_rate: int = ag_sample_rate
@@ -1127,17 +1387,20 @@ class MPU9250IMUDataBlock(DataBlock):
 
         self.sample_period = 1 / self.ag_sample_rate
 
-        self.sensor = avg_mpu9250_samples(self.samples)
+    @cached_property
+    def sensor(self) -> MPU9250Sample:
+        """The average of all samples in the block, computed the first time it is needed."""
+        return avg_mpu9250_samples(self.samples)
 
     def __len__(self) -> int:
         sample_bytes = len(self.samples) * 21
         return (sample_bytes + 8 + 3) & ~0x3
 
     @classmethod
-    def from_payload(cls, payload: bytes) -> Self:
-        """Creates an MPU9250IMUDataBlock from a bytes payload."""
+    def from_buffer(cls, buffer: bytes | memoryview, offset: int, length: int) -> Self:
+        """Creates an MPU9250IMUDataBlock from the length bytes of the buffer starting at offset."""
 
-        parts = struct.unpack("<II", payload[0:8])
+        parts = MPU9250_HEADER_FORMAT.unpack_from(buffer, offset)
         ag_sample_rate = 1000 / ((parts[1] & 0xFF) + 1)
 
         try:
@@ -1167,14 +1430,27 @@ class MPU9250IMUDataBlock(DataBlock):
         except ValueError as error:
             raise DataBlockException(f"Invalid MPU9250 gyroscope bandwidth: {(parts[1] >> 16) & 0x7}") from error
 
-        num_samples = (len(payload) - 8) // 21
+        num_samples = max(0, (length - MPU9250_HEADER_FORMAT.size) // MPU9250_SAMPLE_LENGTH)
+        samples_start = offset + MPU9250_HEADER_FORMAT.size
+        if np is not None and num_samples >= VECTORIZE_MIN_SAMPLES:
+            return cls(
+                mission_time=parts[0],
+                ag_sample_rate=ag_sample_rate,
+                mag_sample_rate=mag_sample_rate,
+                accel_fsr=accel_fsr,
+                gyro_fsr=gyro_fsr,
+                accel_bw=accel_bw,
+                gyro_bw=gyro_bw,
+                samples=MPU9250SampleArray.from_buffer(
+                    buffer, samples_start, num_samples, accel_fsr.sensitivity, gyro_fsr.sensitivity
+                ),
+            )
 
         samples: list[MPU9250Sample] = list()
-        for i in range(num_samples):
-            sample_start = 8 + (i * 21)
-            sample = MPU9250Sample.from_bytes(
-                payload[sample_start : sample_start + 21], accel_fsr.sensitivity, gyro_fsr.sensitivity
-            )
+        for sample_start in range(
+            samples_start, samples_start + num_samples * MPU9250_SAMPLE_LENGTH, MPU9250_SAMPLE_LENGTH
+        ):
+            sample = MPU9250Sample.from_buffer(buffer, sample_start, accel_fsr.sensitivity, gyro_fsr.sensitivity)
             samples.append(sample)
 
         return cls(
@@ -1189,25 +1465,34 @@ class MPU9250IMUDataBlock(DataBlock):
         )
 
     def to_payload(self) -> bytes:
+        payload = bytearray(len(self))
+        self.pack_into(payload, 0)
+        return bytes(payload)
+
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> None:
         ag_sr_div = (1000 // self.ag_sample_rate) - 1
-        sample_rate = (self.mag_sample_rate.samples_per_sec & 0x1) << 8
-        acceleration = (self.accel_fsr.acceleration & 0x3) << 9
-        angular_vel = (self.gyro_fsr.angular_velocity & 0x3) << 11
-        accel_bw = (int(self.accel_bw.bandwidth) & 0x7) << 13
-        gyro_bw = (self.gyro_bw.bandwidth & 0x7) << 16
+        sample_rate = (self.mag_sample_rate.value & 0x1) << 8
+        acceleration = (self.accel_fsr.value & 0x3) << 9
+        angular_vel = (self.gyro_fsr.value & 0x3) << 11
+        accel_bw = (self.accel_bw.value & 0x7) << 13
+        gyro_bw = (self.gyro_bw.value & 0x7) << 16
         info = (int(ag_sr_div) & 0xFF) | sample_rate | acceleration | angular_vel | accel_bw | gyro_bw
 
-        content_length = 8 + (21 * len(self.samples))
-        total_length = (content_length + 3) & ~0x3
-        padding = total_length - content_length
-
-        payload = struct.pack("<II", self.mission_time, info)
+        samples_start = offset + MPU9250_HEADER_FORMAT.size
+        samples_end = samples_start + len(self.samples) * MPU9250_SAMPLE_LENGTH
+        MPU9250_HEADER_FORMAT.pack_into(buffer, offset, self.mission_time, info)
+        buffer[samples_end : offset + len(self)] = PADDING[: offset + len(self) - samples_end]
 
-        for sample in self.samples:
-            this_sample = sample.to_payload(self.accel_fsr.sensitivity, self.gyro_fsr.sensitivity)
-            payload += this_sample
+        accel_sense = self.accel_fsr.sensitivity
+        gyro_sense = self.gyro_fsr.sensitivity
+        if isinstance(self.samples, MPU9250SampleArray):
+            encoded = self.samples.to_bytes(accel_sense, gyro_sense)
+            if encoded is not None:
+                buffer[samples_start:samples_end] = encoded
+                return
 
-        return payload + (b"\x00" * padding)
+        for i, sample in enumerate(self.samples):
+            sample.pack_into(buffer, samples_start + i * MPU9250_SAMPLE_LENGTH, accel_sense, gyro_sense)
 
     def gen_samples(self) -> Generator[tuple[float, MPU9250Sample], None, None]:
         count = len(self.samples)
@@ -1246,31 +1531,35 @@ class MPU9250IMUDataBlock(DataBlock):
         yield "gyro_fsr", self.gyro_fsr
 
 
-def avg_mpu9250_samples(data_samples: list[MPU9250Sample]) -> MPU9250Sample:
+def avg_mpu9250_samples(data_samples: list[MPU9250Sample] | MPU9250SampleArray) -> MPU9250Sample:
     """
     Parses a list of samples from a mpu9250 packet and returns the average values for accel, temp, gyro and magnetometer
     """
     mag_ovf = data_samples[0].mag_ovf
     mag_res = data_samples[0].mag_res
 
-    avg: dict[str, float] = dict.fromkeys(dict(data_samples[0]).keys(), 0)
-
-    for sample in data_samples:
-        data = dict(sample)
-        for key in data.keys():
-            avg[key] += data[key] / len(data_samples)
-
-    return MPU9250Sample(
-        avg["accel_x"],
-        avg["accel_y"],
-        avg["accel_z"],
-        avg["temperature"],
-        avg["gyro_x"],
-        avg["gyro_y"],
-        avg["gyro_z"],
-        avg["mag_x"],
-        avg["mag_y"],
-        avg["mag_z"],
-        mag_ovf,
-        mag_res,
-    )
+    if isinstance(data_samples, MPU9250SampleArray):
+        return MPU9250Sample(*data_samples.values.mean(axis=0).tolist(), mag_ovf, mag_res)
+
+    # Sum every measurement across the samples in a single pass
+    totals = [0.0] * len(MPU9250_COLUMNS)
+    for values in map(MPU9250_MEASUREMENTS, data_samples):
+        totals = [total + value for total, value in zip(totals, values)]
+
+    count = len(data_samples)
+    return MPU9250Sample(*(total / count for total in totals), mag_ovf, mag_res)  # type: ignore
+
+
+# Data block classes by subtype, built once at import rather than every time a block is parsed
+SUBTYPE_CLASSES: dict[DataBlockSubtype, Type[DataBlock]] = {
+    DataBlockSubtype.DEBUG_MESSAGE: DebugMessageDataBlock,
+    DataBlockSubtype.STATUS: StatusDataBlock,
+    DataBlockSubtype.STARTUP_MESSAGE: StartupMessageDataBlock,
+    DataBlockSubtype.ALTITUDE: AltitudeDataBlock,
+    DataBlockSubtype.ACCELERATION: AccelerationDataBlock,
+    DataBlockSubtype.GNSS: GNSSLocationBlock,
+    DataBlockSubtype.GNSS_META: GNSSMetadataBlock,
+    DataBlockSubtype.MPU9250_IMU: MPU9250IMUDataBlock,
+    DataBlockSubtype.KX134_1211_ACCEL: KX134AccelerometerDataBlock,
+    DataBlockSubtype.ANGULAR_VELOCITY: AngularVelocityDataBlock,
+}
@@ -0,0 +1,277 @@
+# Fixed depth, columnar history of the data blocks received for each data block subtype
+# Every numeric field of a block is stored in its own preallocated array, so that keeping tens of thousands of points
+# per subtype costs a few bytes per field instead of a dictionary per block
+# Each record is also JSON encoded once when it is appended, so websocket frames are built by joining the cached
+# fragments. The JSON text around the values of a record is the same for every record of a subtype, so it is encoded
+# once from the first record and only the values are encoded per record, exactly as json.dumps would encode them
+import json
+import math
+from array import array
+from typing import Any, Callable, Iterator, Mapping, TypeAlias
+
+from modules.telemetry.block import DataBlockSubtype
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+Column: TypeAlias = array | list[Any]
+FieldPath: TypeAlias = tuple[str, str | None]  # Key of the field, and its key within a nested dictionary if any
+
+# Constants
+INT_TYPECODE: str = "q"
+FLOAT_TYPECODE: str = "d"
+ENCODER: json.JSONEncoder = json.JSONEncoder(separators=(",", ":"))  # Compact, and built once rather than per call
+
+
+def new_column(value: Any, depth: int) -> Column:
+    """Returns an empty column of the given depth that is able to store values like the passed one."""
+
+    # Exact type checks keep booleans and enums out of the numeric columns, so they serialize exactly as before
+    if type(value) is int:
+        return array(INT_TYPECODE, [0]) * depth
+    if type(value) is float:
+        return array(FLOAT_TYPECODE, [0.0]) * depth
+    return [None] * depth
+
+
+def encode_float(value: float) -> str:
+    """Returns the JSON encoding of a float, which is its repr unless it is one of the values JSON writes as NaN."""
+    return repr(value) if math.isfinite(value) else ENCODER.encode(value)
+
+
+def column_encoder(column: Column) -> Callable[[Any], str]:
+    """Returns the function encoding the values of the column to JSON. Numbers are written as their repr."""
+
+    if isinstance(column, array):
+        return repr if column.typecode == INT_TYPECODE else encode_float
+    return ENCODER.encode
+
+
+def column_type(column: Column) -> type | None:
+    """Returns the exact type of the values an array column stores, or None for object columns that store anything."""
+
+    if isinstance(column, array):
+        return int if column.typecode == INT_TYPECODE else float
+    return None
+
+
+def widen_column(column: Column) -> Column:
+    """
+    Returns a copy of the column that can hold any value. Integers are not widened to floats on the way, which would
+    round the values already stored (i.e. 10**17 + 1) and write them back to JSON as floats.
+    """
+    return list(column)
+
+
+class BlockHistory:
+    """Ring buffer of the last depth records of a single data block subtype, stored as one column per field."""
+
+    def __init__(self, subtype: DataBlockSubtype, depth: int):
+        if depth < 1:
+            raise ValueError(f"History depth for {subtype.name.lower()} must be at least 1, not {depth}.")
+
+        self.subtype: DataBlockSubtype = subtype
+        self.name: str = subtype.name.lower()  # Key of this history in the websocket telemetry object
+        self.encoded_name: str = ENCODER.encode(self.name)
+        self.depth: int = depth
+        self.count: int = 0  # Number of records currently held
+        self.next: int = 0  # Slot the next record is written to
+        self.total: int = 0  # Number of records ever appended, used to find the records appended since a point
+
+        # The field layout is taken from the first record, since every block of a subtype serializes the same keys
+        self.fields: list[FieldPath] = []
+        self.columns: list[Column] = []
+        self.types: list[type | None] = []  # The exact type the values of each column must have, None for any type
+        self.encoders: list[Callable[[Any], str]] = []  # The JSON encoder of each column
+        self.template: str = "{}"  # The JSON text of a record with a %s in place of each value
+        self.fragments: list[str] = [""] * depth  # The JSON encoding of each record, by slot
+
+    def __len__(self) -> int:
+        return self.count
+
+    def layout(self, record: JSON) -> None:
+        """Allocates one column for every field of the record, flattening nested dictionaries by one level."""
+
+        self.fields = []
+        self.columns = []
+        separators: list[str] = []  # The JSON text of a record before each value, i.e. '{"mission_time":'
+        text = "{"  # JSON text to write before the next value
+        for position, (key, value) in enumerate(record.items()):
+            text += f"{',' if position else ''}{ENCODER.encode(key)}:"
+            if isinstance(value, dict):
+                text += "{"
+                for sub_position, (sub_key, sub_value) in enumerate(value.items()):
+                    self.fields.append((key, sub_key))
+                    self.columns.append(new_column(sub_value, self.depth))
+                    separators.append(f"{text}{',' if sub_position else ''}{ENCODER.encode(sub_key)}:")
+                    text = ""
+                text += "}"
+            else:
+                self.fields.append((key, None))
+                self.columns.append(new_column(value, self.depth))
+                separators.append(text)
+                text = ""
+        self.template = "%s".join(separator.replace("%", "%%") for separator in [*separators, f"{text}}}"])
+        self.types = [column_type(column) for column in self.columns]
+        self.encoders = [column_encoder(column) for column in self.columns]
+
+    def append(self, record: JSON) -> None:
+        """Stores the record as the newest entry, overwriting the oldest entry once the history is full."""
+
+        if not self.fields:
+            self.layout(record)
+
+        slot = self.next
+        widened = False
+        for index, (key, sub_key) in enumerate(self.fields):
+            value = record[key] if sub_key is None else record[key][sub_key]
+            value_type = self.types[index]
+            if value_type is None or type(value) is value_type:
+                try:
+                    self.columns[index][slot] = value
+                    continue
+                except OverflowError:
+                    pass
+            # A field changed type (i.e. an integer field received a float or a boolean, which an array would convert)
+            # or an integer no longer fits in 64 bits
+            self.store_widened(index, slot, value)
+            widened = True
+
+        self.next = (slot + 1) % self.depth
+        self.count = min(self.count + 1, self.depth)
+        self.total += 1
+        if widened:
+            # The encoder of a widened column changed, so the cached fragments are rebuilt from the columns
+            for held in range(self.next - self.count, self.next):
+                self.encode_fragment(held % self.depth)
+        else:
+            self.encode_fragment(slot)
+
+    def encode_fragment(self, slot: int) -> None:
+        """Caches the JSON encoding of the record stored in the slot."""
+        self.fragments[slot] = self.template % tuple(
+            encoder(column[slot]) for encoder, column in zip(self.encoders, self.columns)
+        )
+
+    def store_widened(self, index: int, slot: int, value: Any) -> None:
+        """Stores a value in the slot of a column, widening the column to an object column first."""
+
+        self.columns[index] = widen_column(self.columns[index])
+        self.types[index] = None
+        self.encoders[index] = column_encoder(self.columns[index])
+        self.columns[index][slot] = value
+
+    def clear(self) -> None:
+        """Drops all records. The columns stay allocated and are reused."""
+
+        self.count = 0
+        self.next = 0
+
+    def ordered(self, column: Column, count: int) -> list[Any]:
+        """Returns the newest count values of a column as a list, from oldest to newest."""
+
+        start = (self.next - count) % self.depth
+        if start + count <= self.depth:
+            values = column[start : start + count]
+        else:
+            values = column[start:] + column[: self.next]
+        return values.tolist() if isinstance(values, array) else values
+
+    def to_json(self) -> list[JSON]:
+        """Returns the held records, from oldest to newest, in the same format the data blocks serialize to."""
+        return self.newest(self.count)
+
+    def since(self, total: int) -> list[JSON]:
+        """
+        Returns the records appended after the history had seen total records, from oldest to newest. Records that
+        have already been overwritten are left out.
+        """
+        return self.newest(self.count_since(total))
+
+    def count_since(self, total: int) -> int:
+        """Returns the number of held records that were appended after the history had seen total records."""
+        return max(0, min(self.total - total, self.count))
+
+    def encode(self, count: int) -> str:
+        """Returns the JSON array of the newest count records, joined from their cached encodings."""
+        return f"[{','.join(self.ordered(self.fragments, count))}]"
+
+    def newest(self, count: int) -> list[JSON]:
+        """Returns the newest count records, from oldest to newest."""
+
+        records: list[JSON] = []
+        if count == 0:
+            return records
+
+        for row in zip(*(self.ordered(column, count) for column in self.columns)):
+            record: JSON = {}
+            for (key, sub_key), value in zip(self.fields, row):
+                if sub_key is None:
+                    record[key] = value
+                else:
+                    record.setdefault(key, {})[sub_key] = value
+            records.append(record)
+        return records
+
+
+class TelemetryHistory:
+    """Holds a BlockHistory for every data block subtype that has been received."""
+
+    def __init__(self, default_depth: int, depths: Mapping[str, int] | None = None):
+        self.default_depth: int = default_depth
+        self.depths: Mapping[str, int] = depths or {}  # Per subtype overrides, keyed by the lowercase subtype name
+        self.histories: dict[DataBlockSubtype, BlockHistory] = {}
+
+    def __len__(self) -> int:
+        return sum(1 for history in self.histories.values() if history.count)
+
+    def __getitem__(self, subtype: DataBlockSubtype) -> BlockHistory:
+        return self.histories[subtype]
+
+    def __iter__(self) -> Iterator[tuple[str, list[JSON]]]:
+        for history in self.histories.values():
+            if history.count:
+                yield history.name, history.to_json()
+
+    def depth(self, subtype: DataBlockSubtype) -> int:
+        """Returns the number of records kept for the subtype."""
+        return self.depths.get(subtype.name.lower(), self.default_depth)
+
+    def append(self, subtype: DataBlockSubtype, record: JSON) -> None:
+        """Adds a record to the history of its subtype, creating the history on the first record of the subtype."""
+
+        history = self.histories.get(subtype)
+        if history is None:
+            history = self.histories[subtype] = BlockHistory(subtype, self.depth(subtype))
+        history.append(record)
+
+    def totals(self) -> dict[DataBlockSubtype, int]:
+        """Returns the number of records appended so far to each subtype, to later find the records appended since."""
+        return {subtype: history.total for subtype, history in self.histories.items()}
+
+    def since(self, totals: Mapping[DataBlockSubtype, int]) -> JSON:
+        """Returns the records of each subtype that were appended after the given totals, keyed by subtype name."""
+
+        changes: JSON = {}
+        for subtype, history in self.histories.items():
+            records = history.since(totals.get(subtype, 0))
+            if records:
+                changes[history.name] = records
+        return changes
+
+    def encode(self, totals: Mapping[DataBlockSubtype, int] | None = None) -> str:
+        """
+        Returns the JSON object of the held records of every subtype, in the same format as the dictionary of this
+        history. If totals are passed, only the records appended after them are included.
+        """
+
+        members: list[str] = []
+        for subtype, history in self.histories.items():
+            count = history.count if totals is None else history.count_since(totals.get(subtype, 0))
+            if count:
+                members.append(f"{history.encoded_name}:{history.encode(count)}")
+        return f"{{{','.join(members)}}}"
+
+    def clear(self) -> None:
+        """Drops the records of every subtype."""
+        for history in self.histories.values():
+            history.clear()
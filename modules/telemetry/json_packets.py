@@ -14,7 +14,6 @@ import modules.telemetry.data_block as db
 from modules.telemetry.block import SDBlockSubtype
 from modules.telemetry.sd_block import SDBlockException
 from modules.telemetry.replay import parse_sd_block_header
-from modules.telemetry.superblock import SuperBlock, find_superblock
 
 # Constants
 MISSION_EXTENSION: str = "mission"
@@ -48,11 +47,13 @@ class MissionEntry:
     name: str
     length: int = 0
     epoch: int = 0
+    repair: bool = False  # The recording must be repaired before all of it can be replayed
 
     def __iter__(self):
         yield "name", self.name
         yield "length", self.length
         yield "epoch", self.epoch
+        yield "repair", self.repair
 
     def __len__(self) -> int:
         return self.length
@@ -149,62 +150,12 @@ class ReplayData:
     speed: float = 1.0
     last_played_speed: float = 1.0
     mission_files_list: list[Path] = field(default_factory=list)
-    mission_list: list[MissionEntry] = field(default_factory=list)
-
-    def __post_init__(self) -> None:
-        # Update the mission list on creation
-        self.update_mission_list()
-
-    def update_mission_list(self, missions_dir: Path = Path.cwd().joinpath(MISSIONS_DIR)) -> None:
-        """Gets the available mission recordings from the mission folder."""
-
-        # TODO change this so that mission_extension and directory are not defined in multiple files
-        self.mission_files_list = [file for file in missions_dir.glob(f"*.{MISSION_EXTENSION}") if file.is_file()]
-
-        # Check each file to output its misc details
-        self.mission_list = []
-        for filename in self.mission_files_list:
-            mission_path: Path = missions_dir.joinpath(filename.name)
-
-            # Find superblock from file and return it
-            superblock_result = find_superblock(mission_path)
-            if superblock_result is None:
-                raise ValueError(f"Could not find superblock in {mission_path}")
-            sb_addr, mission_sb = superblock_result
-
-            # Read from superblock
-            if type(mission_sb) is not SuperBlock:
-                print(f"{filename.name} invalid. Not adding to mission list.")
-                continue
-
-            # Check if flight list is empty
-            if len(mission_sb.flights) == 0:
-                print(f"Flight list for {filename.name} is empty")
-                continue
-
-            # Read last mission time from flights
-            mission_time = -1
-            try:
-                with open(f"{mission_path}", "rb") as file:
-                    # Reads last telemetry block of each flight to get final mission time
-                    for flight in mission_sb.flights:
-                        _ = file.seek((sb_addr + flight.first_block) * 512)
-                        mission_time += get_last_mission_time(file, flight.num_blocks)
-            except ParsingException:
-                logger.info(f"Unable to parse time from {filename.name}, defaulting to -1")
-
-            # Output mission to mission list
-            mission_entry = MissionEntry(
-                name=filename.stem,
-                length=mission_time,
-                epoch=mission_sb.flights[0].timestamp,
-            )
-            self.mission_list.append(mission_entry)
+    mission_list: list[MissionEntry] = field(default_factory=list)  # Filled in from the mission catalog
 
     def __iter__(self):
+        # The mission list is sent to websocket clients in catalog frames of its own, rather than in every status
         yield "state", self.state
         yield "speed", self.speed,
-        yield "mission_list", [dict(e) for e in self.mission_list]
 
 
 @dataclass
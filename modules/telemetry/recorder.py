@@ -0,0 +1,265 @@
+# Writes mission recordings from a background thread
+# The telemetry process serializes blocks straight into a preallocated staging buffer and hands the buffer to the writer
+# thread as soon as it holds whole 512 byte blocks, so parsing never waits on the disk. Staging buffers come from a
+# fixed pool that the writer returns them to, which bounds how far the writer may fall behind, and keeps recording free
+# of allocations. The writer writes everything queued in one go, and only rewrites the superblock with the block count
+# of the flight every superblock interval and when the recording stops. How often the file is synced to disk is chosen
+# with the fsync policy
+#
+# The mission time and offset of the recorded telemetry blocks are kept in a time index as they are staged, and the
+# writer brings the sidecar index file up to date along with the superblock
+
+# Imports
+import logging
+import os
+import queue
+import threading
+from bisect import bisect_left
+from multiprocessing.util import Finalize
+from pathlib import Path
+from time import monotonic
+
+from modules.misc.config import FsyncPolicy
+from modules.telemetry.sd_block import LoggingMetadataSpacerBlock, SDBlock, TelemetryDataBlock
+from modules.telemetry.superblock import Flight, SuperBlock
+from modules.telemetry.time_index import FlightIndex, TimeIndexWriter, telemetry_times
+
+# Constants
+BLOCK_SIZE: int = 512
+STAGING_SIZE: int = 4 * BLOCK_SIZE  # Holds the partial block left over by a hand-off, and the blocks that complete it
+STAGING_BUFFERS: int = 64  # Staging buffers waiting for the writer before the telemetry process waits too
+SYNC_INTERVAL: float = 1.0
+SUPERBLOCK_INTERVAL: float = 1.0
+RECORDER_EXIT_PRIORITY: int = 10  # Closes recordings before finalizers of lower priority
+
+logger = logging.getLogger(__name__)
+
+
+class MissionRecorder:
+    """
+    Records the blocks of a single flight to a mission file. Blocks are written by a writer thread, which is stopped
+    by closing the recorder.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        timestamp: int,
+        fsync_policy: FsyncPolicy = FsyncPolicy.INTERVAL,
+        sync_interval: float = SYNC_INTERVAL,
+        superblock_interval: float = SUPERBLOCK_INTERVAL,
+        staging_buffers: int = STAGING_BUFFERS,
+    ):
+        self.path: Path = path
+        self.fsync_policy: FsyncPolicy = fsync_policy
+        self.sync_interval: float = sync_interval
+        self.superblock_interval: float = superblock_interval
+
+        # Staging buffers, of which the telemetry process fills one while the writer holds the others it was handed
+        self.free: queue.Queue[memoryview] = queue.Queue()
+        for _ in range(staging_buffers - 1):
+            self.free.put(memoryview(bytearray(STAGING_SIZE)))
+        self.staging: memoryview = memoryview(bytearray(STAGING_SIZE))
+        self.staged: int = 0
+        self.position: int = BLOCK_SIZE  # Offset in the file of the start of the staging buffer
+
+        # The telemetry process indexes blocks as they are staged, and the writer writes the entries it was handed
+        self.index: FlightIndex = FlightIndex(first_block=1, num_blocks=0)
+        self.indexed: int = 0  # Telemetry blocks indexed
+
+        # Only the writer thread touches the file and superblock once it is started
+        self.superblock: SuperBlock = SuperBlock(flights=[Flight(first_block=1, num_blocks=0, timestamp=timestamp)])
+        self.file = open(path, "wb")
+        _ = self.file.write(self.superblock.to_bytes())
+        self.file.flush()
+        self.index_writer: TimeIndexWriter | None = None
+        try:
+            self.index_writer = TimeIndexWriter(path, first_block=1)
+        except OSError as e:
+            logger.warning(f"Could not write time index of {path.name}, it will be indexed once recorded: {e}")
+
+        # Staging buffers, their length and the number of index entries for the blocks up to their end
+        self.chunks: queue.Queue[tuple[memoryview, int, int] | None] = queue.Queue()
+        self.failed: bool = False
+        self.written_blocks: int = 0
+        self.thread: threading.Thread = threading.Thread(target=self.write_chunks, name="mission recorder", daemon=True)
+        self.thread.start()
+
+        # Recordings that were not stopped are closed off when the process exits, before the daemon writer thread is
+        # killed. A multiprocessing finalizer is used since atexit handlers do not run when a child process exits
+        self.finalizer: Finalize = Finalize(None, self.close, exitpriority=RECORDER_EXIT_PRIORITY)
+
+    @property
+    def flight(self) -> Flight:
+        return self.superblock.flights[0]
+
+    def write_block(self, block: SDBlock) -> None:
+        """Serializes a block straight into the staging buffer."""
+
+        length = len(block)
+        if self.staged + length > STAGING_SIZE:
+            self.write(block.to_bytes())  # Only blocks larger than the staging buffer are serialized on their own
+            return
+
+        if isinstance(block, TelemetryDataBlock):
+            self.index_block(block.data.mission_time, self.position + self.staged)
+
+        _ = block.pack_into(self.staging, self.staged)
+        self.staged += length
+        if self.staged >= BLOCK_SIZE:
+            self.hand_off()
+
+    def write(self, data: bytes | memoryview) -> None:
+        """Adds encoded blocks to the recording."""
+
+        data = memoryview(data)
+        for offset, mission_time in telemetry_times(data, 0, len(data)):
+            self.index_block(mission_time, self.position + self.staged + offset)
+
+        while data:
+            length = min(len(data), STAGING_SIZE - self.staged)
+            self.staging[self.staged : self.staged + length] = data[:length]
+            self.staged += length
+            data = data[length:]
+            if self.staged >= BLOCK_SIZE:
+                self.hand_off()
+
+    def index_block(self, mission_time: int, offset: int) -> None:
+        """Adds the telemetry block recorded at the offset to the time index."""
+        _ = self.index.add(mission_time, offset, self.indexed)
+        self.indexed += 1
+
+    def hand_off(self) -> None:
+        """Hands the whole blocks of the staging buffer to the writer, and carries its partial block over."""
+
+        length = self.staged - self.staged % BLOCK_SIZE
+        staging = self.free.get()  # Waits for the writer once it holds every staging buffer
+        remainder = self.staged - length
+        staging[:remainder] = self.staging[length : self.staged]
+
+        # Entries for blocks carried over to the next staging buffer are handed off with that buffer
+        self.position += length
+        self.chunks.put((self.staging, length, bisect_left(self.index.offsets, self.position)))
+        self.staging, self.staged = staging, remainder
+
+    def close(self) -> None:
+        """Pads the last block with a spacer, waits for everything to be written and closes the recording."""
+
+        if not self.thread.is_alive():
+            return
+        self.finalizer.cancel()
+
+        if self.staged:
+            spacer = LoggingMetadataSpacerBlock(BLOCK_SIZE - self.staged)
+            self.staged += spacer.pack_into(self.staging, self.staged)
+            self.hand_off()
+        self.chunks.put(None)
+        self.thread.join()
+
+    def write_chunks(self) -> None:
+        """Writes queued chunks until the recorder is closed. Runs in the writer thread."""
+
+        last_sync = last_superblock = monotonic()
+        indexed = 0
+        superblock_dirty = sync_dirty = False
+        stopped = False
+
+        while not stopped:
+            # Wake up without new chunks only to catch up on a superblock update or sync that is due
+            due = []
+            if superblock_dirty:
+                due.append(last_superblock + self.superblock_interval)
+            if sync_dirty:
+                due.append(last_sync + self.sync_interval)
+            timeout = max(0.0, min(due) - monotonic()) if due else None
+            try:
+                chunks = [self.chunks.get(timeout=timeout)]
+            except queue.Empty:
+                chunks = []
+
+            # Everything already queued is written together
+            while True:
+                try:
+                    chunks.append(self.chunks.get_nowait())
+                except queue.Empty:
+                    break
+            taken = len(chunks)
+            if None in chunks:
+                stopped = True
+                chunks = chunks[: chunks.index(None)]
+
+            try:
+                if self.failed:
+                    continue  # Staging buffers are still returned, so that the telemetry process never waits on them
+
+                for staging, length, indexed in chunks:  # type: ignore
+                    _ = self.file.write(staging[:length])
+                    self.written_blocks += length // BLOCK_SIZE
+                    superblock_dirty = sync_dirty = True
+                self.file.flush()  # Everything queued reaches the file in one write
+
+                now = monotonic()
+                if superblock_dirty and (stopped or now - last_superblock >= self.superblock_interval):
+                    self.write_superblock()
+                    self.write_index(indexed)
+                    last_superblock = now
+                    superblock_dirty = False
+
+                if self.fsync_policy == FsyncPolicy.NONE:
+                    sync_dirty = False
+                elif sync_dirty and (
+                    stopped or self.fsync_policy == FsyncPolicy.BLOCK or now - last_sync >= self.sync_interval
+                ):
+                    self.sync()
+                    last_sync = now
+                    sync_dirty = False
+            except OSError as e:
+                logger.error(f"Could not write mission recording {self.path.name}, recording stopped: {e}")
+                self.failed = True
+            finally:
+                for staging, _, _ in chunks:  # type: ignore
+                    self.free.put(staging)
+                for _ in range(taken):
+                    self.chunks.task_done()
+
+        try:
+            self.file.close()
+        except OSError as e:
+            logger.error(f"Could not close mission recording {self.path.name}: {e}")
+        try:
+            if self.index_writer is not None:
+                self.index_writer.close()
+        except OSError as e:
+            logger.warning(f"Could not close time index of {self.path.name}: {e}")
+
+    def write_superblock(self) -> None:
+        """Rewrites the superblock with the number of blocks written so far."""
+
+        self.flight.num_blocks = self.written_blocks
+        _ = self.file.seek(0)
+        _ = self.file.write(self.superblock.to_bytes())
+        _ = self.file.seek(0, os.SEEK_END)
+
+    def write_index(self, entries: int) -> None:
+        """
+        Brings the sidecar time index up to date with the superblock. The index is given up on if it cannot be written,
+        and the recording is indexed again when it is read instead.
+        """
+
+        if self.index_writer is None:
+            return
+        try:
+            self.index_writer.write(self.index, entries, self.written_blocks)
+        except OSError as e:
+            logger.warning(f"Could not write time index of {self.path.name}: {e}")
+            index_writer, self.index_writer = self.index_writer, None
+            try:
+                index_writer.close()
+            except OSError:
+                pass  # The index was already given up on
+
+    def sync(self) -> None:
+        """Writes the file through to the disk."""
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
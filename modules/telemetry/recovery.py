@@ -0,0 +1,266 @@
+# Repairs mission recordings whose superblock was not brought up to date before the ground station stopped
+# The recorder only rewrites the block count of a flight every so often, so a crash or power loss leaves blocks past
+# the end of the last flight. Recovery walks the SD block headers past the recorded end of that flight without decoding
+# any payload, finds where the valid blocks end, and extends the flight over them
+#
+# Blocks run across the 512 byte blocks of the file, so the recorded end may fall partway through a block. The walk
+# starts from the last block the sidecar time index holds before the recorded end, which is at most INDEX_INTERVAL
+# blocks behind it, and only walks the flight from its first block when the recording has no index
+#
+# Recordings made before the SD block header length was fixed have headers 4 bytes longer than their blocks. They are
+# told apart by which of the two lengths the first blocks of a flight can be walked with, and migrated by rewriting
+# every header in place
+#
+# Recordings are only ever checked when they are read. Repairs change the file in place, so they are only made when
+# asked for, and a copy of the recording as it was is kept in a backup file next to it first
+
+# Imports
+import logging
+import math
+import mmap
+import shutil
+from bisect import bisect_left
+from pathlib import Path
+
+from modules.telemetry.sd_block import (
+    SD_BLOCK_HEADER,
+    LoggingMetadataSpacerBlock,
+    sd_block_header_at,
+    valid_sd_block_header,
+)
+from modules.telemetry.superblock import Flight, SuperBlock
+from modules.telemetry.time_index import TimeIndex, index_path
+
+# Constants
+BLOCK_SIZE: int = 512
+FLIGHT_TABLE_OFFSET: int = 0x60
+MAX_FLIGHTS: int = 32
+HEADER_PADDING: int = 4  # How much longer than their blocks old recordings give the length of their blocks
+BACKUP_EXTENSION: str = "bak"
+
+logger = logging.getLogger(__name__)
+
+
+def end_of_blocks(data: bytes | mmap.mmap, start: int, end: int, padding: int = 0) -> int:
+    """
+    Walks the block headers in data from start, skipping over each payload, and returns the offset just past the last
+    valid block that ends before end. The padding is taken off the length in every header.
+    """
+
+    offset = start
+    while offset + SD_BLOCK_HEADER.size <= end:
+        block_class, block_subtype, block_length = sd_block_header_at(data, offset)
+        block_length -= padding
+        if not valid_sd_block_header(block_class, block_subtype, block_length) or offset + block_length > end:
+            break
+        offset += block_length
+    return offset
+
+
+def padded_header_lengths(data: bytes | mmap.mmap, start: int, end: int) -> bool:
+    """Returns True if the blocks from start have the old header lengths, judging by their first 512 bytes."""
+
+    checked = min(end, start + BLOCK_SIZE)
+    return end_of_blocks(data, start, checked, HEADER_PADDING) > end_of_blocks(data, start, checked)
+
+
+def unpad_header_lengths(data: mmap.mmap, start: int, end: int) -> None:
+    """Rewrites the block headers with the old lengths from start, up to the last valid block before end."""
+
+    offset = start
+    while offset + SD_BLOCK_HEADER.size <= end:
+        block_class, block_subtype, block_length = sd_block_header_at(data, offset)
+        block_length -= HEADER_PADDING
+        if not valid_sd_block_header(block_class, block_subtype, block_length) or offset + block_length > end:
+            return
+        SD_BLOCK_HEADER.pack_into(data, offset, block_class | block_subtype << 6, block_length)
+        offset += block_length
+
+
+def walk_start(mission_file: Path, start: int, recorded_end: int) -> int:
+    """
+    Returns the offset of the last block known to start before the recorded end of the flight starting at start, from
+    the time index of the recording, or start if the recording has no readable index of the flight.
+    """
+
+    try:
+        index = TimeIndex.from_bytes(index_path(mission_file).read_bytes())
+    except (OSError, ValueError):
+        return start
+    for flight in index.flights:
+        if flight.first_block * BLOCK_SIZE == start:
+            position = bisect_left(flight.offsets, recorded_end) - 1
+            if position >= 0 and flight.offsets[position] >= start:
+                return flight.offsets[position]
+    return start
+
+
+def recorded_flights(superblock: bytes) -> list[Flight]:
+    """
+    Returns the flights in the flight table of a superblock, including the flights with no blocks recorded yet, that
+    SuperBlock.from_bytes leaves out.
+    """
+
+    flights: list[Flight] = []
+    for i in range(MAX_FLIGHTS):
+        entry = FLIGHT_TABLE_OFFSET + 12 * i
+        flight = Flight.from_bytes(superblock[entry : entry + 12])
+        if flight.first_block != 0 and flight.timestamp != 0:
+            flights.append(flight)
+    return flights
+
+
+def flight_starts(mission_file: Path) -> tuple[list[int], int]:
+    """
+    Returns the offsets the flights of a recording start at, in order, and the size of the file. Raises ValueError if
+    the file is not a recording, such as an SD card image starting with an MBR.
+    """
+
+    with open(mission_file, "rb") as file:
+        superblock_bytes = file.read(BLOCK_SIZE)
+        _ = SuperBlock.from_bytes(superblock_bytes)
+        size = file.seek(0, 2)
+    return sorted(flight.first_block * BLOCK_SIZE for flight in recorded_flights(superblock_bytes)), size
+
+
+def padded_mission(mission_file: Path) -> bool:
+    """Returns True if the recording was made before the SD block header length was fixed, without changing it."""
+
+    try:
+        starts, size = flight_starts(mission_file)
+        if not starts or starts[0] >= size:
+            return False
+        with open(mission_file, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return padded_header_lengths(data, starts[0], size)
+    except ValueError:
+        return False
+    except OSError as e:
+        logger.warning(f"Could not check {mission_file.name}: {e}")
+        return False
+
+
+def unrecorded_end(mission_file: Path) -> int | None:
+    """
+    Returns the offset just past the valid blocks written after the recorded end of the last flight of a recording, or
+    None if there are none, without changing the recording. SD card images are left alone, since their partition
+    always extends past the flights.
+    """
+
+    try:
+        with open(mission_file, "rb") as file:
+            superblock_bytes = file.read(BLOCK_SIZE)
+            _ = SuperBlock.from_bytes(superblock_bytes)  # Files starting with an MBR are not recordings
+            flights = recorded_flights(superblock_bytes)
+            if not flights:
+                return None
+
+            # Only the last flight can have been left behind by its recording
+            flight = max(flights, key=lambda recorded: recorded.first_block)
+            start = flight.first_block * BLOCK_SIZE
+            recorded_end = start + flight.num_blocks * BLOCK_SIZE
+            size = file.seek(0, 2)
+            if size <= recorded_end:
+                return None
+
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                end = end_of_blocks(data, walk_start(mission_file, start, recorded_end), size)
+    except ValueError:
+        return None
+    except OSError as e:
+        logger.warning(f"Could not check {mission_file.name}: {e}")
+        return None
+    return end if end > recorded_end else None
+
+
+def needs_repair(mission_file: Path) -> bool:
+    """Returns True if the recording must be migrated or recovered before all of it can be replayed."""
+    return padded_mission(mission_file) or unrecorded_end(mission_file) is not None
+
+
+def migrate_mission(mission_file: Path) -> bool:
+    """
+    Rewrites the block headers of the flights of a recording made before the SD block header length was fixed. Its
+    time index was built from the headers, so it is removed to be built again. SD card images are left alone.
+    Returns:
+        True if the recording was migrated.
+    """
+
+    if not padded_mission(mission_file):
+        return False
+    try:
+        starts, size = flight_starts(mission_file)
+        with open(mission_file, "r+b") as file, mmap.mmap(file.fileno(), 0) as data:
+            # Blocks past the end of the last flight are migrated too, so that they can be recovered
+            for start, end in zip(starts, [*starts[1:], size]):
+                unpad_header_lengths(data, start, end)
+        index_path(mission_file).unlink(missing_ok=True)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not migrate {mission_file.name}: {e}")
+        return False
+
+    logger.warning(f"Migrated {mission_file.name} from the old SD block header length")
+    return True
+
+
+def recover_mission(mission_file: Path) -> bool:
+    """
+    Extends the last flight of a mission recording over the valid blocks written past its end, if there are any.
+    Returns:
+        True if the recording was recovered.
+    """
+
+    end = unrecorded_end(mission_file)
+    if end is None:
+        return False
+    try:
+        with open(mission_file, "r+b") as file:
+            superblock_bytes = file.read(BLOCK_SIZE)
+            superblock = SuperBlock.from_bytes(superblock_bytes)
+            flights = recorded_flights(superblock_bytes)
+            flight = max(flights, key=lambda recorded: recorded.first_block)
+
+            # Whatever was cut short after the last valid block is covered with a spacer
+            if end % BLOCK_SIZE:
+                _ = file.seek(end)
+                _ = file.write(LoggingMetadataSpacerBlock(BLOCK_SIZE - end % BLOCK_SIZE).to_bytes())
+
+            flight.num_blocks = math.ceil((end - flight.first_block * BLOCK_SIZE) / BLOCK_SIZE)
+            superblock.flights = sorted(flights, key=lambda recorded: recorded.first_block)
+            _ = file.seek(0)
+            _ = file.write(superblock.to_bytes())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not recover {mission_file.name}: {e}")
+        return False
+
+    logger.warning(f"Recovered {mission_file.name}, its last flight is {flight.num_blocks} blocks long")
+    return True
+
+
+def backup_path(mission_file: Path) -> Path:
+    """Returns the path of the backup of a mission file, which is kept from before its first repair."""
+    return mission_file.with_name(f"{mission_file.name}.{BACKUP_EXTENSION}")
+
+
+def repair_mission(mission_file: Path) -> bool:
+    """
+    Migrates and recovers a recording if it needs it. The recording is copied to its backup file first, unless a
+    backup from an earlier repair is already there, and is left untouched if the copy cannot be made.
+    Returns:
+        True if the recording was repaired.
+    """
+
+    if not needs_repair(mission_file):
+        return False
+
+    backup = backup_path(mission_file)
+    if not backup.exists():
+        try:
+            _ = shutil.copy2(mission_file, backup)
+        except OSError as e:
+            logger.error(f"Not repairing {mission_file.name}, since it could not be backed up: {e}")
+            backup.unlink(missing_ok=True)
+            return False
+
+    migrated = migrate_mission(mission_file)
+    recovered = recover_mission(mission_file)
+    return migrated or recovered
@@ -1,5 +1,8 @@
 # Replays sensor packets from the mission file
 # Outputs data blocks to the UI
+# Seeking to a mission time finds the block to read from in the time index of the mission file, and outputs the blocks
+# of a short pre-roll window up to the mission time straight away, whether or not the replay is playing, so that the
+# telemetry history is filled again
 #
 # Authors:
 # Thomas Selwyn (Devil)
@@ -11,12 +14,23 @@ from queue import Queue
 from time import time, sleep
 from typing import BinaryIO
 
+from modules.misc.ring_buffer import SharedRingBuffer
 from modules.telemetry.block import RadioBlockType, SDBlockSubtype
 from modules.telemetry.superblock import find_superblock
+from modules.telemetry.time_index import FlightIndex, TimeIndex, time_index
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Replayed blocks are framed as their radio block type and subtype followed by the block data
+REPLAY_FRAME_HEADER = struct.Struct("<HH")
+
+# After a seek, the replay outputs a frame of this type holding the mission time it seeked to, before any of the blocks
+# from the new position, so that the telemetry process knows when to drop the history it built up
+REPLAY_SEEK_FRAME: int = 0xFFFF
+SEEK_TIME = struct.Struct("<I")
+REPLAY_PRE_ROLL: int = 5000  # Milliseconds of blocks before the mission time that are output right away after a seek
+
 
 def parse_sd_block_header(header_bytes: bytes) -> tuple[int, int, int]:
     """
@@ -36,10 +50,19 @@ def parse_sd_block_header(header_bytes: bytes) -> tuple[int, int, int]:
     return block_class, block_subtype, block_length
 
 
+def parse_replay_frame(frame: bytes) -> tuple[int, int, memoryview]:
+    """
+    Splits a frame output by the replay into its block type, block subtype and a view of the block data.
+    """
+
+    block_type, block_subtype = REPLAY_FRAME_HEADER.unpack_from(frame)
+    return block_type, block_subtype, memoryview(frame)[REPLAY_FRAME_HEADER.size :]
+
+
 class TelemetryReplay:
     def __init__(
         self,
-        replay_payloads: Queue[tuple[int, int, str]],
+        replay_payloads: SharedRingBuffer,
         replay_input: Queue[str],
         replay_speed: int,
         replay_path: Path,
@@ -47,7 +70,7 @@ class TelemetryReplay:
         super().__init__()
 
         # Replay buffers (Input and output)
-        self.replay_payloads: Queue[tuple[int, int, str]] = replay_payloads
+        self.replay_payloads: SharedRingBuffer = replay_payloads
         self.replay_input: Queue[str] = replay_input
 
         # Misc replay
@@ -58,37 +81,107 @@ class TelemetryReplay:
         self.total_time_offset = 0
         self.speed = replay_speed
         self.block_count = 0
+        self.finished = False
+        self.pre_roll_start = 0  # Blocks before this mission time are skipped rather than output, after a seek
 
         # Replay superblock
         superblock_result = find_superblock(self.replay_path)
         if superblock_result is None:
             raise ValueError(f"Could not find superblock in {self.replay_path}")
-        sb_addr, mission_sb = superblock_result
+        self.sb_addr, self.mission_sb = superblock_result
+
+        # Time index to seek with, read from the sidecar index of the mission file or built once
+        self.index: TimeIndex | None = None
+        self.flight_index: FlightIndex | None = None
+        try:
+            self.index = time_index(self.replay_path, self.sb_addr, self.mission_sb)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not index {self.replay_path.name}, seeking is not available: {e}")
 
+        self.replay()
+
+    def replay(self) -> None:
+        """Replays every flight of the mission file."""
         with open(self.replay_path, "rb") as file:
-            for flight in mission_sb.flights:
-                _ = file.seek((sb_addr + flight.first_block) * 512)
+            for i, flight in enumerate(self.mission_sb.flights):
+                self.flight_index = None if self.index is None else self.index.flights[i]
+                _ = file.seek((self.sb_addr + flight.first_block) * 512)
                 self.run(file, flight.num_blocks)
 
     def run(self, file: BinaryIO, num_blocks: int):
         """Run loop"""
         while True:
-            if self.speed > 0:
+            if self.speed > 0 and not self.finished:
                 self.read_next_sd_block(file, num_blocks)
 
-            if not self.replay_input.empty():
-                self.parse_input_command(self.replay_input.get())
+                if not self.replay_input.empty():
+                    self.parse_input_command(self.replay_input.get(), file)
+            else:
+                # Paused or finished, so sleep until a command arrives
+                self.parse_input_command(self.replay_input.get(), file)
 
-    def parse_input_command(self, data: str) -> None:
+    def parse_input_command(self, data: str, file: BinaryIO) -> None:
         cmd_list = data.split(" ")
         match cmd_list[0]:
             case "speed":
                 self.speed = float(cmd_list[1])
                 # Reset loop time so resuming playback doesn't skip the time it was paused
                 self.last_loop_time = int(time() * 1000)
+            case "seek":
+                self.seek(file, int(cmd_list[1]))
+            case "skip":
+                self.seek(file, int(self.total_time_offset) + int(cmd_list[1]))
             case _:
                 raise NotImplementedError(f"Replay command of {cmd_list} invalid.")
 
+    def seek(self, file: BinaryIO, mission_time: int) -> None:
+        """
+        Moves the replay of the current flight to the mission time, and carries on at the current speed. Reading starts
+        from the last indexed block before the pre-roll window, found with a binary search of the time index, and the
+        blocks up to the mission time are output right away, even while the replay is paused.
+        """
+
+        if self.flight_index is None:
+            logger.warning(f"Cannot seek in {self.replay_path.name} without its time index")
+            return
+
+        mission_time = min(max(0, mission_time), 2**32 - 1)  # Mission times are unsigned 32 bit
+        offset = self.flight_index.seek(mission_time - REPLAY_PRE_ROLL)
+        _ = file.seek(offset)
+        self.block_count = offset - self.flight_index.first_block * 512
+        self.pre_roll_start = mission_time - REPLAY_PRE_ROLL
+        self.finished = False
+
+        # The clock of the replay jumps to the mission time, so playback carries on from the end of the pre-roll
+        self.total_time_offset = mission_time
+        self.last_loop_time = int(time() * 1000)
+        self.output_replay_data(REPLAY_SEEK_FRAME, 0, SEEK_TIME.pack(mission_time))
+        self.output_pre_roll(file, self.flight_index.num_blocks, mission_time)
+
+    def output_pre_roll(self, file: BinaryIO, num_blocks: int, mission_time: int) -> None:
+        """
+        Outputs the telemetry blocks of the pre-roll window up to the mission time without waiting. The first block past
+        the mission time is left to be read by the playback.
+        """
+
+        while self.block_count <= ((num_blocks * 512) - 4):
+            position = file.tell()
+            try:
+                block_class, block_subtype, block_length = parse_sd_block_header(file.read(4))
+                block_data = file.read(block_length - 4)
+            except IOError as error:
+                logger.error(f"{error}")
+                return
+
+            if block_class == SDBlockSubtype.TELEMETRY_DATA:
+                block_time = struct.unpack("<I", block_data[:4])[0]
+                if block_time > mission_time:
+                    _ = file.seek(position)
+                    return
+                if block_time >= self.pre_roll_start:
+                    self.output_replay_data(RadioBlockType.DATA, block_subtype, block_data)
+            self.block_count += block_length
+
     def read_next_sd_block(self, file: BinaryIO, num_blocks: int):
         """Reads the next stored block and outputs it"""
         if self.block_count <= ((num_blocks * 512) - 4):
@@ -110,6 +203,8 @@ class TelemetryReplay:
 
             # First four bytes in block data is always mission time.
             block_time = struct.unpack("<I", block_data[:4])[0]
+            if block_time < self.pre_roll_start:
+                return
 
             # Calculate where we should be
             current_loop_time = int(time() * 1000)
@@ -125,9 +220,8 @@ class TelemetryReplay:
             self.output_replay_data(block_class, block_subtype, block_data)
         else:
             logger.info("Flight replay finished")
-            self.speed = 0
+            self.finished = True  # The speed is kept, so that seeking back carries on playing
 
     def output_replay_data(self, block_type: int, block_subtype: int, block_data: bytes):
-        # block_data should NOT contain block header and should be hex
-        replay_data = (block_type, block_subtype, block_data.hex())
-        self.replay_payloads.put(replay_data)
+        # block_data should NOT contain block header
+        self.replay_payloads.put(REPLAY_FRAME_HEADER.pack(block_type, block_subtype) + block_data)
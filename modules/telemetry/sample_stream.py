@@ -0,0 +1,118 @@
+# Binary websocket frames carrying every sample of the high rate sensor data blocks
+# Websocket clients that opt in receive one frame per KX134 or MPU9250 block, alongside the regular JSON frames
+#
+# Frames are little endian: a 16 byte header followed by count rows of channels values of the element type.
+# Multiplying a value by the scale gives the measurement in the units of the data block (g, degrees/s, uT, degrees C).
+#   subtype (u8) | element type (u8) | channels (u8) | reserved (u8) | mission time (u32) | count (u32) | scale (f32)
+# The header length is a multiple of 4, so clients can view the values as a typed array without copying them.
+
+# Imports
+import struct
+from enum import IntEnum
+from itertools import chain
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import (
+    KX134_HEADER_FORMAT,
+    MPU9250_COLUMNS,
+    MPU9250_MEASUREMENTS,
+    DataBlock,
+    KX134AccelerometerDataBlock,
+    KX134Resolution,
+    MPU9250IMUDataBlock,
+    MPU9250SampleArray,
+)
+
+# Constants
+SAMPLE_FRAME_HEADER: struct.Struct = struct.Struct("<BBBxIIf")
+KX134_CHANNELS: int = 3  # x, y, z
+
+
+class SampleElementType(IntEnum):
+    """The type of the values that follow the header of a sample frame."""
+
+    INT8 = 0
+    INT16 = 1
+    FLOAT32 = 2
+
+    @property
+    def size(self) -> int:
+        """The size of a single value in bytes."""
+        match self:
+            case SampleElementType.INT8:
+                return 1
+            case SampleElementType.INT16:
+                return 2
+            case SampleElementType.FLOAT32:
+                return 4
+
+
+def encode_kx134(block: KX134AccelerometerDataBlock) -> bytes:
+    """Returns a sample frame of the raw accelerometer readings, scaled to g by the frame scale."""
+
+    if block.resolution == KX134Resolution.RES_8_BIT:
+        element_type = SampleElementType.INT8
+    else:
+        element_type = SampleElementType.INT16
+
+    # The payload the block was decoded from already holds the readings as little endian integers, exactly as the
+    # sensor reported them. Only blocks built from scaled samples are serialized to get them
+    count = len(block.samples)
+    samples = block.raw_samples
+    if samples is None:
+        samples_start = KX134_HEADER_FORMAT.size
+        samples = block.to_payload()[samples_start : samples_start + count * KX134_CHANNELS * element_type.size]
+
+    sensitivity = (2 ** (block.resolution.bits - 1)) // block.accel_range.acceleration
+    header = SAMPLE_FRAME_HEADER.pack(
+        block.subtype, element_type, KX134_CHANNELS, block.mission_time, count, 1 / sensitivity
+    )
+    return header + samples
+
+
+def encode_mpu9250(block: MPU9250IMUDataBlock) -> bytes:
+    """
+    Returns a sample frame of the scaled measurements, with one channel per measurement in the order of
+    MPU9250_COLUMNS. Each measurement has its own sensitivity, so the values are sent already scaled.
+    """
+
+    count = len(block.samples)
+    if isinstance(block.samples, MPU9250SampleArray):
+        samples = block.samples.values.astype("<f4").tobytes()
+    else:
+        values = chain.from_iterable(MPU9250_MEASUREMENTS(sample) for sample in block.samples)
+        samples = struct.pack(f"<{count * len(MPU9250_COLUMNS)}f", *values)
+
+    header = SAMPLE_FRAME_HEADER.pack(
+        block.subtype, SampleElementType.FLOAT32, len(MPU9250_COLUMNS), block.mission_time, count, 1.0
+    )
+    return header + samples
+
+
+def encode_sample_frame(block: DataBlock) -> bytes | None:
+    """Returns the binary sample frame for the data block, or None if its subtype is not streamed."""
+
+    match block.subtype:
+        case DataBlockSubtype.KX134_1211_ACCEL:
+            return encode_kx134(block)  # type: ignore
+        case DataBlockSubtype.MPU9250_IMU:
+            return encode_mpu9250(block)  # type: ignore
+        case _:
+            return None
+
+
+def decode_sample_frame(frame: bytes) -> tuple[DataBlockSubtype, int, float, list[tuple[float, ...]]]:
+    """
+    Decodes a sample frame the way a websocket client would.
+    Returns:
+        The subtype, mission time and scale of the frame, and one tuple of scaled values per sample.
+    """
+
+    subtype, element_type, channels, mission_time, count, scale = SAMPLE_FRAME_HEADER.unpack_from(frame)
+    element_format = {SampleElementType.INT8: "b", SampleElementType.INT16: "h", SampleElementType.FLOAT32: "f"}
+    row_format = struct.Struct(f"<{channels}{element_format[SampleElementType(element_type)]}")
+
+    rows: list[tuple[float, ...]] = []
+    for row in row_format.iter_unpack(frame[SAMPLE_FRAME_HEADER.size :][: count * row_format.size]):
+        rows.append(tuple(value * scale for value in row))
+    return DataBlockSubtype(subtype), mission_time, scale, rows
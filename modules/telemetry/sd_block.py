@@ -3,12 +3,23 @@
 
 # Imports
 from __future__ import annotations
+import mmap
 import struct
 from abc import ABC, abstractmethod
 from typing import Self, Any
 from modules.telemetry.data_block import DataBlock
 import modules.telemetry.block as blk
 
+# Constants
+SD_BLOCK_HEADER = struct.Struct("<HH")
+SD_BLOCK_SUBTYPES: dict[int, set[int]] = {
+    blk.SDBlockSubtype.LOGGING_METADATA: set(blk.LoggingMetadataBlockSubtype),
+    blk.SDBlockSubtype.TELEMETRY_DATA: set(blk.DataBlockSubtype) - {blk.DataBlockSubtype.RESERVED},
+    blk.SDBlockSubtype.DIAGNOSTIC_DATA: set(blk.DiagnosticDataBlockSubtype),
+    blk.SDBlockSubtype.TELEMETRY_CONTROL: set(blk.ControlBlockSubtype),
+    blk.SDBlockSubtype.TELEMETRY_COMMAND: set(blk.CommandBlockSubtype),
+}
+
 
 # Custom Exceptions
 class SDBlockException(blk.BlockException):
@@ -23,6 +34,19 @@ class SDBlockUnknownException(blk.BlockUnknownException):
     pass
 
 
+def sd_block_header_at(data: bytes | memoryview | mmap.mmap, offset: int) -> tuple[int, int, int]:
+    """Parses the class, subtype and length of the SD block header at the offset, as parse_sd_block_header does."""
+    block_type, block_length = SD_BLOCK_HEADER.unpack_from(data, offset)
+    return block_type & 0x3F, block_type >> 6, block_length
+
+
+def valid_sd_block_header(block_class: int, block_subtype: int, block_length: int) -> bool:
+    """Returns True if the parsed header could start a block, judging by its class, subtype and length alone."""
+    if block_length < SD_BLOCK_HEADER.size or block_length % 4 != 0:
+        return False
+    return block_subtype in SD_BLOCK_SUBTYPES.get(block_class, ())
+
+
 class SDBlock(ABC):
     """Defines the interface for all SDBlock subtypes."""
 
@@ -38,16 +62,29 @@ class SDBlock(ABC):
     def to_bytes(self):
         """Marshal block to a bytes object"""
         payload = self._payload_bytes()
-
-        block_class_type = (int(self.sd_subtype) & 0x3F) | ((int(self.subtype) & 0x3FF) << 6)
-        head = struct.pack("<HH", block_class_type, len(self) + 4)
+        head = SD_BLOCK_HEADER.pack(self._block_class_type(), len(self))
 
         return head + payload
 
+    def pack_into(self, buffer: bytearray | memoryview, offset: int) -> int:
+        """Marshals the block into the buffer starting at offset, and returns the number of bytes written."""
+        length = len(self)
+        SD_BLOCK_HEADER.pack_into(buffer, offset, self._block_class_type(), length)
+        self._pack_payload_into(buffer, offset + SD_BLOCK_HEADER.size)
+        return length
+
+    def _block_class_type(self) -> int:
+        return (int(self.sd_subtype) & 0x3F) | ((int(self.subtype) & 0x3FF) << 6)
+
     @abstractmethod
     def _payload_bytes(self) -> bytes:
         """Marshal payload to bytes"""
 
+    def _pack_payload_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        """Marshals the payload into the buffer starting at offset"""
+        payload = self._payload_bytes()
+        buffer[offset : offset + len(payload)] = payload
+
     @classmethod
     def from_bytes(cls, byte_data: bytes) -> SDBlock:
         """Unmarshal a bytes object to appropriate block class."""
@@ -137,6 +174,9 @@ class TelemetryDataBlock(SDBlock):
     def _payload_bytes(self) -> bytes:
         return self.data.to_payload()
 
+    def _pack_payload_into(self, buffer: bytearray | memoryview, offset: int) -> None:
+        self.data.pack_into(buffer, offset)
+
     def __str__(self):
         return f"{self.__class__.__name__} -> {self.data}"
 
@@ -5,7 +5,6 @@
 # Authors:
 # Thomas Selwyn (Devil)
 # Matteo Golin (linguini1)
-from io import BufferedWriter
 import logging
 import math
 from ast import literal_eval
@@ -15,26 +14,48 @@ from multiprocessing import Process, active_children
 from pathlib import Path
 
 from signal import signal, SIGTERM
-from time import time
+from time import monotonic, time
 from typing import Any, TypeAlias
 
 import modules.telemetry.json_packets as jsp
 import modules.websocket.commands as wsc
-from modules.telemetry.block import RadioBlockType, CommandBlockSubtype, ControlBlockSubtype, BlockHeader, PacketHeader
+from modules.telemetry.block import (
+    RadioBlockType,
+    CommandBlockSubtype,
+    ControlBlockSubtype,
+    BlockHeader,
+    PacketHeader,
+    BLOCK_HEADER_LENGTH,
+    PACKET_HEADER_LENGTH,
+)
+from modules.telemetry.catalog import MissionCatalog
+from modules.telemetry.codec import get_decoder
 from modules.telemetry.data_block import DataBlock, DataBlockSubtype
-from modules.telemetry.replay import TelemetryReplay
-from modules.telemetry.sd_block import TelemetryDataBlock, LoggingMetadataSpacerBlock
-from modules.telemetry.superblock import SuperBlock, Flight
+from modules.telemetry.history import ENCODER, TelemetryHistory
+from modules.telemetry.recorder import MissionRecorder
+from modules.telemetry.recovery import repair_mission
+from modules.telemetry.replay import REPLAY_SEEK_FRAME, SEEK_TIME, TelemetryReplay, parse_replay_frame
+from modules.telemetry.sample_stream import encode_sample_frame
+from modules.telemetry.sd_block import TelemetryDataBlock
 from modules.misc.config import Config
+from modules.misc.frame_counters import FrameCounters
+from modules.misc.dir_watch import DirectoryWatcher, watch_directory
+from modules.misc.queue_wait import SignalWakeup, wait_for_queues
+from modules.misc.ring_buffer import SharedRingBuffer
 
 # Types
 JSON: TypeAlias = dict[str, Any]
+# The type of a websocket frame and the encoded frame, followed by the websocket client the frame is for if it is only
+# for a single client
+Frame: TypeAlias = tuple[str, str | bytes] | tuple[str, str | bytes, int]
 
 # Constants
 ORG: str = "CUInSpace"
 VERSION: str = "0.5.0-DEV"
 MISSION_EXTENSION: str = "mission"
 FILE_CREATION_ATTEMPT_LIMIT: int = 50
+CATALOG_PAGE_SIZE: int = 50
+REPLAY_STOP_TIMEOUT: float = 1.0  # Seconds the replay process is given to exit before it is killed
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -47,6 +68,18 @@ def mission_path(mission_name: str, missions_dir: Path, file_suffix: int = 0) ->
     return missions_dir.joinpath(f"{mission_name}{'' if file_suffix == 0 else f'_{file_suffix}'}.{MISSION_EXTENSION}")
 
 
+def changed_fields(previous: JSON, current: JSON) -> JSON:
+    """Returns the fields of each status section that differ between the previous and current status."""
+
+    changes: JSON = {}
+    for section, fields in current.items():
+        previous_fields = previous.get(section, {})
+        changed = {key: value for key, value in fields.items() if previous_fields.get(key) != value}
+        if changed:
+            changes[section] = changed
+    return changes
+
+
 def shutdown_sequence() -> None:
     for child in active_children():
         child.terminate()
@@ -99,18 +132,19 @@ class Telemetry(Process):
     def __init__(
         self,
         serial_status: Queue[str],
-        radio_payloads: Queue[Any],
+        radio_payloads: SharedRingBuffer,
         rn2483_radio_input: Queue[str],
         radio_signal_report: Queue[str],
-        telemetry_json_output: Queue[JSON],
+        telemetry_json_output: Queue[Frame],
         telemetry_ws_commands: Queue[list[str]],
         config: Config,
+        frame_counters: FrameCounters | None = None,
     ):
         super().__init__()
         self.config = config
 
-        self.radio_payloads: Queue[str] = radio_payloads
-        self.telemetry_json_output: Queue[JSON] = telemetry_json_output
+        self.radio_payloads: SharedRingBuffer = radio_payloads
+        self.telemetry_json_output: Queue[Frame] = telemetry_json_output
         self.telemetry_ws_commands: Queue[list[str]] = telemetry_ws_commands
         self.rn2483_radio_input: Queue[str] = rn2483_radio_input
         self.radio_signal_report: Queue[str] = radio_signal_report
@@ -118,32 +152,81 @@ class Telemetry(Process):
 
         # Telemetry Data holds the last few copies of received data blocks stored under the subtype name as a key.
         self.status: jsp.StatusData = jsp.StatusData()
-        self.telemetry: dict[str, list[dict[str, str]]] = {}
+        self.telemetry: TelemetryHistory = TelemetryHistory(config.telemetry_buffer_size, config.telemetry_buffer_sizes)
+
+        # Websocket frames, starting from a full snapshot
+        self.websocket_seq: int = 0
+        self.snapshot_pending: bool = True
+        self.resync_pending: bool = False  # Set when the websocket process asks for a snapshot to resync clients from
+        self.sent_status: JSON = {}  # Status as of the last frame, to find the fields that changed since
+        self.sent_totals: dict[DataBlockSubtype, int] = {}  # History totals as of the last frame
+        self.stream_samples: bool = False  # Set while websocket clients want binary sample frames
+        self.sent_catalog: list[jsp.MissionEntry] = []  # Mission recordings as of the last catalog frame
+
+        # Websocket rate limit
+        self.websocket_dirty: bool = False
+        self.publish_interval: float = 1 / config.websocket_max_rate
+        self.last_publish: float = -math.inf
+        # Updates against frames published, shared with the websocket process that reports them
+        self.frame_counters: FrameCounters = FrameCounters() if frame_counters is None else frame_counters
 
         # Mission System
         self.missions_dir = Path.cwd().joinpath("missions")
         self.missions_dir.mkdir(parents=True, exist_ok=True)
         self.mission_path: Path | None = None
+        self.catalog: MissionCatalog = MissionCatalog(self.missions_dir)
+        self.mission_watcher: DirectoryWatcher = watch_directory(self.missions_dir, f".{MISSION_EXTENSION}")
+        self.update_mission_list()
 
         # Mission Recording
-        self.mission_recording_file: BufferedWriter | None = None
-        self.mission_recording_sb: SuperBlock = SuperBlock()
-        self.mission_recording_buffer: bytearray = bytearray(b"")
+        self.recorder: MissionRecorder | None = None
 
         # Replay System
         self.replay = None
         self.replay_input: Queue[str] = mp.Queue()  # type:ignore
-        self.replay_output: Queue[tuple[int, int, str]] = mp.Queue()  # type:ignore
+        self.replay_output: SharedRingBuffer = SharedRingBuffer()
 
-        # Handle program closing to ensure no orphan processes
-        signal(SIGTERM, shutdown_sequence)  # type:ignore
+        # Handle program closing to ensure no orphan processes or half written recordings
+        signal(SIGTERM, self.shutdown)  # type:ignore
+        self.signal_wakeup: SignalWakeup = SignalWakeup()
 
         # Start Telemetry
-        self.update_websocket()
+        self.update_websocket(immediate=True)
         self.run()
 
+    def shutdown(self, *_) -> None:
+        """Closes off the current recording, then stops the replay and exits."""
+
+        if self.recorder is not None:
+            self.stop_recording()
+        shutdown_sequence()
+
     def run(self):
         while True:
+            # Sleep until there is something to do on any of the input queues
+            payload_queue = (
+                self.replay_output if self.status.mission.state == jsp.MissionState.RECORDED else self.radio_payloads
+            )
+            ready = wait_for_queues(
+                [
+                    self.telemetry_ws_commands,
+                    self.radio_signal_report,
+                    self.serial_status,
+                    payload_queue,
+                    self.mission_watcher,
+                    self.signal_wakeup,
+                ],
+                timeout=self.publish_timeout(),
+            )
+
+            # The handlers of the signals that woke the wait have already run
+            if self.signal_wakeup in ready:
+                self.signal_wakeup.clear()
+
+            # Only the recordings the watcher reported are read, the missions folder is never listed here
+            if self.mission_watcher in ready:
+                self.update_missions(self.mission_watcher.changes())
+
             while not self.telemetry_ws_commands.empty():
                 # Parse websocket command into an enum
                 commands: list[str] = self.telemetry_ws_commands.get()
@@ -168,26 +251,161 @@ class Telemetry(Process):
             match self.status.mission.state:
                 case jsp.MissionState.RECORDED:
                     while not self.replay_output.empty():
-                        block_type, block_subtype, block_data = self.replay_output.get()
-                        self.parse_rn2483_payload(block_type, block_subtype, block_data)
+                        self.parse_replay_output(self.replay_output.get())
                         self.update_websocket()
                 case _:
                     while not self.radio_payloads.empty():
                         self.parse_rn2483_transmission(self.radio_payloads.get())
                         self.update_websocket()
 
-    def update_websocket(self) -> None:
-        """Updates the websocket with the latest packet using the JSON output process."""
-        self.telemetry_json_output.put(self.generate_websocket_response())
+            # Publish changes that were held back by the rate limit once their time has come
+            self.publish_websocket()
+
+    def update_websocket(self, immediate: bool = False) -> None:
+        """
+        Marks the websocket state as changed. Changes are published at most websocket_max_rate times per second, or
+        right away when immediate is set, i.e. to acknowledge a command.
+        """
+
+        self.frame_counters.updates += 1
+        self.websocket_dirty = True
+        self.publish_websocket(force=immediate)
+
+    def publish_timeout(self) -> float | None:
+        """Returns the seconds until held back changes are due to be published, or None if there are none."""
 
-    def generate_websocket_response(self) -> JSON:
-        """Returns the dictionary containing the JSON data for the websocket client."""
-        return {"version": VERSION, "org": ORG, "status": dict(self.status), "telemetry": self.telemetry}
+        if not self.websocket_dirty:
+            return None
+        return max(0.0, self.last_publish + self.publish_interval - monotonic())
+
+    def publish_websocket(self, force: bool = False) -> None:
+        """
+        Publishes changes to the websocket using the JSON output process, if the rate limit allows it or force is set.
+        A full snapshot is sent to every client after a reset, otherwise only the changes since the last frame are sent,
+        if there are any. When the websocket process asks to resync, a snapshot of the state as of the last frame
+        follows, which it sends only to the clients that need it.
+        """
+
+        now = monotonic()
+        if not self.websocket_dirty or (not force and now - self.last_publish < self.publish_interval):
+            return
+
+        self.websocket_dirty = False
+        self.last_publish = now
+        frames: list[Frame] = []
+        if self.snapshot_pending:
+            frames.append(self.generate_websocket_response())
+        else:
+            delta = self.generate_websocket_delta()
+            if delta is not None:
+                frame_type, message = delta
+                # Command acknowledgements are only dropped once a snapshot that carries them is queued for a client
+                frames.append(("reply" if force else frame_type, message))
+            if self.resync_pending:
+                frames.append(("resync", self.generate_websocket_response(next_seq=False)[1]))
+        self.resync_pending = False
+
+        for frame in frames:
+            self.telemetry_json_output.put(frame)
+        self.frame_counters.frames += len(frames)
+
+    def generate_websocket_response(self, next_seq: bool = True) -> Frame:
+        """
+        Returns a full snapshot of the JSON data for the websocket client. Snapshots that resync clients keep the
+        sequence number of the last frame, so that clients already in sync carry on with the next delta.
+        """
+
+        if next_seq:
+            self.websocket_seq += 1
+        self.snapshot_pending = False
+        self.sent_status = dict(self.status)
+        self.sent_totals = self.telemetry.totals()
+        return "snapshot", (
+            f'{{"type":"snapshot","seq":{self.websocket_seq},"version":{ENCODER.encode(VERSION)},'
+            f'"org":{ENCODER.encode(ORG)},"status":{ENCODER.encode(self.sent_status)},'
+            f'"telemetry":{self.telemetry.encode()}}}'
+        )
+
+    def generate_websocket_delta(self) -> Frame | None:
+        """
+        Returns the status fields that changed and the telemetry history entries that were added since the last frame
+        as JSON data for the websocket client, or None if nothing changed.
+        """
+
+        status = dict(self.status)
+        status_changes = changed_fields(self.sent_status, status)
+        telemetry_changes = self.telemetry.encode(self.sent_totals)
+        if not status_changes and telemetry_changes == "{}":
+            return None
+
+        self.websocket_seq += 1
+        self.sent_status = status
+        self.sent_totals = self.telemetry.totals()
+        return "delta", (
+            f'{{"type":"delta","seq":{self.websocket_seq},"status":{ENCODER.encode(status_changes)},'
+            f'"telemetry":{telemetry_changes}}}'
+        )
+
+    def publish_catalog(self, page: int = 0, page_size: int = CATALOG_PAGE_SIZE, client: int | None = None) -> None:
+        """
+        Publishes a page of the mission recordings available for replay to the websocket client that asked for it, or
+        to every client if client is None. The catalog is only sent when a client asks for it or when it changes, so
+        that telemetry frames carry nothing but live state.
+        """
+
+        if page < 0 or page_size < 1:
+            raise ValueError(f"page {page} of size {page_size} does not exist")
+
+        missions = self.status.replay.mission_list
+        pages = max(1, math.ceil(len(missions) / page_size))
+        entries = [dict(mission) for mission in missions[page * page_size : (page + 1) * page_size]]
+        message = (
+            f'{{"type":"catalog","page":{page},"pages":{pages},"page_size":{page_size},'
+            f'"total":{len(missions)},"missions":{ENCODER.encode(entries)}}}'
+        )
+        if client is None:
+            self.sent_catalog = missions
+            self.telemetry_json_output.put(("catalog", message))
+        else:
+            self.telemetry_json_output.put(("page", message, client))
+
+    def publish_catalog_changes(self) -> None:
+        """Publishes the first page of the catalog to every client if the mission recordings changed since then."""
+
+        if self.status.replay.mission_list != self.sent_catalog:
+            self.publish_catalog()
+
+    def update_mission_list(self) -> None:
+        """Updates the mission recordings available for replay, reading only the recordings that changed."""
+        self.set_mission_list(self.catalog.scan())
+
+    def update_missions(self, names: set[str] | None) -> None:
+        """
+        Updates the catalog with the recordings the missions folder watcher reported as added, removed or finished,
+        and publishes the catalog to the websocket clients if it changed. None rescans the whole folder.
+        """
+
+        if names is None:
+            self.update_mission_list()
+        elif self.catalog.update(names):
+            self.set_mission_list(self.catalog.missions())
+        self.publish_catalog_changes()
+
+    def set_mission_list(self, missions: list[jsp.MissionEntry]) -> None:
+        self.status.replay.mission_list = missions
+        self.status.replay.mission_files_list = [mission_path(mission.name, self.missions_dir) for mission in missions]
 
     def reset_data(self) -> None:
         """Resets all live data on the telemetry backend to a default state."""
-        self.status = jsp.StatusData()
-        self.telemetry = {}
+
+        # The mission recordings are not live data, and are kept rather than read from the disk again
+        replay = self.status.replay
+        self.status = jsp.StatusData(
+            replay=jsp.ReplayData(mission_files_list=replay.mission_files_list, mission_list=replay.mission_list)
+        )
+        self.telemetry.clear()
+        self.snapshot_pending = True  # Clients must drop the history they have built up
+        self.publish_catalog_changes()
 
     def parse_serial_status(self, command: str, data: str) -> None:
         """Parses the serial managers status output"""
@@ -215,7 +433,28 @@ class Telemetry(Process):
         WSCommand = wsc.WebsocketCommand
         match command:
             case WSCommand.UPDATE:
-                self.status.replay.update_mission_list()
+                self.update_mission_list()
+            case WSCommand.RESYNC:
+                self.resync_pending = True
+            case WSCommand.SAMPLES:
+                self.stream_samples = bool(parameters) and parameters[0] == "on"
+            case WSCommand.CATALOG:
+                # The websocket process puts the client that asked for the page before the page and its size
+                try:
+                    client, *page = (int(parameter) for parameter in parameters[:3])
+                    self.publish_catalog(*page, client=client)
+                except ValueError as e:
+                    logger.error(f"Invalid catalog page: {e}")
+            case WSCommand.REPAIR:
+                mission_name = None if not parameters else " ".join(parameters)
+                try:
+                    self.repair_mission(mission_name)
+                except MissionNotFoundError as e:
+                    logger.error(e.message)
+                except AlreadyRecordingError as e:
+                    logger.error(e.message)
+                except ReplayPlaybackError as e:
+                    logger.error(e.message)
 
             # Replay commands
             case WSCommand.REPLAY.value.PLAY:
@@ -232,6 +471,10 @@ class Telemetry(Process):
                 self.set_replay_speed(self.status.replay.last_played_speed)
             case WSCommand.REPLAY.value.SPEED:
                 self.set_replay_speed(float(parameters[0]))
+            case WSCommand.REPLAY.value.SEEK:
+                self.seek_replay("seek", parameters)
+            case WSCommand.REPLAY.value.SKIP:
+                self.seek_replay("skip", parameters)
             case WSCommand.REPLAY.value.STOP:
                 self.stop_replay()
 
@@ -250,7 +493,9 @@ class Telemetry(Process):
             case _:
                 raise NotImplementedError(f"Command {command} not implemented.")
 
-        self.update_websocket()
+        # Acknowledge the command right away
+        self.update_websocket(immediate=True)
+        self.publish_catalog_changes()
 
     def set_replay_speed(self, speed: float):
         """Set the playback speed of the replay system."""
@@ -275,18 +520,73 @@ class Telemetry(Process):
             self.status.replay.state = jsp.ReplayState.PLAYING
             self.replay_input.put(f"speed {speed}")
 
+    def seek_replay(self, command: str, parameters: list[str]) -> None:
+        """
+        Moves the replay to a mission time in ms, or by a number of ms for skip. The history is rebuilt once the replay
+        outputs the blocks from its new position.
+        """
+
+        if self.replay is None or self.status.mission.state != jsp.MissionState.RECORDED:
+            logger.error(f"Cannot {command} without a replay playing")
+            return
+        try:
+            milliseconds = int(parameters[0])
+        except (IndexError, ValueError):
+            logger.error(f"Replay {command} needs a whole number of milliseconds, not {parameters}")
+            return
+        self.replay_input.put(f"{command} {milliseconds}")
+
+    def parse_replay_output(self, frame: bytes) -> None:
+        """Parses a frame output by the replay, dropping the telemetry history when the replay reports a seek."""
+
+        block_type, block_subtype, block_data = parse_replay_frame(frame)
+        if block_type != REPLAY_SEEK_FRAME:
+            self.parse_rn2483_payload(block_type, block_subtype, block_data)
+            return
+
+        logger.info(f"Replay seeked to {SEEK_TIME.unpack_from(block_data)[0]} ms")
+        self.status.mission.last_mission_time = -1  # Counted up again by the pre-roll blocks
+        self.telemetry.clear()
+        self.snapshot_pending = True  # Clients must drop the history they have built up
+
     def stop_replay(self) -> None:
         """Stops the replay."""
 
         logger.info("REPLAY STOP")
 
+        # The replay output may only be cleared once the replay has exited, since it could still be writing a frame
         if self.replay is not None:
             self.replay.terminate()
+            self.replay.join(REPLAY_STOP_TIMEOUT)
+            if self.replay.is_alive():
+                logger.warning("Replay did not stop in time, killing it")
+                self.replay.kill()
+                self.replay.join()
         self.replay = None
 
         self.reset_data()
         # Empty replay output
-        self.replay_output: Queue[tuple[int, int, str]] = mp.Queue()  # type: ignore
+        self.replay_output.clear()
+
+    def repair_mission(self, mission_name: str | None) -> None:
+        """
+        Repairs a mission recording that the catalog flagged, after backing it up, and reads its details again. The
+        recording being written and the recording being replayed are never repaired.
+        """
+
+        if mission_name is None:
+            raise MissionNotFoundError("")
+
+        mission_file = mission_path(mission_name, self.missions_dir)
+        if mission_file not in self.status.replay.mission_files_list:
+            raise MissionNotFoundError(mission_name)
+        if mission_file.name == self.catalog.recording:
+            raise AlreadyRecordingError("Cannot repair the recording being written.")
+        if self.replay is not None and self.status.mission.name == mission_name:
+            raise ReplayPlaybackError("Cannot repair the recording being replayed.")
+
+        if repair_mission(mission_file) and self.catalog.update([mission_file.name]):
+            self.set_mission_list(self.catalog.missions())
 
     def play_mission(self, mission_name: str | None) -> None:
         """Plays the desired mission recording."""
@@ -336,13 +636,15 @@ class Telemetry(Process):
         recording_epoch = int(time())
         mission_name = str(recording_epoch) if not mission_name else mission_name
         self.mission_path = get_filepath_for_proposed_name(mission_name, self.missions_dir)
-        self.mission_recording_file = open(self.mission_path, "wb")
 
-        # Create SuperBlock in file
-        flight = Flight(first_block=1, num_blocks=0, timestamp=recording_epoch)
-        self.mission_recording_sb.flights = [flight]
-        _ = self.mission_recording_file.write(self.mission_recording_sb.to_bytes())
-        self.mission_recording_file.flush()
+        # Blocks are written to the file from the writer thread of the recorder, and the catalog leaves the file be
+        self.catalog.recording = self.mission_path.name
+        self.recorder = MissionRecorder(
+            self.mission_path,
+            recording_epoch,
+            fsync_policy=self.config.recording_fsync,
+            sync_interval=self.config.recording_sync_interval,
+        )
 
         # Status update
         self.status.mission.name = mission_name
@@ -354,61 +656,42 @@ class Telemetry(Process):
 
         logger.info("RECORDING STOP")
 
-        if self.mission_recording_file is None:
-            raise ValueError("mission_recording_file attribute not initialized to a file.")
-
-        # Flush buffer and close off file
-        self.recording_write_bytes(len(self.mission_recording_buffer), spacer=True)
-        self.mission_recording_file.flush()
-        self.mission_recording_file.close()
+        if self.recorder is None:
+            raise ValueError("recorder attribute not initialized to a recording.")
 
-        # Reset recording data
-        self.mission_recording_file = None
-        self.mission_recording_sb = SuperBlock()
-        self.mission_recording_buffer = bytearray(b"")
+        # Wait for the writer to close off the file
+        self.recorder.close()
+        self.recorder = None
+        self.catalog.recording = None
 
         # Reset mission data except state and last mission time
         self.status.mission = jsp.MissionData(
             state=self.status.mission.state, last_mission_time=self.status.mission.last_mission_time
         )
 
-    def recording_write_bytes(self, num_bytes: int, spacer: bool = False) -> None:
-        """Outputs the specified number of bytes from the buffer to the recording file"""
+    def parse_rn2483_payload(
+        self,
+        block_type: int,
+        block_subtype: int,
+        buffer: bytes | memoryview,
+        offset: int = 0,
+        length: int | None = None,
+    ) -> None:
+        """
+        Parses telemetry payload blocks from either parsed packets or stored replays. Block contents are the length
+        bytes of the buffer starting at offset (the rest of the buffer by default) and do not include the block header.
+        """
 
-        # If the file is open
-        if self.mission_recording_file is None:
-            return
+        if length is None:
+            length = len(buffer) - offset
 
-        # If there's nothing in buffer
-        # Then there's no need to dump buffer
-        if num_bytes == 0:
+        # Data blocks make up almost all traffic, so they are decoded straight from the registry
+        decoder = get_decoder(block_type, block_subtype)
+        if decoder is not None:
+            logger.debug(f"Content length: {length}")
+            self.parse_data_block(decoder(buffer, offset, length))
             return
 
-        # Update Superblock with new block count
-        self.mission_recording_sb.flights[0].num_blocks += int(math.ceil(num_bytes / 512))
-        _ = self.mission_recording_file.seek(0)
-        _ = self.mission_recording_file.write(self.mission_recording_sb.to_bytes())
-
-        # Dump entire buffer to file
-        blocks = self.mission_recording_buffer[:num_bytes]
-        self.mission_recording_buffer = self.mission_recording_buffer[num_bytes:]
-        _ = self.mission_recording_file.seek(0, 2)
-        _ = self.mission_recording_file.write(blocks)
-
-        # If less than 512 bytes, or a spacer is requested then write a spacer
-        if num_bytes < 512 or spacer:
-            spacer_block = LoggingMetadataSpacerBlock(512 - (num_bytes % 512))
-            _ = self.mission_recording_file.write(spacer_block.to_bytes())
-
-    def parse_rn2483_payload(self, block_type: int, block_subtype: int, contents: str) -> None:
-        """
-        Parses telemetry payload blocks from either parsed packets or stored replays. Block contents are a hex string.
-        """
-
-        # Working with hex strings until this point.
-        # Hex/Bytes Demarcation point
-        logger.debug(f"Block contents: {contents}")
-        block_contents: bytes = bytes.fromhex(contents)
         try:
             radio_block = RadioBlockType(block_type)
         except Exception:
@@ -428,49 +711,45 @@ class Telemetry(Process):
                 self.rn2483_radio_input.put("radio get snr")
                 return
             case RadioBlockType.DATA:
-                # DATA BLOCK DETECTED
-                logger.debug(f"Content length: {len(block_contents)}")
-                block = DataBlock.parse(DataBlockSubtype(block_subtype), block_contents)
-                logger.debug(f"Data block parsed with mission time {block.mission_time}")
-
-                # Increase the last mission time
-                if block.mission_time > self.status.mission.last_mission_time:
-                    self.status.mission.last_mission_time = block.mission_time
-
-                # Write data to file when recording
-                logger.debug(f"Recording: {self.status.mission.recording}")
-                if self.status.mission.recording:
-                    self.mission_recording_buffer += TelemetryDataBlock(block.subtype, data=block).to_bytes()
-                    if len(self.mission_recording_buffer) >= 512:
-                        buffer_length = len(self.mission_recording_buffer)
-                        self.recording_write_bytes(buffer_length - (buffer_length % 512))
-
-                if block.subtype == DataBlockSubtype.STATUS:
-                    self.status.rocket = jsp.RocketData.from_data_block(block)  # type:ignore
-                else:
-                    # Stores the last n packets into the telemetry data buffer
-                    if self.telemetry.get(block.subtype.name.lower()) is None:
-                        self.telemetry[block.subtype.name.lower()] = [dict(block)]  # type:ignore
-                    else:
-                        self.telemetry[block.subtype.name.lower()].append(dict(block))  # type:ignore
-                        if len(self.telemetry[block.subtype.name.lower()]) > self.config.telemetry_buffer_size:
-                            self.telemetry[block.subtype.name.lower()].pop(0)
+                logger.warning(f"Unknown data block subtype: {block_subtype}")
             case _:
                 logger.warning("Unknown block type.")
 
-    def parse_rn2483_transmission(self, data: str):
+    def parse_data_block(self, block: DataBlock) -> None:
+        """Records a parsed data block and adds it to the telemetry history."""
+
+        logger.debug(f"Data block parsed with mission time {block.mission_time}")
+
+        # Increase the last mission time
+        if block.mission_time > self.status.mission.last_mission_time:
+            self.status.mission.last_mission_time = block.mission_time
+
+        # Write data to file when recording
+        logger.debug(f"Recording: {self.status.mission.recording}")
+        if self.status.mission.recording and self.recorder is not None:
+            self.recorder.write_block(TelemetryDataBlock(block.subtype, data=block))
+
+        if block.subtype == DataBlockSubtype.STATUS:
+            self.status.rocket = jsp.RocketData.from_data_block(block)  # type:ignore
+        else:
+            # Stores the last n packets into the telemetry data buffer
+            self.telemetry.append(block.subtype, dict(block))  # type:ignore
+
+        # Sample frames are sent as they arrive rather than coalesced, since each one holds different samples
+        if self.stream_samples:
+            frame = encode_sample_frame(block)
+            if frame is not None:
+                self.telemetry_json_output.put(("samples", frame))
+
+    def parse_rn2483_transmission(self, data: bytes) -> None:
         """Parses RN2483 Packets and extracts our telemetry payload blocks"""
 
         # Extract the packet header
-        data = data.strip()  # Sometimes some extra whitespace
-        logger.debug(f"Full data string: {data}")
-        pkt_hdr = PacketHeader.from_hex(data[:24])
+        pkt_hdr = PacketHeader.from_buffer(data)
 
-        if len(pkt_hdr) <= 24:  # If this packet nothing more than just the header
+        if len(pkt_hdr) <= PACKET_HEADER_LENGTH:  # If this packet nothing more than just the header
             logger.info(f"{pkt_hdr}")
 
-        blocks = data[24:]  # Remove the packet header
-
         if pkt_hdr.callsign in self.config.approved_callsigns:
             logger.info(
                 f"Incoming packet from {pkt_hdr.callsign} ({self.config.approved_callsigns.get(pkt_hdr.callsign)})"
@@ -478,18 +757,22 @@ class Telemetry(Process):
         else:
             logger.warning(f"Incoming packet from unauthorized callsign {pkt_hdr.callsign}")
 
-        # Parse through all blocks
-        while blocks != "":
+        # Parse through all blocks in place, handing out offsets into the packet rather than copies
+        packet = memoryview(data)
+        offset = PACKET_HEADER_LENGTH
+        while offset + BLOCK_HEADER_LENGTH <= len(packet):
             # Parse block header
-            logger.debug(f"Blocks: {blocks}")
-            logger.debug(f"Block header: {blocks[:8]}")
-            block_header = BlockHeader.from_hex(blocks[:8])
-
-            block_len = len(block_header) * 2  # Convert length in bytes to length in hex symbols
-            logger.debug(f"Calculated block len in hex: {block_len}")
-            block_contents = blocks[8:block_len]
-
-            self.parse_rn2483_payload(block_header.message_type, block_header.message_subtype, block_contents)
+            block_header = BlockHeader.from_buffer(packet, offset)
+            block_end = offset + len(block_header)
+            logger.debug(f"Block of length {len(block_header)} at offset {offset}")
+
+            self.parse_rn2483_payload(
+                block_header.message_type,
+                block_header.message_subtype,
+                packet,
+                offset + BLOCK_HEADER_LENGTH,
+                min(block_end, len(packet)) - (offset + BLOCK_HEADER_LENGTH),
+            )
 
-            # Remove the data we processed from the whole set, and move onto the next data block
-            blocks = blocks[block_len:]
+            # Move onto the next data block
+            offset = block_end
@@ -0,0 +1,274 @@
+# Sparse index of the mission times in a mission file, kept in a sidecar file next to it
+# For every flight, the index holds the first and last mission time recorded, and the mission time and byte offset of
+# every INDEX_INTERVAL-th telemetry block. The length of a mission is read straight from the index, and the block to
+# start reading from to reach a mission time is found with a binary search instead of reading the flight from its start
+#
+# Recordings are indexed as they are written. Other mission files, such as those produced by telem-parser, are indexed
+# the first time they are read, with a walk over their block headers that only reads the mission time of each block
+
+# Imports
+import logging
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Iterator, Self
+
+from modules.telemetry.block import SDBlockSubtype
+from modules.telemetry.sd_block import SD_BLOCK_HEADER, sd_block_header_at, valid_sd_block_header
+from modules.telemetry.superblock import Flight, SuperBlock, find_superblock
+
+# Constants
+BLOCK_SIZE: int = 512
+INDEX_EXTENSION: str = "index"
+INDEX_INTERVAL: int = 64  # Telemetry blocks between index entries
+INDEX_MAGIC: bytes = b"CUInIndx"
+INDEX_VERSION: int = 1
+INDEX_HEADER: struct.Struct = struct.Struct("<8sHH")  # Magic, version, number of flights
+FLIGHT_HEADER: struct.Struct = struct.Struct("<IIIII")  # First block, blocks, first and last time, number of entries
+INDEX_ENTRY: struct.Struct = struct.Struct("<IQ")  # Mission time, byte offset in the mission file
+MISSION_TIME: struct.Struct = struct.Struct("<I")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FlightIndex:
+    """
+    The mission times of a flight.
+
+    first_block: The first block of the flight, as in the superblock.
+    num_blocks: The number of blocks of the flight when it was indexed.
+    min_time: The earliest mission time in the flight, or 0 if it holds no telemetry.
+    max_time: The latest mission time in the flight, or 0 if it holds no telemetry.
+    times: The mission times of the indexed blocks, never decreasing.
+    offsets: The byte offsets of the indexed blocks in the mission file.
+    """
+
+    first_block: int
+    num_blocks: int
+    min_time: int = 0
+    max_time: int = 0
+    times: list[int] = field(default_factory=list)
+    offsets: list[int] = field(default_factory=list)
+
+    def add(self, mission_time: int, offset: int, count: int) -> bool:
+        """
+        Adds the count-th telemetry block of the flight, at the given offset, to the index.
+        Returns:
+            True if the block is one of the indexed blocks.
+        """
+
+        if count == 0:
+            self.min_time = self.max_time = mission_time
+        elif mission_time < self.min_time:
+            self.min_time = mission_time
+        elif mission_time > self.max_time:
+            self.max_time = mission_time
+
+        # Blocks recorded slightly out of order are skipped, so that a binary search over the times stays valid
+        if count % INDEX_INTERVAL or (self.times and mission_time < self.times[-1]):
+            return False
+        self.times.append(mission_time)
+        self.offsets.append(offset)
+        return True
+
+    def seek(self, mission_time: int) -> int:
+        """
+        Returns the byte offset of the last indexed block before the mission time, from which reading reaches the
+        mission time. Times before the first indexed block seek to the start of the flight.
+        """
+
+        position = bisect_right(self.times, mission_time) - 1
+        return self.offsets[position] if position >= 0 else self.first_block * BLOCK_SIZE
+
+    def matches(self, flight: Flight, superblock_address: int) -> bool:
+        return self.first_block == superblock_address + flight.first_block and self.num_blocks == flight.num_blocks
+
+    def header_bytes(self) -> bytes:
+        return FLIGHT_HEADER.pack(self.first_block, self.num_blocks, self.min_time, self.max_time, len(self.times))
+
+
+@dataclass
+class TimeIndex:
+    """The mission times of every flight of a mission file."""
+
+    flights: list[FlightIndex]
+
+    def to_bytes(self) -> bytes:
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(self.flights))]
+        for flight in self.flights:
+            parts.append(flight.header_bytes())
+        for flight in self.flights:
+            parts.extend(INDEX_ENTRY.pack(time, offset) for time, offset in zip(flight.times, flight.offsets))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        """Parses an index, raising ValueError if it is not a complete index of the current version."""
+
+        try:
+            magic, version, num_flights = INDEX_HEADER.unpack_from(data)
+            if magic != INDEX_MAGIC or version != INDEX_VERSION:
+                raise ValueError("Not a time index of the current version")
+
+            flights: list[FlightIndex] = []
+            entries = INDEX_HEADER.size + num_flights * FLIGHT_HEADER.size
+            for i in range(num_flights):
+                first_block, num_blocks, min_time, max_time, count = FLIGHT_HEADER.unpack_from(
+                    data, INDEX_HEADER.size + i * FLIGHT_HEADER.size
+                )
+                parts = list(INDEX_ENTRY.iter_unpack(data[entries : entries + count * INDEX_ENTRY.size]))
+                if len(parts) != count:
+                    raise ValueError("Time index is cut short")
+                flights.append(
+                    FlightIndex(
+                        first_block,
+                        num_blocks,
+                        min_time,
+                        max_time,
+                        [time for time, _ in parts],
+                        [offset for _, offset in parts],
+                    )
+                )
+                entries += count * INDEX_ENTRY.size
+        except struct.error as e:
+            raise ValueError(f"Time index is cut short: {e}")
+        return cls(flights)
+
+    def matches(self, superblock: SuperBlock, superblock_address: int) -> bool:
+        """Returns True if the index covers exactly the flights of the superblock, as long as they are now."""
+
+        return len(self.flights) == len(superblock.flights) and all(
+            index.matches(flight, superblock_address) for index, flight in zip(self.flights, superblock.flights)
+        )
+
+    @property
+    def mission_length(self) -> int:
+        """The length of the mission, as the sum of the last mission time of each flight, less one."""
+        return sum(flight.max_time for flight in self.flights) - 1
+
+
+def index_path(mission_file: Path) -> Path:
+    """Returns the path of the sidecar index of a mission file."""
+    return mission_file.with_name(f"{mission_file.name}.{INDEX_EXTENSION}")
+
+
+def telemetry_times(data: bytes | memoryview | mmap.mmap, start: int, end: int) -> Iterator[tuple[int, int]]:
+    """
+    Walks the block headers in data from start to end, and yields the offset and mission time of every telemetry block,
+    reading nothing else. Stops at the first header that could not start a block.
+    """
+
+    offset = start
+    while offset + SD_BLOCK_HEADER.size <= end:
+        block_class, block_subtype, block_length = sd_block_header_at(data, offset)
+        if not valid_sd_block_header(block_class, block_subtype, block_length) or offset + block_length > end:
+            return
+
+        if block_class == SDBlockSubtype.TELEMETRY_DATA and block_length >= SD_BLOCK_HEADER.size + MISSION_TIME.size:
+            yield offset, MISSION_TIME.unpack_from(data, offset + SD_BLOCK_HEADER.size)[0]
+        offset += block_length
+
+
+def index_flight(data: bytes | mmap.mmap, first_block: int, num_blocks: int) -> FlightIndex:
+    """Indexes a flight from the mission times of its telemetry blocks."""
+
+    flight = FlightIndex(first_block, num_blocks)
+    start = first_block * BLOCK_SIZE
+    for count, (offset, mission_time) in enumerate(telemetry_times(data, start, start + num_blocks * BLOCK_SIZE)):
+        _ = flight.add(mission_time, offset, count)
+    return flight
+
+
+def build_index(mission_file: Path, superblock_address: int, superblock: SuperBlock) -> TimeIndex:
+    """Indexes every flight of a mission file."""
+
+    with open(mission_file, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return TimeIndex(
+            [
+                index_flight(data, superblock_address + flight.first_block, flight.num_blocks)
+                for flight in superblock.flights
+            ]
+        )
+
+
+def load_index(mission_file: Path, superblock_address: int, superblock: SuperBlock) -> TimeIndex | None:
+    """Returns the sidecar index of the mission file, or None if it is missing, corrupt or out of date."""
+
+    try:
+        index = TimeIndex.from_bytes(index_path(mission_file).read_bytes())
+    except FileNotFoundError:
+        return None
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable time index of {mission_file.name}: {e}")
+        return None
+    return index if index.matches(superblock, superblock_address) else None
+
+
+def save_index(mission_file: Path, index: TimeIndex) -> None:
+    """Writes the sidecar index of the mission file, replacing it in one step so that it is never left half written."""
+
+    path = index_path(mission_file)
+    temporary = path.with_suffix(".tmp")
+    try:
+        temporary.write_bytes(index.to_bytes())
+        os.replace(temporary, path)
+    except OSError as e:
+        logger.warning(f"Could not write time index {path.name}: {e}")
+
+
+def time_index(mission_file: Path, superblock_address: int, superblock: SuperBlock, save: bool = True) -> TimeIndex:
+    """
+    Returns the time index of a mission file, indexing it first if its sidecar index is missing or out of date. The
+    new index is saved unless save is False, as for the recording being written, whose index is written as it goes.
+    """
+
+    index = load_index(mission_file, superblock_address, superblock)
+    if index is None:
+        index = build_index(mission_file, superblock_address, superblock)
+        if save:
+            save_index(mission_file, index)
+    return index
+
+
+def get_time_index(mission_file: Path) -> TimeIndex | None:
+    """Returns the time index of a mission file, or None if the file has no superblock."""
+
+    superblock_result = find_superblock(mission_file)
+    if superblock_result is None:
+        return None
+    return time_index(mission_file, *superblock_result)
+
+
+class TimeIndexWriter:
+    """
+    Writes the index of a recording of a single flight as it is recorded. New entries are appended to the sidecar file
+    and the flight header is rewritten in place, so updating the index never takes longer as the recording grows.
+    """
+
+    def __init__(self, mission_file: Path, first_block: int):
+        self.file: BinaryIO = open(index_path(mission_file), "wb")
+        self.written_entries: int = 0
+        _ = self.file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 1))
+        _ = self.file.write(FlightIndex(first_block, 0).header_bytes())
+        self.file.flush()
+
+    def write(self, flight: FlightIndex, entries: int, num_blocks: int) -> None:
+        """Writes the first entries of the flight that are not written yet, and the flight as it is with num_blocks."""
+
+        new_entries = zip(flight.times[self.written_entries : entries], flight.offsets[self.written_entries : entries])
+        _ = self.file.write(b"".join(INDEX_ENTRY.pack(time, offset) for time, offset in new_entries))
+        self.written_entries = entries
+
+        _ = self.file.seek(INDEX_HEADER.size)
+        _ = self.file.write(
+            FLIGHT_HEADER.pack(flight.first_block, num_blocks, flight.min_time, flight.max_time, entries)
+        )
+        _ = self.file.seek(0, os.SEEK_END)
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
@@ -23,6 +23,8 @@ class ReplayCommands(StrEnum):
     PAUSE = "pause replay"
     RESUME = "resume replay"
     SPEED = "speed replay"
+    SEEK = "seek replay"
+    SKIP = "skip replay"
     STOP = "stop replay"
 
 
@@ -37,6 +39,10 @@ class WebsocketCommand(Enum):
     """Contains the structure for the telemetry commands."""
 
     UPDATE = "update"
+    RESYNC = "resync"
+    SAMPLES = "samples"
+    CATALOG = "catalog"
+    REPAIR = "repair"
     RECORD = RecordCommands
     REPLAY = ReplayCommands
 
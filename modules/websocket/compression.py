@@ -0,0 +1,100 @@
+# Compresses every websocket frame once, for all the clients that negotiated permessage-deflate
+# Tornado compresses each message separately for every connection, with a compression context that carries over
+# between the messages of that connection. Here each message is compressed from a fresh context instead, so it never
+# refers to earlier messages and the same compressed bytes are valid on every connection. Clients are also told the
+# server does not take over its context (server_no_context_takeover, RFC 7692 section 7.1.1.1), so they may free their
+# window, but decompressing the messages does not depend on them knowing it
+#
+# Tornado has no public way to write a message that is already compressed, so connections that negotiated compression
+# use a protocol that swaps the compressor Tornado creates for one passing messages through. The compressor is private
+# to Tornado, so this is only done on the major version it was checked against, and other versions fall back to
+# Tornado compressing every message itself
+
+# Imports
+import zlib
+
+import tornado
+from tornado.httputil import HTTPHeaders
+from tornado.websocket import WebSocketHandler, WebSocketProtocol, WebSocketProtocol13
+
+# Constants
+EXTENSIONS_HEADER: str = "Sec-WebSocket-Extensions"
+DEFLATE_EXTENSION: str = "permessage-deflate"
+COMPRESSION_LEVEL: int = 6
+DEFLATE_TAIL: bytes = b"\x00\x00\xff\xff"  # Ends every flushed block, and is left out of the message (RFC 7692 7.2.1)
+SHARED_DEFLATE: bool = tornado.version_info[0] == 6  # Whether Tornado compresses messages the way replaced below
+
+
+def offer_shared_deflate(headers: HTTPHeaders) -> bool:
+    """
+    Rewrites the permessage-deflate offers of a websocket upgrade request so that Tornado accepts them without server
+    context takeover. Offers that limit the window size of the server are dropped, since frames are compressed with
+    the full window.
+    Returns:
+        True if the request still offers permessage-deflate.
+    """
+
+    offers: list[str] = []
+    deflate = False
+    for offer in headers.get(EXTENSIONS_HEADER, "").split(","):
+        name, *parameters = [part.strip() for part in offer.split(";")]
+        if not name:
+            continue
+        if name != DEFLATE_EXTENSION:
+            offers.append(offer.strip())
+            continue
+
+        window_bits = [parameter for parameter in parameters if parameter.startswith("server_max_window_bits")]
+        if any(parameter.partition("=")[2].strip('" ') != str(zlib.MAX_WBITS) for parameter in window_bits):
+            continue
+        if "server_no_context_takeover" not in parameters:
+            parameters.append("server_no_context_takeover")
+        offers.append("; ".join([name, *parameters]))
+        deflate = True
+
+    if EXTENSIONS_HEADER in headers:
+        del headers[EXTENSIONS_HEADER]
+    if offers:
+        headers[EXTENSIONS_HEADER] = ", ".join(offers)
+    return deflate
+
+
+def deflate(message: str | bytes) -> bytes:
+    """Returns the message compressed as a permessage-deflate message without context takeover."""
+
+    if isinstance(message, str):
+        message = message.encode("utf-8")
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return (compressor.compress(message) + compressor.flush(zlib.Z_SYNC_FLUSH)).removesuffix(DEFLATE_TAIL)
+
+
+class PrecompressedDeflate:
+    """Stands in for the permessage-deflate compressor of a connection, that is only sent compressed messages."""
+
+    @staticmethod
+    def compress(data: bytes) -> bytes:
+        return data
+
+
+class SharedDeflateProtocol(WebSocketProtocol13):
+    """Websocket protocol whose messages are passed through uncompressed, since they were compressed beforehand."""
+
+    precompressed: bool = False  # Set once compression is negotiated, after which messages must be compressed
+
+    def _create_compressors(self, side: str, agreed_parameters: dict, compression_options: dict | None = None) -> None:
+        super()._create_compressors(side, agreed_parameters, compression_options)
+        if not hasattr(self, "_compressor"):
+            return  # Tornado no longer keeps its compressor there, so it compresses every message itself
+        self._compressor = PrecompressedDeflate()  # type: ignore
+        self.precompressed = True
+
+
+def shared_deflate_protocol(handler: WebSocketHandler, protocol: WebSocketProtocol | None) -> WebSocketProtocol | None:
+    """
+    Returns the protocol Tornado chose for the handler's connection, replaced by a SharedDeflateProtocol with the same
+    parameters if this version of Tornado supports it.
+    """
+
+    if not SHARED_DEFLATE or type(protocol) is not WebSocketProtocol13:
+        return protocol
+    return SharedDeflateProtocol(handler, False, protocol.params)
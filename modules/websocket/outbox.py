@@ -0,0 +1,143 @@
+# Bounded queue of the frames waiting to be written to a single websocket client
+# A slow client only ever holds back its own frames: once its outbox is full, frames are dropped according to the
+# policy of their frame type rather than buffered without limit
+
+# Imports
+from collections import deque
+from enum import Enum
+from time import monotonic
+from typing import Callable, NamedTuple
+
+# Constants
+MAX_QUEUED_FRAMES: int = 64
+MAX_QUEUED_BYTES: int = 4 * 1024 * 1024
+
+
+class DropPolicy(Enum):
+    """What happens to the frames of a type when they back up in a client's outbox."""
+
+    LATEST = "latest"  # Only the newest frame is worth sending, it supersedes everything queued before it
+    RESYNC = "resync"  # Frames build on each other, so dropping any of them means the client must resync
+    OLDEST = "oldest"  # Frames are independent, the oldest are dropped first
+    NEVER = "never"  # Frames are always delivered, even past the outbox limits
+    SUPERSEDED = "superseded"  # Frames are kept past the outbox limits, until a snapshot that carries them is queued
+
+
+FRAME_POLICIES: dict[str, DropPolicy] = {
+    "snapshot": DropPolicy.LATEST,
+    "delta": DropPolicy.RESYNC,
+    "samples": DropPolicy.OLDEST,
+    "reply": DropPolicy.SUPERSEDED,
+    "catalog": DropPolicy.NEVER,
+    "page": DropPolicy.NEVER,
+}
+
+SEQUENCED_POLICIES: tuple[DropPolicy, ...] = (DropPolicy.LATEST, DropPolicy.RESYNC, DropPolicy.SUPERSEDED)
+
+
+class QueuedFrame(NamedTuple):
+    frame_type: str
+    message: str | bytes
+    queued_at: float
+
+
+class ClientOutbox:
+    """Holds the frames queued for one client, within a frame count and byte limit."""
+
+    def __init__(self, max_frames: int = MAX_QUEUED_FRAMES, max_bytes: int = MAX_QUEUED_BYTES):
+        self.max_frames: int = max_frames
+        self.max_bytes: int = max_bytes
+        self.frames: deque[QueuedFrame] = deque()
+        self.queued_bytes: int = 0
+
+        # Counters
+        self.sent: int = 0
+        self.sent_bytes: int = 0
+        self.dropped: int = 0
+        self.resyncs: int = 0
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def put(self, frame_type: str, message: str | bytes) -> bool:
+        """
+        Queues a frame, dropping queued frames if the outbox is over its limits.
+        Returns:
+            False if frames that the client builds on were dropped, and it must be resynced.
+        """
+
+        if FRAME_POLICIES.get(frame_type) == DropPolicy.LATEST:
+            # A new snapshot makes every queued snapshot, delta and reply obsolete
+            self.remove(lambda frame: FRAME_POLICIES.get(frame.frame_type) in SEQUENCED_POLICIES)
+
+        self.frames.append(QueuedFrame(frame_type, message, monotonic()))
+        self.queued_bytes += len(message)
+        if not self.full():
+            return True
+
+        # Drop the frames that are cheapest to lose first
+        self.trim(DropPolicy.OLDEST)
+        if not self.full():
+            return True
+
+        # Frames that are never dropped may keep the outbox over its limits, which only matters if deltas were lost.
+        # Replies are numbered along with the deltas, so they go too: sent ahead of the resync snapshot, they would
+        # show the client a gap in the sequence numbers, and the snapshot carries what they held
+        if not self.remove(lambda frame: FRAME_POLICIES.get(frame.frame_type) == DropPolicy.RESYNC):
+            return True
+        self.remove(lambda frame: FRAME_POLICIES.get(frame.frame_type) == DropPolicy.SUPERSEDED)
+        self.resyncs += 1
+        return False
+
+    def get(self) -> QueuedFrame:
+        """Removes and returns the oldest queued frame."""
+
+        frame = self.frames.popleft()
+        self.queued_bytes -= len(frame.message)
+        self.sent += 1
+        self.sent_bytes += len(frame.message)
+        return frame
+
+    def full(self) -> bool:
+        return len(self.frames) > self.max_frames or self.queued_bytes > self.max_bytes
+
+    def trim(self, policy: DropPolicy) -> None:
+        """Drops the oldest frames with the given policy until the outbox is within its limits."""
+
+        for frame in list(self.frames):
+            if not self.full():
+                return
+            if FRAME_POLICIES.get(frame.frame_type) == policy:
+                self.frames.remove(frame)
+                self.queued_bytes -= len(frame.message)
+                self.dropped += 1
+
+    def remove(self, matches: Callable[[QueuedFrame], bool]) -> int:
+        """Drops every queued frame that the matches function returns True for, and returns how many were dropped."""
+
+        kept: deque[QueuedFrame] = deque()
+        for frame in self.frames:
+            if matches(frame):
+                self.queued_bytes -= len(frame.message)
+            else:
+                kept.append(frame)
+        removed = len(self.frames) - len(kept)
+        self.dropped += removed
+        self.frames = kept
+        return removed
+
+    def lag(self) -> float:
+        """Returns how long the oldest queued frame has been waiting, in seconds."""
+        return monotonic() - self.frames[0].queued_at if self.frames else 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the counters of this outbox for monitoring."""
+        return {
+            "queued_frames": len(self.frames),
+            "queued_bytes": self.queued_bytes,
+            "lag": self.lag(),
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "dropped": self.dropped,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,168 @@
+# Lets websocket clients receive only the parts of the telemetry frames they display
+# A client sends "websocket subscribe" followed by the selections it wants, where a selection is either a whole member
+# ("status", a status section such as "status.rocket", or a data block subtype such as "altitude"), or one field of the
+# records of a subtype ("altitude.altitude"). Sending "websocket subscribe" without selections receives everything again
+# The status data block shares its name with the status member, so "status" selects both, and "status.<field>" selects
+# a field of the status data blocks whenever the field is not a status section
+#
+# Frames are filtered in the websocket process, and are encoded once for every distinct subscription they are sent to
+
+# Imports
+import json
+from dataclasses import dataclass
+from typing import Any, Iterable, TypeAlias
+
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.history import ENCODER
+from modules.telemetry.sample_stream import SAMPLE_FRAME_HEADER
+from modules.websocket.compression import deflate
+
+# Types
+JSON: TypeAlias = dict[str, Any]
+
+# Constants
+SUBSCRIBE_COMMAND: str = "websocket subscribe"
+STATUS_SECTIONS: list[str] = ["mission", "serial", "rn2483_radio", "rocket", "replay"]
+SUBTYPES: dict[str, DataBlockSubtype] = {subtype.name.lower(): subtype for subtype in DataBlockSubtype}
+ALWAYS_SENT: list[str] = ["mission_time"]  # Record fields that are kept whatever fields were selected
+
+
+# Errors
+class InvalidSubscriptionError(Exception):
+    """Raised when a subscription selects a member that frames never contain."""
+
+    def __init__(self, selection: str):
+        self.selection = selection
+        self.message = f"Can not subscribe to '{selection}', it is not a status section or data block subtype."
+        super().__init__(self.message)
+
+
+# Classes
+@dataclass(frozen=True)
+class Subscription:
+    """
+    The members of the frames a client receives. Subscriptions are hashable, so that clients with the same
+    subscription share the encoding of each frame.
+
+    status: The status sections received.
+    telemetry: The subtypes whose records are received in full.
+    fields: The subtypes whose records are reduced to some of their fields, and those fields.
+    """
+
+    status: frozenset[str]
+    telemetry: frozenset[str]
+    fields: frozenset[tuple[str, frozenset[str]]]
+
+    @classmethod
+    def from_selections(cls, selections: Iterable[str]) -> "Subscription":
+        """Builds a subscription from the selections of a subscribe command."""
+
+        status: set[str] = set()
+        telemetry: set[str] = set()
+        fields: dict[str, set[str]] = {}
+
+        for selection in selections:
+            member, _, field = selection.partition(".")
+            if member == "status" and not field:
+                status.update(STATUS_SECTIONS)
+                telemetry.add(member)
+            elif member == "status" and field in STATUS_SECTIONS:
+                status.add(field)
+            elif member in SUBTYPES and not field:
+                telemetry.add(member)
+            elif member in SUBTYPES:
+                fields.setdefault(member, set(ALWAYS_SENT)).add(field)
+            else:
+                raise InvalidSubscriptionError(selection)
+
+        # A subtype selected in full makes any of its field selections redundant
+        return cls(
+            status=frozenset(status),
+            telemetry=frozenset(telemetry),
+            fields=frozenset(
+                (subtype, frozenset(names)) for subtype, names in fields.items() if subtype not in telemetry
+            ),
+        )
+
+    def filter(self, frame: JSON) -> JSON:
+        """Returns a copy of the decoded snapshot or delta frame, reduced to the subscribed members."""
+
+        filtered = {key: value for key, value in frame.items() if key not in ("status", "telemetry")}
+        if "status" in frame:
+            filtered["status"] = {
+                section: value for section, value in frame["status"].items() if section in self.status
+            }
+        if "telemetry" in frame:
+            filtered["telemetry"] = self.filter_telemetry(frame["telemetry"])
+        return filtered
+
+    def filter_telemetry(self, telemetry: JSON) -> JSON:
+        """Returns the records of the subscribed subtypes, reduced to the subscribed fields."""
+
+        filtered: JSON = {name: records for name, records in telemetry.items() if name in self.telemetry}
+        for name, names in self.fields:
+            if name in telemetry:
+                filtered[name] = [
+                    {key: value for key, value in record.items() if key in names} for record in telemetry[name]
+                ]
+        return filtered
+
+    def wants_samples(self, frame: bytes) -> bool:
+        """Returns True if the binary sample frame is of a subscribed subtype."""
+
+        name = DataBlockSubtype(frame[0]).name.lower()
+        return name in self.telemetry or any(name == subtype for subtype, _ in self.fields)
+
+
+def parse_subscription(message: str) -> Subscription | None:
+    """
+    Parses a subscribe command.
+    Returns:
+        The subscription, or None if the command has no selections and the client should receive everything.
+    """
+
+    selections = message.removeprefix(SUBSCRIBE_COMMAND).split()
+    if not selections:
+        return None
+    return Subscription.from_selections(selections)
+
+
+class FrameEncodings:
+    """
+    Filters and encodes a single frame at most once for every distinct subscription it is sent to, and compresses it
+    at most once for every distinct subscription of the clients that negotiated compression.
+    """
+
+    def __init__(self, message: str | bytes):
+        self.message: str | bytes = message
+        self.decoded: JSON | None = None
+        self.encodings: dict[Subscription, str | bytes | None] = {}
+        self.compressed: dict[Subscription | None, bytes | None] = {}
+
+    def get(self, subscription: Subscription | None, compress: bool = False) -> str | bytes | None:
+        """Returns the frame as sent to clients with the subscription, or None if they should not receive it."""
+
+        if compress:
+            if subscription not in self.compressed:
+                message = self.get(subscription)
+                self.compressed[subscription] = None if message is None else deflate(message)
+            return self.compressed[subscription]
+
+        if subscription is None:
+            return self.message
+
+        if subscription not in self.encodings:
+            self.encodings[subscription] = self.encode(subscription)
+        return self.encodings[subscription]
+
+    def encode(self, subscription: Subscription) -> str | bytes | None:
+        if isinstance(self.message, bytes):
+            # The subtype of a sample frame is read straight from its header, the samples are never decoded
+            if len(self.message) < SAMPLE_FRAME_HEADER.size or not subscription.wants_samples(self.message):
+                return None
+            return self.message
+
+        # Every subscription is filtered from the same decoded frame
+        if self.decoded is None:
+            self.decoded = json.loads(self.message)
+        return ENCODER.encode(subscription.filter(self.decoded))
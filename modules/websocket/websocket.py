@@ -3,14 +3,32 @@
 # Incoming information comes from telemetry_json_output from telemetry
 # Outputs information to connected websocket clients
 #
+# Telemetry sends frames already encoded as JSON text, paired with their type: a full snapshot frame followed by delta
+# frames that only hold what changed. Every frame carries a sequence number one higher than the last, so frames are
+# never dropped here and a client that sees a gap in the sequence numbers sends "telemetry resync" to receive a new
+# snapshot.
+#
+# The latest snapshot and the frames that followed it are kept here, so that a client that connects, changes its
+# subscription or falls behind is resynced on its own, without telemetry sending a snapshot to every client. Only
+# once the kept frames run out is telemetry asked for a "resync" snapshot, which is sent to the clients waiting for it.
+#
+# Pages of the mission catalog that a client asks for with "telemetry catalog [page] [page size]" are sent to that
+# client alone, as "page" frames addressed to the id the client is given here. Only the first page sent when the
+# recordings change goes to every client.
+#
+# Clients that connect with the query argument binary=1 additionally receive binary frames holding every sample of the
+# high rate sensor data blocks, as described in modules/telemetry/sample_stream.py.
+#
 # Authors:
 # Thomas Selwyn (Devil)
 
 from __future__ import annotations
-import json
+from itertools import count
 from multiprocessing import Queue, Process
 from abc import ABC
-from typing import Optional, Any
+from typing import Any, Iterator
+from threading import Thread
+import json
 import logging
 import os.path
 import tornado.gen
@@ -19,8 +37,22 @@ import tornado.ioloop
 import tornado.web
 import tornado.websocket
 
+from modules.misc.frame_counters import FrameCounters
+from modules.websocket.compression import SharedDeflateProtocol, offer_shared_deflate, shared_deflate_protocol
+from modules.websocket.outbox import ClientOutbox
+from modules.websocket.subscription import (
+    SUBSCRIBE_COMMAND,
+    FrameEncodings,
+    InvalidSubscriptionError,
+    Subscription,
+    parse_subscription,
+)
+
 # Constants
 ws_commands_queue: Queue[Any]
+RESYNC_COMMAND: str = "telemetry resync"
+CATALOG_COMMAND: str = "telemetry catalog"
+MAX_KEPT_FRAMES: int = 32  # Frames kept after the latest snapshot, so that a resync fits in the outbox of a client
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -29,11 +61,12 @@ logger = logging.getLogger(__name__)
 class WebSocketHandler(Process):
     """Handles starting the websocket server process."""
 
-    def __init__(self, telemetry_json_output: Queue[Any], ws_commands: Queue[Any]):
+    def __init__(self, telemetry_json_output: Queue[Any], ws_commands: Queue[Any], frame_counters: FrameCounters):
         super().__init__()
         global ws_commands_queue
 
         self.telemetry_json_output: Queue[Any] = telemetry_json_output
+        self.frame_counters: FrameCounters = frame_counters
         ws_commands_queue = ws_commands
 
         # Default to test mode
@@ -47,6 +80,7 @@ class WebSocketHandler(Process):
         wss = tornado.web.Application(
             [
                 (r"/websocket", TornadoWSServer),
+                (r"/websocket/stats", WebsocketStatsHandler, {"frame_counters": self.frame_counters}),
                 (
                     r"/(.*)",
                     tornado.web.StaticFileHandler,
@@ -64,53 +98,238 @@ class WebSocketHandler(Process):
             logger.info("Failed to bind to port 33845")
             ws_commands_queue.put("shutdown")
 
+        # Frames are pushed to clients as soon as they arrive, by a thread that sleeps on the telemetry output queue
         io_loop = tornado.ioloop.IOLoop.current()
-        periodic_callback = tornado.ioloop.PeriodicCallback(
-            lambda: TornadoWSServer.send_message(self.check_for_messages()), 50
-        )
-
-        periodic_callback.start()
+        reader = Thread(target=self.forward_messages, args=(io_loop,), name="telemetry reader", daemon=True)
+        reader.start()
         io_loop.start()
 
-    def check_for_messages(self) -> Optional[str]:
-        """Returns any JSON data that may be on the telemetry JSON output queue."""
+    def forward_messages(self, io_loop: tornado.ioloop.IOLoop) -> None:
+        """
+        Blocks on the telemetry JSON output queue and hands every batch of frames to the IOLoop to be sent. Runs on
+        its own thread, since Tornado can not wait on a multiprocessing queue on every platform.
+        """
 
-        json_data = None
+        while True:
+            frames = [self.telemetry_json_output.get()]
+            frames.extend(self.check_for_messages())
+            io_loop.add_callback(TornadoWSServer.send_frames, frames)
+
+    def check_for_messages(self) -> list[tuple[Any, ...]]:
+        """Returns all frames on the telemetry JSON output queue, in the order they were sent."""
+
+        frames: list[tuple[Any, ...]] = []
         while not self.telemetry_json_output.empty():
-            json_data = self.telemetry_json_output.get()
-        return json.dumps(json_data)
+            frames.append(self.telemetry_json_output.get())
+        return frames
 
 
 class TornadoWSServer(tornado.websocket.WebSocketHandler, ABC):
     """The server which handles websocket connections."""
 
     clients: set[TornadoWSServer] = set()
-    last_msg_send: str = ""
+    clients_by_id: dict[int, TornadoWSServer] = {}  # Clients by the id that replies to them are addressed to
+    client_ids: Iterator[int] = count(1)
+    synced_clients: set[TornadoWSServer] = set()  # Clients that have received a snapshot to apply deltas to
+    sample_clients: set[TornadoWSServer] = set()  # Clients that opted in to binary sample frames
+
+    # The latest snapshot and the frames sent since, from which clients are resynced. None once too many frames followed
+    snapshot: FrameEncodings | None = None
+    kept_frames: list[tuple[str, FrameEncodings]] = []
+    snapshot_requested: bool = False
     global ws_commands_queue
 
+    async def get(self, *args: Any, **kwargs: Any) -> None:
+        # Clients that offer compression are only sent frames compressed once for all of them
+        self.deflate: bool = offer_shared_deflate(self.request.headers)
+        await super().get(*args, **kwargs)
+
+    def get_compression_options(self) -> dict[str, Any] | None:
+        return {} if self.deflate else None
+
+    def get_websocket_protocol(self) -> tornado.websocket.WebSocketProtocol | None:
+        # Frames written to a client that negotiated compression are compressed beforehand, once for every client
+        return shared_deflate_protocol(self, super().get_websocket_protocol())
+
     def open(self) -> None:
+        # Clients are only sent compressed frames if Tornado passes them through, otherwise it compresses them itself
+        self.deflate = isinstance(self.ws_connection, SharedDeflateProtocol) and self.ws_connection.precompressed
+
+        # Frames are written one at a time from a bounded outbox, so a slow client can not make the process buffer
+        # frames without limit
+        self.outbox: ClientOutbox = ClientOutbox()
+        self.sending: bool = False
+        self.subscription: Subscription | None = None  # Clients receive everything until they subscribe
+
+        self.client_id: int = next(TornadoWSServer.client_ids)
         TornadoWSServer.clients.add(self)
-        self.send_message(self.last_msg_send)
+        TornadoWSServer.clients_by_id[self.client_id] = self
+        TornadoWSServer.resync(self)  # New clients start from a full snapshot
+        self.request_catalog(CATALOG_COMMAND)  # and the first page of the mission recordings
+
+        if self.get_query_argument("binary", "0") == "1":
+            # Telemetry only encodes sample frames while at least one client wants them
+            if not TornadoWSServer.sample_clients:
+                ws_commands_queue.put("telemetry samples on")
+            TornadoWSServer.sample_clients.add(self)
         logger.info("Client connected")
 
     def on_close(self) -> None:
         TornadoWSServer.clients.remove(self)
+        del TornadoWSServer.clients_by_id[self.client_id]
+        TornadoWSServer.synced_clients.discard(self)
+        if self in TornadoWSServer.sample_clients:
+            TornadoWSServer.sample_clients.remove(self)
+            if not TornadoWSServer.sample_clients:
+                ws_commands_queue.put("telemetry samples off")
         logger.info("Client disconnected")
 
-    @staticmethod
-    def on_message(message: str) -> None:
+    def on_message(self, message: str | bytes) -> None:
         global ws_commands_queue
+        if isinstance(message, str) and message.startswith(SUBSCRIBE_COMMAND):
+            self.subscribe(message)
+            return
+        if message == RESYNC_COMMAND:
+            TornadoWSServer.resync(self)
+            return
+        if isinstance(message, str) and message.split(" ")[:2] == CATALOG_COMMAND.split(" "):
+            self.request_catalog(message)
+            return
         ws_commands_queue.put(message)
 
+    def request_catalog(self, message: str) -> None:
+        """Asks telemetry for a page of the mission catalog, to be sent to this client alone."""
+        parameters = message.split(" ")[2:]
+        ws_commands_queue.put(" ".join([CATALOG_COMMAND, str(self.client_id), *parameters]))
+
+    def subscribe(self, message: str) -> None:
+        """Changes the subscription of the client, which then starts over from a snapshot of its new selection."""
+
+        try:
+            self.subscription = parse_subscription(message)
+        except InvalidSubscriptionError as e:
+            logger.error(e.message)
+            return
+
+        TornadoWSServer.resync(self)
+        logger.info(f"Client {self.request.remote_ip} subscribed to {message.removeprefix(SUBSCRIBE_COMMAND)}")
+
     def check_origin(self, _) -> bool:
         """Authenticates clients from any host origin (_ parameter)."""
         return True
 
     @classmethod
-    def send_message(cls, message: str | None) -> None:
-        if message is None or message == "null":
-            return
+    def send_frames(cls, frames: list[tuple[Any, ...]]) -> None:
+        """
+        Sends snapshot and catalog frames to every client, resync snapshots to the clients waiting for one, delta frames
+        and command replies to the clients that have received a snapshot, binary sample frames to the clients that
+        asked for them and catalog pages to the client that asked for them.
+        """
+
+        for frame_type, message, *recipient in frames:
+            encodings = FrameEncodings(message)
+            match frame_type:
+                case "samples":
+                    cls.send_message(frame_type, encodings, cls.sample_clients)
+                case "catalog":
+                    cls.send_message(frame_type, encodings, cls.clients)
+                case "page":
+                    client = cls.clients_by_id.get(recipient[0])  # Clients that left since are not sent the page
+                    cls.send_message(frame_type, encodings, set() if client is None else {client})
+                case "snapshot" | "resync":
+                    cls.snapshot, cls.kept_frames, cls.snapshot_requested = encodings, [], False
+                    waiting = cls.clients if frame_type == "snapshot" else cls.clients - cls.synced_clients
+                    cls.synced_clients |= waiting
+                    cls.send_message("snapshot", encodings, waiting)
+                case _:
+                    if cls.snapshot is not None:
+                        cls.kept_frames.append((frame_type, encodings))
+                        if len(cls.kept_frames) > MAX_KEPT_FRAMES:
+                            cls.snapshot, cls.kept_frames = None, []
+                    cls.send_message(frame_type, encodings, cls.synced_clients)
+
+    @classmethod
+    def resync(cls, client: TornadoWSServer) -> None:
+        """
+        Sends the kept snapshot and the frames that followed it to a single client. If they are no longer kept,
+        telemetry is asked for a new snapshot, and the client waits for it.
+        """
+
+        cls.synced_clients.discard(client)
+        if cls.snapshot is not None:
+            frames = [("snapshot", cls.snapshot), *cls.kept_frames]
+            if all(cls.queue_frame(client, frame_type, encodings) for frame_type, encodings in frames):
+                cls.synced_clients.add(client)
+                return
+
+        if not cls.snapshot_requested:
+            cls.snapshot_requested = True
+            ws_commands_queue.put(RESYNC_COMMAND)
+
+    @classmethod
+    def send_message(cls, frame_type: str, encodings: FrameEncodings, clients: set[TornadoWSServer]) -> None:
+        """
+        Queues the frame in the outbox of every client, filtered to the client's subscription, and resyncs clients
+        that fell too far behind.
+        """
+
+        for client in list(clients):
+            if not cls.queue_frame(client, frame_type, encodings):
+                logger.warning(f"Websocket client {client.request.remote_ip} fell behind, resyncing")
+                cls.resync(client)
 
-        cls.last_msg_send = message
-        for client in cls.clients:
-            _ = client.write_message(message)
+    @classmethod
+    def queue_frame(cls, client: TornadoWSServer, frame_type: str, encodings: FrameEncodings) -> bool:
+        """
+        Queues the frame in the outbox of the client, filtered to the client's subscription.
+        Returns:
+            False if frames the client builds on had to be dropped, and it must be resynced.
+        """
+
+        # Subscriptions select telemetry, the mission catalog is sent whole
+        subscription = None if frame_type in ("catalog", "page") else client.subscription
+        client_message = encodings.get(subscription, client.deflate)
+        if client_message is None:
+            return True
+
+        queued = client.outbox.put(frame_type, client_message)
+        if not client.sending:
+            client.sending = True
+            tornado.ioloop.IOLoop.current().spawn_callback(client.write_outbox)
+        return queued
+
+    async def write_outbox(self) -> None:
+        """Writes the queued frames to the client one at a time, waiting for each to be flushed to the socket."""
+
+        try:
+            while self.outbox:
+                frame = self.outbox.get()
+                await self.write_message(frame.message, binary=frame.frame_type == "samples")
+        except tornado.websocket.WebSocketClosedError:
+            pass
+        finally:
+            self.sending = False
+
+
+class WebsocketStatsHandler(tornado.web.RequestHandler):
+    """
+    Reports the updates telemetry made against the frames it published for them, and the outbox counters of every
+    connected websocket client.
+    """
+
+    def initialize(self, frame_counters: FrameCounters) -> None:
+        self.frame_counters: FrameCounters = frame_counters
+
+    def get(self) -> None:
+        self.set_header("Content-Type", "application/json")
+        self.write(
+            json.dumps(
+                {
+                    "telemetry": self.frame_counters.stats(),
+                    "clients": [
+                        {"client": client.request.remote_ip, "compressed": client.deflate} | client.outbox.stats()
+                        for client in TornadoWSServer.clients
+                    ],
+                }
+            )
+        )
@@ -1,10 +1,24 @@
 # Contains test cases for verifying the parsing of block headers.
 
 # Imports
+import random
+import struct
 import pytest
 from modules.telemetry.block import BlockHeader
 
 
+def legacy_block_header(payload: str) -> BlockHeader:
+    """The original hex parser, kept as the reference for the binary parser."""
+    unpacked_header: int = struct.unpack("<I", bytes.fromhex(payload))[0]
+    return BlockHeader(
+        length=((unpacked_header & 0x1F) + 1) * 4,
+        has_crypto=bool((unpacked_header >> 5) & 0x1),
+        message_type=(unpacked_header >> 6) & 0xF,
+        message_subtype=(unpacked_header >> 10) & 0x3F,
+        destination=(unpacked_header >> 16) & 0xF,
+    )
+
+
 # Fixtures
 @pytest.fixture
 def header1() -> str:
@@ -76,3 +90,31 @@ def test_parsing_header3(header3: str):
     assert hdr.message_type == 2
     assert hdr.message_subtype == 1
     assert hdr.destination == 0
+
+
+def test_parsing_header_from_buffer(header1: str, header2: str):
+    """Ensure that block headers are parsed correctly from consecutive offsets within a memoryview."""
+    buffer = memoryview(bytes.fromhex(header1 + header2))
+    hdr1 = BlockHeader.from_buffer(buffer)
+    hdr2 = BlockHeader.from_buffer(buffer, 4)
+
+    assert hdr1 == BlockHeader.from_hex(header1)
+    assert len(hdr1) == 20
+    assert hdr1.message_type == 2
+    assert hdr1.message_subtype == 3
+
+    assert hdr2 == BlockHeader.from_hex(header2)
+    assert len(hdr2) == 8
+    assert hdr2.message_type == 0
+    assert hdr2.destination == 0xF
+
+
+def test_matches_legacy_parser():
+    """Ensure that the binary parser agrees with the original hex parser for arbitrary headers at any offset."""
+    rng = random.Random(0)
+    headers = [rng.getrandbits(32).to_bytes(4, "little") for _ in range(500)]
+    buffer = memoryview(b"\x00" + b"".join(headers))
+
+    for index, header in enumerate(headers):
+        assert BlockHeader.from_hex(header.hex()) == legacy_block_header(header.hex())
+        assert BlockHeader.from_buffer(buffer, 1 + 4 * index) == legacy_block_header(header.hex())
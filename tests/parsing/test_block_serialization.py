@@ -0,0 +1,153 @@
+# Contains test cases verifying that data blocks serialize back to the exact bytes they were parsed from
+
+import random
+import struct
+import pytest
+import modules.telemetry.data_block as data_block
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import (
+    AltitudeDataBlock,
+    DataBlock,
+    DebugMessageDataBlock,
+    GNSSMetadataBlock,
+    KX134AccelerometerDataBlock,
+    KX134Resolution,
+    MPU9250IMUDataBlock,
+)
+from modules.telemetry.sd_block import SD_BLOCK_HEADER, TelemetryDataBlock
+
+# Both the NumPy and struct serializers are tested when NumPy is installed
+SERIALIZERS = ["struct"] if data_block.np is None else ["struct", "numpy"]
+
+
+@pytest.fixture(params=SERIALIZERS)
+def serializer(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "struct":
+        monkeypatch.setattr(data_block, "np", None)
+    return request.param
+
+
+def legacy_kx134_payload(block: KX134AccelerometerDataBlock) -> bytes:
+    """The original, quadratic KX134 serializer, kept as the reference for byte-for-byte comparisons."""
+    sample_format = "<bbb" if block.resolution == KX134Resolution.RES_8_BIT else "<hhh"
+    padding = len(block) - (len(block.samples) * struct.calcsize(sample_format) + 6)
+    settings = block.odr | (block.accel_range << 4) | (block.rolloff << 6) | (block.resolution << 7) | (padding << 14)
+    head = struct.pack("<IH", block.mission_time, settings)
+
+    sensitivity = (2 ** (block.resolution.bits - 1)) // block.accel_range.acceleration
+    for sample in block.samples:
+        head = head + struct.pack(sample_format, *(int(value * sensitivity) for value in sample))
+    return head + (b"\x00" * padding)
+
+
+def legacy_mpu9250_samples(block: MPU9250IMUDataBlock) -> bytes:
+    """The original, quadratic serialization of the MPU9250 samples, without the block header or padding."""
+    payload = b""
+    for sample in block.samples:
+        payload += sample.to_payload(block.accel_fsr.sensitivity, block.gyro_fsr.sensitivity)
+    return payload
+
+
+def kx134_payload(resolution: int, count: int) -> bytes:
+    """Returns a 100Hz, +/-16g KX134 payload with count samples at the given resolution."""
+    sample_format = "<hhh" if resolution else "<bbb"
+    limit = 2 ** (struct.calcsize(sample_format) // 3 * 8 - 1)
+    samples = b"".join(struct.pack(sample_format, i % limit, -(i % limit), limit - 1) for i in range(count))
+    padding = -(6 + len(samples)) % 4
+    settings = 7 | (1 << 4) | (resolution << 7) | (padding << 14)
+    return struct.pack("<IH", 1000, settings) + samples + b"\x00" * padding
+
+
+def mpu9250_payload(count: int) -> bytes:
+    """
+    Returns an MPU9250 payload with 100Hz accelerometer/gyroscope and 8Hz magnetometer sample rates, +/-16g and
+    +/-250dps ranges, 99Hz/92Hz bandwidths and count samples whose values survive a round trip through the scaling.
+    """
+    settings = 9 | (1 << 8) | (3 << 9) | (0 << 11) | (4 << 13) | (4 << 16)
+    samples = b""
+    for i in range(count):
+        samples += struct.pack(">hhhhhhh", 2048 * (i % 8), -2048, 0, 0, 0, 0, 0)
+        samples += struct.pack("<hhhB", 0, 0, 0, (i % 2) << 4)
+    return struct.pack("<II", 1000, settings) + samples + b"\x00" * (-(8 + len(samples)) % 4)
+
+
+@pytest.mark.parametrize("resolution", [0, 1])
+@pytest.mark.parametrize("count", [0, 1, 10, 41])
+def test_kx134_golden_bytes(serializer: str, resolution: int, count: int) -> None:
+    """Test that KX134 blocks serialize back to the bytes they were parsed from."""
+    payload = kx134_payload(resolution, count)
+    block = KX134AccelerometerDataBlock.from_payload(payload)
+
+    assert block.resolution == KX134Resolution(resolution)
+    assert len(block.samples) == count
+    assert block.to_payload() == payload
+
+
+@pytest.mark.parametrize("count", [0, 1, 10, 41])
+def test_mpu9250_golden_bytes(serializer: str, count: int) -> None:
+    """Test that MPU9250 blocks, including their settings header, serialize back to the bytes they were parsed from."""
+    payload = mpu9250_payload(count)
+    assert MPU9250IMUDataBlock.from_payload(payload).to_payload() == payload
+
+
+def test_gnss_metadata_golden_bytes() -> None:
+    """Test that GNSS metadata blocks serialize back to the bytes they were parsed from."""
+    sats = b"".join(struct.pack("<BBH", 45, 30, i | (180 << 5) | ((i % 2) << 15)) for i in range(12))
+    payload = struct.pack("<III", 1000, 0b1011, 0b110) + sats
+    assert GNSSMetadataBlock.from_payload(payload).to_payload() == payload
+
+
+@pytest.mark.parametrize("resolution", [0, 1])
+def test_kx134_matches_legacy_serializer(serializer: str, resolution: int) -> None:
+    """Test that KX134 blocks with arbitrary sample values serialize exactly like the original implementation."""
+    rng = random.Random(resolution)
+    payload = kx134_payload(resolution, 50)
+    block = KX134AccelerometerDataBlock.from_payload(payload)
+    block.samples = [tuple(rng.uniform(-15.9, 15.9) for _ in range(3)) for _ in range(50)]
+
+    assert block.to_payload() == legacy_kx134_payload(block)
+
+
+def test_mpu9250_matches_legacy_serializer(serializer: str) -> None:
+    """Test that MPU9250 samples with arbitrary values serialize exactly like the original implementation."""
+    rng = random.Random(0)
+    raw = b""
+    for _ in range(50):
+        raw += struct.pack(">hhhhhhh", *(rng.randint(-32768, 32767) for _ in range(7)))
+        raw += struct.pack("<hhhB", *(rng.randint(-32768, 32767) for _ in range(3)), rng.choice([0, 8, 16, 24]))
+    payload = mpu9250_payload(0) + raw + b"\x00\x00"
+    block = MPU9250IMUDataBlock.from_payload(payload)
+
+    assert block.to_payload()[8 : 8 + len(raw)] == legacy_mpu9250_samples(block)
+
+
+def test_kx134_out_of_range_sample(serializer: str) -> None:
+    """Test that samples too large for the block's resolution are still rejected."""
+    block = KX134AccelerometerDataBlock.from_payload(kx134_payload(0, 10))
+    block.samples = [(20.0, 0.0, 0.0)] * 10
+
+    with pytest.raises(struct.error):
+        _ = block.to_payload()
+
+
+@pytest.mark.parametrize(
+    "block",
+    [
+        AltitudeDataBlock(1000, 100_000, 22.5, 120.0),  # type: ignore
+        DebugMessageDataBlock(1000, "apogee"),
+        GNSSMetadataBlock.from_payload(struct.pack("<III", 1000, 0b1011, 0b110) + struct.pack("<BBH", 45, 30, 7)),
+        KX134AccelerometerDataBlock.from_payload(kx134_payload(0, 5)),
+        MPU9250IMUDataBlock.from_payload(mpu9250_payload(3)),
+    ],
+    ids=lambda block: type(block).__name__,
+)
+def test_pack_into_matches_to_bytes(serializer: str, block: DataBlock) -> None:
+    """Test that blocks packed into a reused buffer match their serialized bytes, padding included."""
+    sd_block = TelemetryDataBlock(DataBlockSubtype(block.subtype), data=block)
+    expected = sd_block.to_bytes()
+    buffer = bytearray(b"\xff" * (len(expected) + 8))
+
+    assert SD_BLOCK_HEADER.unpack_from(expected)[1] == len(expected)  # The header length counts the whole block
+    assert sd_block.pack_into(memoryview(buffer), 4) == len(expected)
+    assert buffer[4 : 4 + len(expected)] == expected
+    assert buffer[:4] == buffer[4 + len(expected) :] == b"\xff" * 4
@@ -0,0 +1,74 @@
+# Contains test cases for the radio block codec registry
+
+import struct
+import pytest
+from modules.telemetry.block import BlockUnknownException, DataBlockSubtype, RadioBlockType
+from modules.telemetry.codec import DECODERS, decode, get_decoder
+from modules.telemetry.data_block import (
+    SUBTYPE_CLASSES,
+    AltitudeDataBlock,
+    DataBlock,
+    GNSSMetadataBlock,
+    KX134AccelerometerDataBlock,
+)
+
+
+@pytest.fixture
+def altitude_payload() -> bytes:
+    """
+    Returns an altitude block payload with the following attributes
+    mission time: 1000 ms
+    pressure: 100810 Pa
+    temperature: 22 C
+    altitude: 1234.567 m
+    """
+    return struct.pack("<Iiii", 1000, 100810, 22000, 1234567)
+
+
+def test_registry_covers_data_blocks() -> None:
+    """Test that every implemented data block subtype has a decoder registered under plain integer keys."""
+    assert len(DECODERS) == len(SUBTYPE_CLASSES)
+    for subtype in SUBTYPE_CLASSES:
+        assert get_decoder(2, int(subtype)) is not None
+
+    assert get_decoder(int(RadioBlockType.CONTROL), 0) is None
+    assert get_decoder(2, int(DataBlockSubtype.POWER)) is None
+
+
+def test_decode_at_offset(altitude_payload: bytes) -> None:
+    """Test that a block is decoded in place at an offset into a larger buffer."""
+    packet = b"\xff" * 16 + altitude_payload + b"\xff" * 8
+    block = decode(2, 3, memoryview(packet), 16, len(altitude_payload))
+
+    assert isinstance(block, AltitudeDataBlock)
+    assert block.mission_time == 1000
+    assert block.pressure == 100810
+    assert block.temperature == 22
+    assert block.altitude == 1234.567
+
+
+def test_decode_matches_parse() -> None:
+    """Test that variable length blocks decoded in place match those parsed from a copied payload."""
+    gnss_meta = struct.pack("<III", 500, 0b101, 0b10) + struct.pack("<BBH", 45, 30, 3 | (180 << 5)) * 2
+    kx134 = struct.pack("<IH", 500, 7 | (1 << 4)) + struct.pack("<bbb", 10, -10, 127) * 5 + b"\x00"
+
+    for subtype, payload in ((DataBlockSubtype.GNSS_META, gnss_meta), (DataBlockSubtype.KX134_1211_ACCEL, kx134)):
+        parsed = DataBlock.parse(subtype, payload)
+        decoded = decode(2, int(subtype), b"\x00" * 4 + payload, 4, len(payload))
+        assert str(decoded) == str(parsed)
+
+    block = decode(2, int(DataBlockSubtype.GNSS_META), gnss_meta, 0, len(gnss_meta))
+    assert isinstance(block, GNSSMetadataBlock)
+    assert block.gps_sats_in_use == [0, 2]
+    assert block.glonass_sats_in_use == [66]
+    assert len(block.sats_in_view) == 2
+
+    block = decode(2, int(DataBlockSubtype.KX134_1211_ACCEL), kx134, 0, len(kx134))
+    assert isinstance(block, KX134AccelerometerDataBlock)
+    assert len(block.samples) == 5
+
+
+def test_decode_unknown_block() -> None:
+    """Test that decoding a block without a registered decoder raises an exception."""
+    with pytest.raises(BlockUnknownException):
+        _ = decode(int(RadioBlockType.DATA), int(DataBlockSubtype.POWER), b"\x00" * 8, 0, 8)
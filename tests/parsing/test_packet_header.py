@@ -1,10 +1,24 @@
 # Contains test cases for verifying the parsing of block headers
 __author__ = "Matteo Golin"
 
+import random
+import string
 import pytest
 from modules.telemetry.block import PacketHeader
 
 
+def legacy_packet_header(payload: str) -> PacketHeader:
+    """The original bin() string slicing parser, kept as the reference for the binary parser."""
+    header = bin(int(payload, 16))[2:]
+    return PacketHeader(
+        callsign=bytes.fromhex(payload[:12]).decode("utf-8").upper(),
+        length=(int(header[47:53], 2) + 1) * 4,
+        version=int(header[53:58], 2),
+        src_addr=int(header[63:67], 2),
+        packet_num=int(header[67:79], 2),
+    )
+
+
 @pytest.fixture
 def linguini_header() -> str:
     """Returns a packet header with call sign VA3INI (Matteo Golin)"""
@@ -37,3 +51,45 @@ def test_zeta_header(zeta_header: str) -> None:
     assert hdr.version == 8
     assert hdr.src_addr == 6
     assert hdr.packet_num == 1024
+
+
+def test_linguini_header_from_buffer(linguini_header: str) -> None:
+    """Test that the linguini packet header is parsed correctly from a binary buffer."""
+    hdr = PacketHeader.from_buffer(bytes.fromhex(linguini_header))
+
+    assert hdr.callsign == "VA3INI"
+    assert len(hdr) == 24
+    assert hdr.version == 0
+    assert hdr.src_addr == 9
+    assert hdr.packet_num == 7
+
+
+def test_zeta_header_from_buffer_offset(zeta_header: str) -> None:
+    """Test that the zeta (Darwin) packet header is parsed correctly from an offset within a memoryview."""
+    hdr = PacketHeader.from_buffer(memoryview(bytes.fromhex("DEADBEEF" + zeta_header)), 4)
+
+    assert hdr.callsign == "VA3ZTA"
+    assert len(hdr) == 12
+    assert hdr.version == 8
+    assert hdr.src_addr == 6
+    assert hdr.packet_num == 1024
+
+
+def test_matches_legacy_parser(linguini_header: str, zeta_header: str) -> None:
+    """Test that the binary parser agrees with the original bin() string parser on every header field."""
+    rng = random.Random(0)
+    headers = [linguini_header, zeta_header]
+    for _ in range(500):
+        # The original parser relied on bin() dropping exactly one leading zero, so call signs start with a letter
+        suffix = "".join(rng.choices(string.ascii_uppercase + string.digits, k=5))
+        callsign = rng.choice(string.ascii_uppercase) + suffix
+        headers.append(callsign.encode("utf-8").hex() + rng.getrandbits(32).to_bytes(4, "big").hex())
+
+    for header in headers:
+        assert PacketHeader.from_hex(header) == legacy_packet_header(header)
+        assert PacketHeader.from_buffer(bytes.fromhex(header)) == legacy_packet_header(header)
+
+
+def test_header_has_slots(linguini_header: str) -> None:
+    """Test that packet headers are slotted, so that creating one per received packet stays cheap."""
+    assert not hasattr(PacketHeader.from_hex(linguini_header), "__dict__")
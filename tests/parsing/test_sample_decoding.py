@@ -0,0 +1,91 @@
+# Contains test cases comparing the NumPy and struct decoding of sensor samples
+
+import struct
+import pytest
+import modules.telemetry.data_block as data_block
+from modules.telemetry.data_block import (
+    KX134AccelerometerDataBlock,
+    KX134SampleArray,
+    MPU9250IMUDataBlock,
+    MPU9250SampleArray,
+)
+
+_ = pytest.importorskip("numpy")
+
+
+def kx134_payload(settings: int, sample_format: str, count: int) -> bytes:
+    """Returns a KX134 payload with the given settings and count samples that cover negative and positive values."""
+    size = struct.calcsize(sample_format)
+    limit = 2 ** (size // 3 * 8 - 1)
+    samples = b"".join(struct.pack(sample_format, i % limit, -(i % limit), limit - 1 - i % limit) for i in range(count))
+    return struct.pack("<IH", 1000, settings) + samples
+
+
+@pytest.fixture
+def mpu9250_payload() -> bytes:
+    """
+    Returns an MPU9250 payload with 100Hz accelerometer/gyroscope and 8Hz magnetometer sample rates, +/-4g accelerometer
+    and +/-500dps gyroscope ranges, and 12 samples mixing 14 and 16 bit magnetometer resolutions and overflow flags.
+    """
+    settings = 9 | (1 << 8) | (1 << 9) | (1 << 11)
+    samples = bytearray()
+    for i in range(12):
+        samples += struct.pack(">hhhhhhh", 100 * i, -100 * i, 16384, 321 * i, 7 * i, -7 * i, 32767)
+        samples += struct.pack("<hhhB", 50 * i, -50 * i, -32768, ((i % 2) << 4) | ((i % 3 == 0) << 3))
+    return struct.pack("<II", 1000, settings) + bytes(samples) + b"\x00"
+
+
+@pytest.mark.parametrize(
+    "settings, sample_format",
+    [
+        (7 | (1 << 4), "<bbb"),
+        (7 | (1 << 4) | (1 << 6) | (1 << 7), "<hhh"),
+    ],
+)
+def test_kx134_numpy_matches_struct(monkeypatch: pytest.MonkeyPatch, settings: int, sample_format: str) -> None:
+    """Test that KX134 samples decoded into an array equal those decoded one sample at a time."""
+    payload = kx134_payload(settings, sample_format, 40)
+
+    vectorized = KX134AccelerometerDataBlock.from_payload(payload)
+    monkeypatch.setattr(data_block, "np", None)
+    unpacked = KX134AccelerometerDataBlock.from_payload(payload)
+
+    assert isinstance(vectorized.samples, KX134SampleArray)
+    assert len(vectorized.samples) == 40
+    assert list(vectorized.samples) == unpacked.samples
+    assert vectorized.samples[39] == unpacked.samples[39]
+    assert vectorized.samples.y.tolist() == [sample[1] for sample in unpacked.samples]
+
+
+def test_mpu9250_numpy_matches_struct(monkeypatch: pytest.MonkeyPatch, mpu9250_payload: bytes) -> None:
+    """Test that MPU9250 samples decoded into columns equal those decoded one sample at a time."""
+    vectorized = MPU9250IMUDataBlock.from_payload(mpu9250_payload)
+    monkeypatch.setattr(data_block, "np", None)
+    unpacked = MPU9250IMUDataBlock.from_payload(mpu9250_payload)
+
+    assert isinstance(vectorized.samples, MPU9250SampleArray)
+    assert len(vectorized.samples) == len(unpacked.samples) == 12
+    for vectorized_sample, unpacked_sample in zip(vectorized.samples, unpacked.samples):
+        assert dict(vectorized_sample) == dict(unpacked_sample)
+    assert dict(vectorized) == pytest.approx(dict(unpacked))
+
+
+def test_empty_sample_region() -> None:
+    """Test that blocks without samples decode to empty sample containers."""
+    assert len(KX134AccelerometerDataBlock.from_payload(struct.pack("<IH", 1000, 7)).samples) == 0
+    assert len(MPU9250SampleArray.from_buffer(b"", 0, 0, 1, 1)) == 0
+    assert len(KX134SampleArray.from_buffer(b"", 0, 0, 16, 1)) == 0
+
+
+def test_mpu9250_sensor_average(monkeypatch: pytest.MonkeyPatch, mpu9250_payload: bytes) -> None:
+    """Test that the averaged sensor values are only computed when first needed, and agree for both sample types."""
+    vectorized = MPU9250IMUDataBlock.from_payload(mpu9250_payload)
+    monkeypatch.setattr(data_block, "np", None)
+    unpacked = MPU9250IMUDataBlock.from_payload(mpu9250_payload)
+
+    assert "sensor" not in vars(unpacked)
+    assert unpacked.sensor is unpacked.sensor
+    for name in ("accel_x", "temperature", "gyro_z", "mag_y"):
+        expected = sum(getattr(sample, name) for sample in unpacked.samples) / len(unpacked.samples)
+        assert getattr(unpacked.sensor, name) == pytest.approx(expected)
+        assert getattr(vectorized.sensor, name) == pytest.approx(expected)
@@ -0,0 +1,82 @@
+# Contains test cases for the binary websocket frames carrying sensor samples
+
+import struct
+import pytest
+import modules.telemetry.data_block as data_block
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import (
+    MPU9250_MEASUREMENTS,
+    AltitudeDataBlock,
+    KX134AccelerometerDataBlock,
+    MPU9250IMUDataBlock,
+)
+from modules.telemetry.sample_stream import SAMPLE_FRAME_HEADER, decode_sample_frame, encode_sample_frame
+
+# Both the NumPy and struct sample types are tested when NumPy is installed
+DECODERS = ["struct"] if data_block.np is None else ["struct", "numpy"]
+
+
+@pytest.fixture(params=DECODERS)
+def decoder(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "struct":
+        monkeypatch.setattr(data_block, "np", None)
+    return request.param
+
+
+@pytest.mark.parametrize("settings, sample_format", [(7 | (1 << 4), "<bbb"), (7 | (1 << 4) | (1 << 7), "<hhh")])
+def test_kx134_frame(decoder: str, settings: int, sample_format: str) -> None:
+    """Test that KX134 frames hold the raw readings, which the scale turns back into the decoded samples."""
+    samples = b"".join(struct.pack(sample_format, i, -i, 100) for i in range(20))
+    block = KX134AccelerometerDataBlock.from_payload(struct.pack("<IH", 1000, settings) + samples)
+
+    frame = encode_sample_frame(block)
+    assert frame is not None
+    assert frame[SAMPLE_FRAME_HEADER.size :] == samples
+    subtype, mission_time, _, rows = decode_sample_frame(frame)
+
+    assert subtype == DataBlockSubtype.KX134_1211_ACCEL
+    assert mission_time == 1000
+    assert rows == [tuple(sample) for sample in block.samples]
+
+
+def test_kx134_frame_from_raw_samples(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that KX134 frames slice the readings the block was decoded from, and only serialize built blocks."""
+    samples = b"".join(struct.pack("<hhh", i, -i, 100) for i in range(20))
+    block = KX134AccelerometerDataBlock.from_payload(struct.pack("<IH", 1000, 7 | (1 << 4) | (1 << 7)) + samples)
+    assert block.raw_samples == samples
+
+    built = KX134AccelerometerDataBlock(
+        block.mission_time, block.odr, block.accel_range, block.rolloff, block.resolution, list(block.samples)
+    )
+    assert built.raw_samples is None
+    assert encode_sample_frame(built) == encode_sample_frame(block)
+
+    def serialize(_) -> bytes:
+        raise AssertionError("decoded blocks are not serialized again")
+
+    monkeypatch.setattr(KX134AccelerometerDataBlock, "to_payload", serialize)
+    assert encode_sample_frame(block)[SAMPLE_FRAME_HEADER.size :] == samples  # type: ignore
+
+
+def test_mpu9250_frame(decoder: str) -> None:
+    """Test that MPU9250 frames hold every measurement of every sample, already scaled."""
+    settings = 9 | (1 << 8) | (1 << 9) | (1 << 11)
+    samples = b""
+    for i in range(12):
+        samples += struct.pack(">hhhhhhh", 100 * i, -100 * i, 16384, 321 * i, 7 * i, -7 * i, 32767)
+        samples += struct.pack("<hhhB", 50 * i, -50 * i, -32768, (i % 2) << 3)
+    block = MPU9250IMUDataBlock.from_payload(struct.pack("<II", 2000, settings) + samples)
+
+    frame = encode_sample_frame(block)
+    assert frame is not None
+    subtype, mission_time, scale, rows = decode_sample_frame(frame)
+
+    assert (subtype, mission_time, scale) == (DataBlockSubtype.MPU9250_IMU, 2000, 1.0)
+    assert len(rows) == 12
+    for row, sample in zip(rows, block.samples):
+        assert row == pytest.approx(MPU9250_MEASUREMENTS(sample), rel=1e-6)
+
+
+def test_unstreamed_subtype() -> None:
+    """Test that blocks without high rate samples do not produce sample frames."""
+    assert encode_sample_frame(AltitudeDataBlock(1000, 100810, 22000, 1234567)) is None
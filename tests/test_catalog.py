@@ -0,0 +1,101 @@
+# Tests the catalog of mission recordings and its sidecar cache
+
+# Imports
+import json
+from pathlib import Path
+import pytest
+import modules.telemetry.catalog as catalog
+from modules.telemetry.catalog import CATALOG_FILE, MissionCatalog
+from modules.telemetry.json_packets import MissionEntry
+from modules.telemetry.superblock import Flight, SuperBlock
+
+
+def write_mission(missions_dir: Path, name: str, epoch: int) -> Path:
+    """Writes a recording of a single, empty flight."""
+    superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=1, timestamp=epoch)])
+    path = missions_dir.joinpath(f"{name}.mission")
+    path.write_bytes(superblock.to_bytes() + bytes(512))
+    return path
+
+
+@pytest.fixture
+def reads(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Returns the names of the recordings read from disk, in the order they were read."""
+    names: list[str] = []
+    read_mission = catalog.read_mission
+
+    def counted(mission_file: Path, save_index: bool = True) -> MissionEntry | None:
+        names.append(mission_file.stem)
+        return read_mission(mission_file, save_index)
+
+    monkeypatch.setattr(catalog, "read_mission", counted)
+    return names
+
+
+def test_scan(tmp_path: Path, reads: list[str]):
+    """Test that valid recordings are listed by name, and that invalid files are skipped."""
+    write_mission(tmp_path, "Paige Cessna Flight", 1670182646)
+    write_mission(tmp_path, "Devil The Rocket", 1668434478)
+    tmp_path.joinpath("Notes.mission").write_text("Not a recording")
+
+    assert MissionCatalog(tmp_path).scan() == [
+        MissionEntry(name="Devil The Rocket", length=-1, epoch=1668434478),
+        MissionEntry(name="Paige Cessna Flight", length=-1, epoch=1670182646),
+    ]
+    assert sorted(reads) == ["Devil The Rocket", "Notes", "Paige Cessna Flight"]
+
+    sidecar = json.loads(tmp_path.joinpath(CATALOG_FILE).read_text())
+    assert sidecar["missions"]["Notes.mission"]["mission"] is None
+
+
+def test_only_changes_read(tmp_path: Path, reads: list[str]):
+    """Test that only new and changed recordings are read again, including by a catalog loaded from the sidecar."""
+    write_mission(tmp_path, "Devil The Rocket", 1668434478)
+    changed = write_mission(tmp_path, "Paige Cessna Flight", 1670182646)
+    removed = write_mission(tmp_path, "Test Flight", 1670000000)
+    tmp_path.joinpath("Notes.mission").write_text("Not a recording")
+    _ = MissionCatalog(tmp_path).scan()
+    reads.clear()
+
+    missions = MissionCatalog(tmp_path).scan()
+    assert len(missions) == 3
+    assert reads == []
+
+    with open(changed, "ab") as file:
+        _ = file.write(bytes(512))
+    removed.unlink()
+    write_mission(tmp_path, "Zephyr", 1680000000)
+
+    missions = MissionCatalog(tmp_path).scan()
+    assert [mission.name for mission in missions] == ["Devil The Rocket", "Paige Cessna Flight", "Zephyr"]
+    assert reads == ["Paige Cessna Flight", "Zephyr"]
+    assert "Test Flight.mission" not in json.loads(tmp_path.joinpath(CATALOG_FILE).read_text())["missions"]
+
+
+@pytest.mark.parametrize("sidecar", ["{", '{"version": 0, "missions": {}}', '{"version": 1}', "[]"])
+def test_unreadable_sidecar(tmp_path: Path, reads: list[str], sidecar: str):
+    """Test that a corrupt or outdated sidecar is ignored and rewritten."""
+    write_mission(tmp_path, "Devil The Rocket", 1668434478)
+    tmp_path.joinpath(CATALOG_FILE).write_text(sidecar)
+
+    assert len(MissionCatalog(tmp_path).scan()) == 1
+    assert reads == ["Devil The Rocket"]
+    assert json.loads(tmp_path.joinpath(CATALOG_FILE).read_text())["version"] == catalog.CATALOG_VERSION
+
+
+def test_update(tmp_path: Path, reads: list[str]):
+    """Test that updating the catalog only reads the named recordings, and drops the ones that were removed."""
+    write_mission(tmp_path, "Devil The Rocket", 1668434478)
+    removed = write_mission(tmp_path, "Test Flight", 1670000000)
+    mission_catalog = MissionCatalog(tmp_path)
+    _ = mission_catalog.scan()
+    reads.clear()
+
+    write_mission(tmp_path, "Paige Cessna Flight", 1670182646)
+    removed.unlink()
+    assert mission_catalog.update(["Paige Cessna Flight.mission", "Test Flight.mission", "Devil The Rocket.mission"])
+    assert reads == ["Paige Cessna Flight"]
+    assert [mission.name for mission in mission_catalog.missions()] == ["Devil The Rocket", "Paige Cessna Flight"]
+    assert MissionCatalog(tmp_path).missions() == mission_catalog.missions()
+
+    assert not mission_catalog.update(["Devil The Rocket.mission", "Never Recorded.mission"])
@@ -5,7 +5,7 @@ __author__ = "Matteo Golin"
 import pytest
 import json
 import os
-from modules.misc.config import CodingRates, Config, RadioParameters, load_config
+from modules.misc.config import CodingRates, Config, FsyncPolicy, RadioParameters, load_config
 
 
 # Fixtures
@@ -290,3 +290,47 @@ def test_load_config(config: dict[str, dict[str, str | int | bool]]):
 
     # Teardown
     os.remove("./test_config.json")
+
+
+def test_telemetry_buffer_sizes(callsigns: dict[str, str]):
+    """Tests that per subtype telemetry buffer sizes are loaded, and that invalid subtypes or sizes are rejected."""
+
+    cfg = Config.from_json({"approved_callsigns": callsigns, "telemetry_buffer_sizes": {"altitude": 20_000}})
+    assert cfg.telemetry_buffer_size == 20
+    assert cfg.telemetry_buffer_sizes == {"altitude": 20_000}
+
+    with pytest.raises(ValueError):
+        _ = Config(approved_callsigns=callsigns, telemetry_buffer_sizes={"altimeter": 100})
+
+    with pytest.raises(ValueError):
+        _ = Config(approved_callsigns=callsigns, telemetry_buffer_sizes={"altitude": 0})
+
+    with pytest.raises(ValueError):
+        _ = Config(approved_callsigns=callsigns, telemetry_buffer_size=0)
+
+
+def test_websocket_max_rate(callsigns: dict[str, str]):
+    """Tests that the websocket publish rate defaults to 30 frames per second, and must be positive."""
+
+    assert Config(approved_callsigns=callsigns).websocket_max_rate == 30.0
+    assert Config.from_json({"approved_callsigns": callsigns, "websocket_max_rate": 60}).websocket_max_rate == 60
+
+    with pytest.raises(ValueError):
+        _ = Config(approved_callsigns=callsigns, websocket_max_rate=0)
+
+
+def test_recording_fsync(callsigns: dict[str, str]):
+    """Tests that recordings are synced on an interval by default, and that the policy and interval are validated."""
+
+    cfg = Config(approved_callsigns=callsigns)
+    assert cfg.recording_fsync == FsyncPolicy.INTERVAL
+    assert cfg.recording_sync_interval == 1.0
+
+    cfg = Config.from_json({"approved_callsigns": callsigns, "recording_fsync": "block"})
+    assert cfg.recording_fsync == FsyncPolicy.BLOCK
+
+    with pytest.raises(ValueError):
+        _ = Config.from_json({"approved_callsigns": callsigns, "recording_fsync": "always"})
+
+    with pytest.raises(ValueError):
+        _ = Config(approved_callsigns=callsigns, recording_sync_interval=0)
@@ -0,0 +1,74 @@
+# Test cases for watching the missions folder for added, removed and finished recordings
+
+# Imports
+import multiprocessing as mp
+import queue
+from pathlib import Path
+import pytest
+from modules.misc.dir_watch import DirectoryWatcher, InotifyWatcher, PollingWatcher, watch_directory
+from modules.misc.queue_wait import wait_for_queues
+
+TIMEOUT: float = 5.0
+
+
+def inotify_watcher(directory: Path, suffix: str) -> DirectoryWatcher:
+    try:
+        return InotifyWatcher(directory, suffix)
+    except (OSError, AttributeError, TypeError):
+        pytest.skip("inotify is not available")
+
+
+def polling_watcher(directory: Path, suffix: str) -> DirectoryWatcher:
+    return PollingWatcher(directory, suffix, poll_interval=0.02)
+
+
+@pytest.fixture(params=[inotify_watcher, polling_watcher])
+def watcher(request: pytest.FixtureRequest, tmp_path: Path):
+    """Returns each kind of watcher on the temporary folder, watching for mission recordings."""
+    tmp_path.joinpath("Existing.mission").write_bytes(b"\x00" * 512)
+    watcher = request.param(tmp_path, ".mission")
+    yield watcher
+    watcher.close()
+
+
+def next_changes(watcher: DirectoryWatcher) -> set[str] | None:
+    """Waits for the watcher to report changes, alongside a queue as the telemetry process does."""
+    idle: queue.Queue[str] = mp.Queue()  # type: ignore
+    assert wait_for_queues([idle, watcher], timeout=TIMEOUT) == [watcher]
+    return watcher.changes()
+
+
+def test_added_and_removed(watcher: DirectoryWatcher, tmp_path: Path):
+    """Test that recordings are reported once written and once removed, and other files are ignored."""
+    tmp_path.joinpath(".catalog.json").write_text("{}")
+    with open(tmp_path.joinpath("Devil The Rocket.mission"), "wb") as file:
+        _ = file.write(b"\x00" * 1024)
+    assert next_changes(watcher) == {"Devil The Rocket.mission"}
+
+    tmp_path.joinpath("Existing.mission").unlink()
+    assert next_changes(watcher) == {"Existing.mission"}
+    assert watcher.changes() == set()
+
+
+def test_renamed(watcher: DirectoryWatcher, tmp_path: Path):
+    """Test that renaming a recording reports both its old and new name."""
+    tmp_path.joinpath("Existing.mission").rename(tmp_path.joinpath("Renamed.mission"))
+
+    changes = next_changes(watcher)
+    if changes != {"Existing.mission", "Renamed.mission"}:
+        changes |= next_changes(watcher)  # type: ignore
+    assert changes == {"Existing.mission", "Renamed.mission"}
+
+
+def test_fallback(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that the folder is polled when inotify can not be used."""
+
+    def unavailable(*_):
+        raise OSError("inotify is not available")
+
+    monkeypatch.setattr(InotifyWatcher, "__init__", unavailable)
+    watcher = watch_directory(tmp_path, ".mission")
+    try:
+        assert isinstance(watcher, PollingWatcher)
+    finally:
+        watcher.close()
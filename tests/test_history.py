@@ -0,0 +1,139 @@
+# Tests the columnar telemetry history against the list of dictionaries it replaced
+
+# Imports
+import json
+import pytest
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock, KX134AccelerometerDataBlock
+from modules.telemetry.history import BlockHistory, TelemetryHistory
+
+
+def altitude_record(mission_time: int) -> dict:
+    """Returns the websocket record of an altitude block received at the given mission time."""
+    return dict(AltitudeDataBlock(mission_time, 100810 - mission_time, 22000 + mission_time, 1234567 + mission_time))
+
+
+@pytest.mark.parametrize("count", [0, 1, 5, 6, 17])
+def test_matches_list_history(count: int):
+    """Tests that the history holds the same records in the same order as a trimmed list of dictionaries."""
+    history = BlockHistory(DataBlockSubtype.ALTITUDE, 6)
+    expected = []
+    for mission_time in range(count):
+        history.append(altitude_record(mission_time))
+        expected.append(altitude_record(mission_time))
+        if len(expected) > 6:
+            expected.pop(0)
+
+    assert len(history) == len(expected)
+    assert history.to_json() == expected
+
+
+def test_column_types():
+    """Tests that numeric fields get array columns while other fields keep their original objects."""
+    history = BlockHistory(DataBlockSubtype.KX134_1211_ACCEL, 4)
+    block = KX134AccelerometerDataBlock.from_payload(b"\xe8\x03\x00\x00\x17\x00")
+    history.append(dict(block))
+
+    assert history.to_json() == [dict(block)]
+    assert history.to_json()[0]["odr"] is block.odr
+    columns = dict(zip((key for key, _ in history.fields), history.columns))
+    assert columns["mission_time"].typecode == "q"
+    assert isinstance(columns["odr"], list)
+
+
+def test_widening():
+    """Tests that a column is widened when a field receives a value its array cannot hold."""
+    history = BlockHistory(DataBlockSubtype.ANGULAR_VELOCITY, 3)
+    records = [{"x": 1}, {"x": 2.5}, {"x": 2**70}, {"x": "fault"}]
+    for record in records:
+        history.append(record)
+
+    assert history.to_json() == records[1:]
+
+
+@pytest.mark.parametrize(
+    "records",
+    [
+        [{"x": 10**17 + 1}, {"x": 10**30}],
+        [{"x": 1}, {"x": True}, {"x": False}],
+        [{"x": 0.5}, {"x": 2}, {"x": True}],
+    ],
+    ids=["overflow", "int_bool", "float_int"],
+)
+def test_widening_keeps_values(records: list[dict]):
+    """Tests that widening a column keeps the values already stored and the type of the values stored next."""
+    history = BlockHistory(DataBlockSubtype.ANGULAR_VELOCITY, 4)
+    for record in records:
+        history.append(record)
+
+    assert isinstance(history.columns[0], list)
+    for stored, record in zip(history.to_json(), records):
+        assert stored == record
+        assert type(stored["x"]) is type(record["x"])
+    assert json.loads(history.encode(len(records))) == records
+
+
+def test_telemetry_history_depths():
+    """Tests that per subtype depths override the default depth, and that clearing drops every record."""
+    telemetry = TelemetryHistory(2, {"altitude": 5})
+    for mission_time in range(10):
+        telemetry.append(DataBlockSubtype.ALTITUDE, altitude_record(mission_time))
+        telemetry.append(DataBlockSubtype.ANGULAR_VELOCITY, {"mission_time": mission_time})
+
+    assert len(telemetry[DataBlockSubtype.ALTITUDE]) == 5
+    assert dict(telemetry)["angular_velocity"] == [{"mission_time": 8}, {"mission_time": 9}]
+    assert list(dict(telemetry)) == ["altitude", "angular_velocity"]
+
+    telemetry.clear()
+    assert len(telemetry) == 0
+    assert dict(telemetry) == {}
+
+    telemetry.append(DataBlockSubtype.ALTITUDE, altitude_record(20))
+    assert dict(telemetry) == {"altitude": [altitude_record(20)]}
+
+
+def test_invalid_depth():
+    """Tests that a history must keep at least one record."""
+    with pytest.raises(ValueError):
+        _ = BlockHistory(DataBlockSubtype.ALTITUDE, 0)
+
+
+def test_encode():
+    """Tests that the histories encode to the JSON of their dictionaries, in full or since given totals."""
+    telemetry = TelemetryHistory(4)
+    assert telemetry.encode() == "{}"
+
+    for mission_time in range(3):
+        telemetry.append(DataBlockSubtype.ALTITUDE, altitude_record(mission_time))
+    totals = telemetry.totals()
+    for mission_time in range(3, 6):
+        telemetry.append(DataBlockSubtype.ALTITUDE, altitude_record(mission_time))
+        telemetry.append(DataBlockSubtype.ANGULAR_VELOCITY, {"mission_time": mission_time, "x": 0.5})
+
+    assert json.loads(telemetry.encode()) == dict(telemetry)
+    assert json.loads(telemetry.encode(totals)) == telemetry.since(totals)
+    assert telemetry.encode(telemetry.totals()) == "{}"
+
+
+def test_encode_matches_json_dumps():
+    """Tests that records encode exactly as json.dumps encodes them, whatever their values."""
+    history = BlockHistory(DataBlockSubtype.GNSS, 3)
+    records = [
+        {"mission_time": 1, "position": {"latitude": 45.5, "longitude": -75.0}, "fix": {}, "note": "a,b%s"},
+        {"mission_time": 2, "position": {"latitude": float("nan"), "longitude": 1e-7}, "fix": {}, "note": None},
+        {"mission_time": -3, "position": {"latitude": 0.1, "longitude": float("-inf")}, "fix": {}, "note": [1]},
+    ]
+    for record in records:
+        history.append(record)
+
+    for count in range(4):
+        assert history.encode(count) == json.dumps(records[3 - count :], separators=(",", ":"))
+
+
+def test_encode_after_widening():
+    """Tests that the cached encodings of held records still match json.dumps once a column has been widened."""
+    history = BlockHistory(DataBlockSubtype.ANGULAR_VELOCITY, 4)
+    records = [{"x": 0.5, "y": 1}, {"x": 2.0, "y": 2}, {"x": 3, "y": True}, {"x": 1e300, "y": 10**30}]
+    for count, record in enumerate(records, start=1):
+        history.append(record)
+        assert history.encode(count) == json.dumps(records[:count], separators=(",", ":"))
@@ -161,8 +161,7 @@ def test_status_data_serialization() -> None:
         speed=2.5,
     )
 
-    # Mission list must be reset so that it can be tested without knowing what is
-    # in the missions directory
+    # The mission list is sent in catalog frames, so it must not appear in the status
     replay_data.mission_list = [jsp.MissionEntry(name="Devil The Rocket", length=3598549, epoch=1668434478)]
 
     status_data = jsp.StatusData(
@@ -200,7 +199,6 @@ def test_status_data_serialization() -> None:
         "replay": {
             "state": jsp.ReplayState.PAUSED.value,
             "speed": 2.5,
-            "mission_list": [{"name": "Devil The Rocket", "length": 3598549, "epoch": 1668434478}],
         },
     }
 
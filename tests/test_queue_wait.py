@@ -0,0 +1,55 @@
+# Test cases for the queue waiting utilities
+
+# Imports
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+import pytest
+from modules.misc.queue_wait import SignalWakeup, wait_for_queues
+
+
+def test_wait_returns_ready_queue() -> None:
+    """Test that waiting returns only the queues which have data available."""
+    idle: queue.Queue[str] = mp.Queue()  # type: ignore
+    busy: queue.Queue[str] = mp.Queue()  # type: ignore
+    busy.put("data")
+
+    assert wait_for_queues([idle, busy], timeout=5) == [busy]
+    assert busy.get() == "data"
+
+
+def test_wait_times_out() -> None:
+    """Test that waiting on empty queues returns an empty list once the timeout expires."""
+    idle: queue.Queue[str] = mp.Queue()  # type: ignore
+
+    start = time.monotonic()
+    assert wait_for_queues([idle], timeout=0.05) == []
+    assert time.monotonic() - start >= 0.04
+
+
+def test_wait_rejects_thread_queue() -> None:
+    """Test that queues which cannot be waited on across processes are rejected."""
+    with pytest.raises(TypeError):
+        _ = wait_for_queues([queue.Queue()], timeout=0)
+
+
+def test_wait_wakes_on_signal() -> None:
+    """Test that a signal wakes the wait so that its handler runs, even when it is sent while another thread runs."""
+    received: list[int] = []
+    previous = signal.signal(signal.SIGUSR1, lambda signum, _: received.append(signum))
+    wakeup = SignalWakeup()
+    idle: queue.Queue[str] = mp.Queue()  # type: ignore
+    try:
+        sender = threading.Thread(target=os.kill, args=(os.getpid(), signal.SIGUSR1))
+        sender.start()
+        assert wait_for_queues([idle, wakeup], timeout=5) == [wakeup]
+        sender.join()
+        wakeup.clear()
+        assert wait_for_queues([wakeup], timeout=0) == []
+    finally:
+        wakeup.close()
+        _ = signal.signal(signal.SIGUSR1, previous)
+    assert received == [signal.SIGUSR1]
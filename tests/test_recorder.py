@@ -0,0 +1,176 @@
+# Tests writing mission recordings from the background writer thread
+
+# Imports
+import json
+import multiprocessing as mp
+import os
+import struct
+from pathlib import Path
+import pytest
+import modules.telemetry.recorder as recorder
+from modules.misc.config import Config, FsyncPolicy
+from modules.misc.ring_buffer import SharedRingBuffer
+from modules.telemetry.block import DataBlockSubtype, RadioBlockType
+from modules.telemetry.catalog import read_mission
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.recorder import BLOCK_SIZE, STAGING_SIZE, MissionRecorder
+from modules.telemetry.sd_block import TelemetryDataBlock
+from modules.telemetry.superblock import SuperBlock, find_superblock
+from modules.telemetry.telemetry_utils import Telemetry
+from modules.telemetry.time_index import telemetry_times
+
+# Constants
+EPOCH: int = 1668434478
+FRAME_TIMEOUT: float = 10.0
+
+
+def altitude_block(mission_time: int) -> TelemetryDataBlock:
+    """Returns an altitude block, as written to recordings."""
+    block = AltitudeDataBlock(mission_time, pressure=100_000, temperature=22.5, altitude=120.0)  # type: ignore
+    return TelemetryDataBlock(DataBlockSubtype.ALTITUDE, data=block)
+
+
+def altitude_packet(mission_time: int) -> bytes:
+    """Returns a radio packet from VA3INI holding a single altitude block."""
+    payload = struct.pack("<Iiii", mission_time, 100_000, 22_500, 120_000)
+    block_length = 4 + len(payload)
+    header = (block_length // 4 - 1) | RadioBlockType.DATA << 6 | DataBlockSubtype.ALTITUDE << 10
+    packet_header = b"VA3INI" + struct.pack(">I", ((12 + block_length) // 4 - 1) << 26) + bytes(2)
+    return packet_header + struct.pack("<I", header) + payload
+
+
+def wait_for_status(output: mp.Queue, section: str, key: str, value: object) -> None:
+    """Reads websocket frames from the telemetry process until one sets the status field to the value."""
+    while True:
+        frame_type, message = output.get(timeout=FRAME_TIMEOUT)
+        if frame_type in ("snapshot", "delta", "reply"):
+            if json.loads(message).get("status", {}).get(section, {}).get(key) == value:
+                return
+
+
+@pytest.fixture
+def syncs(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Returns the file descriptors synced to disk by the recorder, in the order they were synced."""
+    synced: list[int] = []
+    fsync = os.fsync
+
+    def counted(fd: int) -> None:
+        synced.append(fd)
+        fsync(fd)
+
+    monkeypatch.setattr(recorder.os, "fsync", counted)
+    return synced
+
+
+def test_recording(tmp_path: Path):
+    """Test that the recorded blocks are written after the superblock, and the last block is padded with a spacer."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH)
+    blocks = b"".join(altitude_block(mission_time).to_bytes() for mission_time in range(100))
+    for mission_time in range(100):
+        # Blocks are either serialized into the staging buffer, or copied into it already encoded
+        if mission_time % 2:
+            mission_recorder.write_block(altitude_block(mission_time))
+        else:
+            mission_recorder.write(altitude_block(mission_time).to_bytes())
+    mission_recorder.close()
+
+    data = path.read_bytes()
+    num_blocks = -(-len(blocks) // BLOCK_SIZE)
+    assert len(data) == BLOCK_SIZE * (1 + num_blocks)
+    assert data[BLOCK_SIZE : BLOCK_SIZE + len(blocks)] == blocks
+
+    superblock = SuperBlock.from_bytes(data[:BLOCK_SIZE])
+    assert superblock.flights[0].first_block == 1
+    assert superblock.flights[0].num_blocks == num_blocks
+    assert superblock.flights[0].timestamp == EPOCH
+
+    mission = read_mission(path)
+    assert mission is not None
+    assert mission.epoch == EPOCH
+
+
+def test_superblock_updated_while_recording(tmp_path: Path):
+    """Test that the block count of the superblock is updated while recording, not only once it stops."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH, superblock_interval=0.0)
+    block = altitude_block(0)
+    for _ in range(BLOCK_SIZE // len(block) + 1):
+        mission_recorder.write_block(block)
+
+    mission_recorder.chunks.join()
+    superblock = SuperBlock.from_bytes(path.read_bytes()[:BLOCK_SIZE])
+    assert superblock.flights[0].num_blocks == 1
+
+    mission_recorder.close()
+    superblock = SuperBlock.from_bytes(path.read_bytes()[:BLOCK_SIZE])
+    assert superblock.flights[0].num_blocks == 2
+
+
+def test_close_without_blocks(tmp_path: Path):
+    """Test that a recording without blocks is left with only its superblock, and closing it twice does nothing."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH)
+    mission_recorder.close()
+    mission_recorder.close()
+    assert len(path.read_bytes()) == BLOCK_SIZE
+
+
+@pytest.mark.parametrize(
+    "policy, expected",
+    [(FsyncPolicy.NONE, 0), (FsyncPolicy.INTERVAL, 1), (FsyncPolicy.BLOCK, 3)],
+)
+def test_fsync_policy(tmp_path: Path, syncs: list[int], policy: FsyncPolicy, expected: int):
+    """Test how often each fsync policy syncs a recording that receives three separate blocks."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH, fsync_policy=policy, sync_interval=60.0)
+    for _ in range(3):
+        mission_recorder.write(bytes(BLOCK_SIZE))
+        mission_recorder.chunks.join()
+    mission_recorder.close()
+
+    assert len(syncs) == expected
+    assert len(path.read_bytes()) == 4 * BLOCK_SIZE
+
+
+def test_write_larger_than_staging(tmp_path: Path):
+    """Test that data larger than a staging buffer is handed to the writer across several staging buffers."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH, staging_buffers=2)
+    data = bytes(range(256)) * (3 * STAGING_SIZE // 256)
+    mission_recorder.write(data)
+    mission_recorder.close()
+
+    assert path.read_bytes()[BLOCK_SIZE:] == data
+
+
+def test_recording_closed_when_telemetry_stops(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that stopping a telemetry process while it records leaves the recording complete."""
+    monkeypatch.chdir(tmp_path)
+    commands: mp.Queue = mp.Queue()
+    output: mp.Queue = mp.Queue()
+    radio_payloads = SharedRingBuffer()
+    config = Config(approved_callsigns={"VA3INI": "linguini1"})
+    telemetry = mp.Process(
+        target=Telemetry, args=(mp.Queue(), radio_payloads, mp.Queue(), mp.Queue(), output, commands, config)
+    )
+    telemetry.start()
+    try:
+        commands.put(["record", "start", "Devil"])
+        wait_for_status(output, "mission", "recording", True)
+        for mission_time in range(100):
+            radio_payloads.put(altitude_packet(10 * mission_time))
+        wait_for_status(output, "mission", "last_mission_time", 990)
+    finally:
+        telemetry.terminate()
+        telemetry.join(FRAME_TIMEOUT)
+        radio_payloads.close()
+
+    # The superblock counts every written block, which hold every block received before the process was stopped
+    path = tmp_path.joinpath("missions", "Devil.mission")
+    address, superblock = find_superblock(path)  # type: ignore
+    (flight,) = superblock.flights
+    data = path.read_bytes()
+    assert len(data) == BLOCK_SIZE * (address + flight.first_block + flight.num_blocks)
+    start = BLOCK_SIZE * (address + flight.first_block)
+    assert [mission_time for _, mission_time in telemetry_times(data, start, len(data))] == list(range(0, 1000, 10))
@@ -0,0 +1,223 @@
+# Tests recovering mission recordings that were left with blocks past the end of their last flight
+
+# Imports
+import shutil
+from pathlib import Path
+import pytest
+import modules.telemetry.recovery as recovery
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.catalog import MissionCatalog
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.json_packets import get_last_mission_time
+from modules.telemetry.recorder import BLOCK_SIZE, MissionRecorder
+from modules.telemetry.recovery import HEADER_PADDING, backup_path, migrate_mission, recover_mission, repair_mission
+from modules.telemetry.sd_block import SD_BLOCK_HEADER, TelemetryDataBlock, sd_block_header_at
+from modules.telemetry.superblock import SuperBlock
+from modules.telemetry.time_index import INDEX_INTERVAL, index_path
+
+# Constants
+EPOCH: int = 1668434478
+NUM_BLOCKS: int = 200
+
+
+def altitude_blocks(count: int) -> bytes:
+    """Returns count encoded altitude blocks, with mission times counting up from 0 by 10 ms."""
+    return b"".join(
+        TelemetryDataBlock(
+            DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(10 * i, 100_000, 22.5, 120.0)  # type: ignore
+        ).to_bytes()
+        for i in range(count)
+    )
+
+
+@pytest.fixture
+def crashed(tmp_path: Path) -> Path:
+    """
+    Returns a recording as it was left by a crash: every whole block was written, but the superblock was never updated
+    after the recording started.
+    """
+    recording = tmp_path.joinpath("recording.mission")
+    mission_recorder = MissionRecorder(recording, EPOCH, superblock_interval=3600.0)
+    mission_recorder.write(altitude_blocks(NUM_BLOCKS))
+    mission_recorder.chunks.join()
+
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    path.write_bytes(recording.read_bytes())
+    mission_recorder.close()
+    return path
+
+
+def pad_header_lengths(data: bytearray, start: int) -> None:
+    """Gives the blocks from start the header lengths that recordings were made with before the length was fixed."""
+    offset = start
+    while offset < len(data):
+        block_class, block_subtype, block_length = sd_block_header_at(data, offset)
+        SD_BLOCK_HEADER.pack_into(data, offset, block_class | block_subtype << 6, block_length + HEADER_PADDING)
+        offset += block_length
+
+
+def read_superblock(path: Path) -> SuperBlock:
+    return SuperBlock.from_bytes(path.read_bytes()[:BLOCK_SIZE])
+
+
+def read_superblock_bytes(num_blocks: int) -> bytes:
+    """Returns the superblock of a single flight recorded at EPOCH, with the given number of blocks."""
+    superblock = SuperBlock()
+    superblock_bytes = bytearray(superblock.to_bytes())
+    superblock_bytes[0x60:0x6C] = (
+        (1).to_bytes(4, "little") + num_blocks.to_bytes(4, "little") + EPOCH.to_bytes(4, "little")
+    )
+    return bytes(superblock_bytes)
+
+
+def test_recover(crashed: Path):
+    """Test that the last flight is extended over every whole block written, and the cut off block is padded."""
+    assert read_superblock(crashed).flights == []
+    assert recover_mission(crashed)
+
+    (flight,) = read_superblock(crashed).flights
+    assert flight.num_blocks == len(altitude_blocks(NUM_BLOCKS)) // BLOCK_SIZE
+    assert flight.timestamp == EPOCH
+    with open(crashed, "rb") as file:
+        _ = file.seek(BLOCK_SIZE)
+        last_mission_time = get_last_mission_time(file, flight.num_blocks)  # type: ignore
+
+    # The last whole block ends partway through a recorded block, which is replaced by a spacer
+    assert 0 < last_mission_time < 10 * (NUM_BLOCKS - 1)
+    assert not recover_mission(crashed)
+
+
+def test_recover_from_recorded_end(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that recovery walks from the last indexed block before the recorded end, not from the flight's start."""
+    recording = tmp_path.joinpath("recording.mission")
+    mission_recorder = MissionRecorder(recording, EPOCH, superblock_interval=0.0)
+    mission_recorder.write(altitude_blocks(10 * NUM_BLOCKS))
+    mission_recorder.chunks.join()
+
+    # The copy is left as if the superblock had last been written halfway through the recording
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    shutil.copyfile(recording, path)
+    shutil.copyfile(index_path(recording), index_path(path))
+    written_blocks = mission_recorder.written_blocks
+    mission_recorder.close()
+    superblock = read_superblock(path)
+    superblock.flights[0].num_blocks = written_blocks // 2
+    with open(path, "r+b") as file:
+        _ = file.write(superblock.to_bytes())
+
+    starts: list[int] = []
+    end_of_blocks = recovery.end_of_blocks
+
+    def walked(data, start: int, end: int) -> int:
+        starts.append(start)
+        return end_of_blocks(data, start, end)
+
+    monkeypatch.setattr(recovery, "end_of_blocks", walked)
+    assert recover_mission(path)
+    assert read_superblock(path).flights[0].num_blocks == written_blocks
+
+    recorded_end = BLOCK_SIZE * (1 + written_blocks // 2)
+    (start,) = starts
+    assert recorded_end - len(altitude_blocks(INDEX_INTERVAL)) < start < recorded_end
+
+
+def test_recover_partial_block(tmp_path: Path):
+    """Test that blocks cut off partway through the last 512 bytes are left out, and the block is padded."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    blocks = altitude_blocks(30)  # 600 bytes
+    path.write_bytes(read_superblock_bytes(num_blocks=0) + blocks[:-10])
+
+    assert recover_mission(path)
+    assert read_superblock(path).flights[0].num_blocks == 2
+    data = path.read_bytes()
+    assert len(data) == 3 * BLOCK_SIZE
+    assert data[BLOCK_SIZE : BLOCK_SIZE + len(blocks) - 20] == blocks[:-20]
+
+
+def test_consistent_recordings_untouched(tmp_path: Path):
+    """Test that recordings that end with their last flight, and files that are not recordings, are left alone."""
+    recording = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(recording, EPOCH)
+    mission_recorder.write(altitude_blocks(NUM_BLOCKS))
+    mission_recorder.close()
+    notes = tmp_path.joinpath("Notes.mission")
+    notes.write_text("Not a recording" * 100)
+
+    data = recording.read_bytes()
+    assert not recover_mission(recording)
+    assert not recover_mission(notes)
+    assert not migrate_mission(recording)
+    assert not migrate_mission(notes)
+    assert recording.read_bytes() == data
+
+
+def test_migrate_old_header_lengths(tmp_path: Path):
+    """Test that recordings made with the old header lengths are rewritten as they would be recorded now."""
+    recording = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(recording, EPOCH)
+    mission_recorder.write(altitude_blocks(NUM_BLOCKS))
+    mission_recorder.close()
+    data = recording.read_bytes()
+    old = bytearray(data)
+    pad_header_lengths(old, BLOCK_SIZE)
+    recording.write_bytes(old)
+
+    assert migrate_mission(recording)
+    assert recording.read_bytes() == data
+    assert not index_path(recording).exists()
+    assert not migrate_mission(recording)
+
+
+def test_repair_keeps_backup(tmp_path: Path):
+    """Test that repairing a recording keeps a copy of it as it was, and leaves recordings that need no repair alone."""
+    recording = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(recording, EPOCH)
+    mission_recorder.write(altitude_blocks(NUM_BLOCKS))
+    mission_recorder.close()
+    data = recording.read_bytes()
+    assert not repair_mission(recording)
+    assert not backup_path(recording).exists()
+
+    old = bytearray(data)
+    pad_header_lengths(old, BLOCK_SIZE)
+    recording.write_bytes(old)
+    assert repair_mission(recording)
+    assert recording.read_bytes() == data
+    assert backup_path(recording).read_bytes() == old
+    assert [path.name for path in tmp_path.glob("*.mission")] == [recording.name]
+
+
+def test_zeroes_past_flight(tmp_path: Path):
+    """Test that blank blocks past the last flight are not mistaken for recorded blocks."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    path.write_bytes(read_superblock_bytes(num_blocks=1) + altitude_blocks(25) + bytes(12) + bytes(4 * BLOCK_SIZE))
+
+    assert not recover_mission(path)
+    assert read_superblock(path).flights[0].num_blocks == 1
+
+
+def test_catalog_flags_repairs(crashed: Path):
+    """
+    Test that the catalog flags recordings that need repairing without changing them, except for the recording being
+    written, which is not flagged.
+    """
+    data = crashed.read_bytes()
+    mission_catalog = MissionCatalog(crashed.parent)
+    mission_catalog.recording = crashed.name
+    assert [mission.name for mission in mission_catalog.scan()] == ["recording"]
+
+    mission_catalog.recording = None
+    assert mission_catalog.update([crashed.name]) is False  # The cached entry still matches the file
+    crashed.touch()
+    assert mission_catalog.update([crashed.name])
+    assert [(mission.name, mission.repair) for mission in mission_catalog.missions()] == [
+        ("Devil The Rocket", True),
+        ("recording", False),
+    ]
+    assert crashed.read_bytes() == data
+
+    assert repair_mission(crashed)
+    assert mission_catalog.update([crashed.name])
+    (mission, _) = mission_catalog.missions()
+    assert not mission.repair and mission.length > 0
+    assert mission_catalog.entries[crashed.name].matches(crashed.stat())
@@ -0,0 +1,114 @@
+# Tests seeking the replay of a mission recording with its time index
+
+# Imports
+from pathlib import Path
+from queue import Queue
+import pytest
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.recorder import BLOCK_SIZE, MissionRecorder
+from modules.telemetry.replay import REPLAY_PRE_ROLL, REPLAY_SEEK_FRAME, SEEK_TIME, TelemetryReplay, parse_replay_frame
+from modules.telemetry.sd_block import TelemetryDataBlock
+
+# Constants
+EPOCH: int = 1668434478
+NUM_BLOCKS: int = 3000  # 30 seconds of altitude blocks
+
+
+@pytest.fixture
+def replay(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> TelemetryReplay:
+    """Returns a replay of a recording of altitude blocks 10 ms apart, set up without starting to play it."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH)
+    for i in range(NUM_BLOCKS):
+        mission_recorder.write_block(
+            TelemetryDataBlock(
+                DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(10 * i, 100_000, 22.5, 120.0)  # type: ignore
+            )
+        )
+    mission_recorder.close()
+
+    monkeypatch.setattr(TelemetryReplay, "replay", lambda self: None)
+    replay = TelemetryReplay(Queue(), Queue(), 1, path)  # type: ignore
+    replay.flight_index = replay.index.flights[0]  # type: ignore
+    return replay
+
+
+def output_times(replay: TelemetryReplay) -> list[int]:
+    """Returns the mission times of the blocks the replay has output since the last call."""
+    times: list[int] = []
+    while not replay.replay_payloads.empty():
+        _, _, block_data = parse_replay_frame(replay.replay_payloads.get())
+        times.append(SEEK_TIME.unpack_from(block_data)[0])
+    return times
+
+
+def played_times(replay: TelemetryReplay, file, until: int) -> list[int]:
+    """Plays blocks until the replay outputs the mission time until, and returns the mission times output."""
+    times: list[int] = []
+    while not times or times[-1] < until:
+        replay.read_next_sd_block(file, replay.mission_sb.flights[0].num_blocks)
+        times.extend(output_times(replay))
+        if replay.finished:
+            break
+    return times
+
+
+def seek_time(replay: TelemetryReplay) -> int:
+    """Returns the mission time of the seek frame output by the replay."""
+    block_type, _, block_data = parse_replay_frame(replay.replay_payloads.get_nowait())
+    assert block_type == REPLAY_SEEK_FRAME
+    return SEEK_TIME.unpack_from(block_data)[0]
+
+
+def test_seek(replay: TelemetryReplay):
+    """Test that seeking outputs the pre-roll window up to the mission time, and playback continues from there."""
+    with open(replay.replay_path, "rb") as file:
+        _ = file.seek(BLOCK_SIZE)
+        replay.parse_input_command("seek 20000", file)
+        assert seek_time(replay) == 20000
+        assert output_times(replay) == list(range(20000 - REPLAY_PRE_ROLL, 20010, 10))
+        assert played_times(replay, file, 20050) == list(range(20010, 20060, 10))
+
+        # Skips are relative to the mission time the replay has reached
+        replay.parse_input_command("skip -12000", file)
+        mission_time = seek_time(replay)
+        assert 8000 <= mission_time < 8100
+        start = mission_time - REPLAY_PRE_ROLL
+        pre_roll = output_times(replay)
+        assert pre_roll == list(range(start + -start % 10, pre_roll[-1] + 10, 10))
+        assert pre_roll[-1] <= mission_time < pre_roll[-1] + 10
+
+
+def test_seek_while_paused(replay: TelemetryReplay):
+    """Test that seeking while paused outputs the pre-roll window straight away, and resuming carries on after it."""
+    with open(replay.replay_path, "rb") as file:
+        _ = file.seek(BLOCK_SIZE)
+        replay.parse_input_command("speed 0", file)
+        replay.parse_input_command("seek 20000", file)
+        assert seek_time(replay) == 20000
+        assert output_times(replay) == list(range(20000 - REPLAY_PRE_ROLL, 20010, 10))
+
+        replay.parse_input_command("speed 1", file)
+        assert played_times(replay, file, 20030) == [20010, 20020, 20030]
+
+
+def test_seek_to_start_and_past_end(replay: TelemetryReplay):
+    """Test that seeking before the start plays from the first block, and seeking past the end finishes the replay."""
+    with open(replay.replay_path, "rb") as file:
+        replay.seek(file, -1000)
+        assert seek_time(replay) == 0
+        assert output_times(replay) == [0]
+        assert played_times(replay, file, 100) == list(range(10, 110, 10))
+
+        replay.seek(file, 10 * NUM_BLOCKS + 60_000)
+        assert seek_time(replay) == 10 * NUM_BLOCKS + 60_000
+        assert output_times(replay) == []
+        assert played_times(replay, file, 10 * NUM_BLOCKS + 60_000) == []
+        assert replay.finished
+
+        # Seeking back after the replay finished carries on playing
+        replay.seek(file, 1000)
+        _ = seek_time(replay)
+        assert not replay.finished
+        assert output_times(replay) == list(range(0, 1010, 10))
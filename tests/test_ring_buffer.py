@@ -0,0 +1,97 @@
+# Test cases for the shared memory ring buffer
+
+# Imports
+import multiprocessing as mp
+import queue
+from multiprocessing import Process
+from typing import Generator
+import pytest
+from modules.misc.queue_wait import wait_for_queues
+from modules.misc.ring_buffer import SharedRingBuffer
+
+
+@pytest.fixture
+def ring() -> Generator[SharedRingBuffer, None, None]:
+    """A small ring buffer so that frames wrap around the end of the buffer quickly."""
+    ring = SharedRingBuffer(capacity=64)
+    yield ring
+    ring.close()
+
+
+def produce(ring: SharedRingBuffer, frames: list[bytes]) -> None:
+    for frame in frames:
+        ring.put(frame)
+
+
+def test_frames_in_order(ring: SharedRingBuffer) -> None:
+    """Test that frames come out of the buffer in the order they were put in."""
+    assert ring.empty()
+    ring.put(b"first")
+    ring.put(b"")
+    ring.put(b"third")
+
+    assert not ring.empty()
+    assert ring.get() == b"first"
+    assert ring.get() == b""
+    assert ring.get() == b"third"
+    assert ring.empty()
+
+
+def test_frames_wrap_around(ring: SharedRingBuffer) -> None:
+    """Test that frames split across the end of the buffer are read back intact."""
+    for i in range(20):
+        frame = bytes([i]) * 21
+        ring.put(frame)
+        assert ring.get() == frame
+
+
+def test_full_and_empty(ring: SharedRingBuffer) -> None:
+    """Test that the queue.Full and queue.Empty exceptions are raised like a multiprocessing queue."""
+    with pytest.raises(queue.Empty):
+        _ = ring.get(block=False)
+    with pytest.raises(queue.Empty):
+        _ = ring.get(timeout=0.01)
+
+    ring.put(bytes(40))
+    with pytest.raises(queue.Full):
+        ring.put(bytes(40), block=False)
+    with pytest.raises(ValueError):
+        ring.put(bytes(64))
+
+    ring.clear()
+    assert ring.empty()
+    ring.put(bytes(40), block=False)
+
+
+def test_wait_for_ring_buffer(ring: SharedRingBuffer) -> None:
+    """Test that the buffer can be waited on alongside multiprocessing queues."""
+    assert wait_for_queues([ring], timeout=0) == []
+
+    ring.put(b"data")
+    ring.put(b"more")
+    assert wait_for_queues([ring], timeout=5) == [ring]
+    assert ring.get() == b"data"
+    assert ring.get() == b"more"
+
+    # Stale wake-ups are cleared once the buffer has been drained
+    assert ring.empty()
+    assert wait_for_queues([ring], timeout=0) == []
+
+
+def test_frames_across_processes(ring: SharedRingBuffer) -> None:
+    """Test that frames put by another process are all received, in order, by blocking gets."""
+    frames = [i.to_bytes(2, "little") * (i % 13) for i in range(500)]
+    producer = Process(target=produce, args=(ring, frames))
+    producer.start()
+
+    assert [ring.get(timeout=5) for _ in frames] == frames
+    producer.join()
+
+
+def test_spawned_process_shares_memory(ring: SharedRingBuffer) -> None:
+    """Test that a buffer pickled for a spawned process attaches to the same shared memory."""
+    producer = mp.get_context("spawn").Process(target=produce, args=(ring, [b"shared"]))
+    producer.start()
+
+    assert ring.get(timeout=30) == b"shared"
+    producer.join()
@@ -0,0 +1,118 @@
+# Tests the sparse time index of mission files, as written while recording and as built for existing files
+
+# Imports
+from pathlib import Path
+import pytest
+import modules.telemetry.time_index as time_index
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.catalog import read_mission
+from modules.telemetry.data_block import AltitudeDataBlock
+from modules.telemetry.recorder import BLOCK_SIZE, MissionRecorder
+from modules.telemetry.replay import parse_sd_block_header
+from modules.telemetry.sd_block import TelemetryDataBlock
+from modules.telemetry.superblock import find_superblock
+from modules.telemetry.time_index import INDEX_INTERVAL, TimeIndex, get_time_index, index_path, load_index
+
+# Constants
+EPOCH: int = 1668434478
+NUM_BLOCKS: int = 1000
+
+
+def altitude_block(mission_time: int) -> TelemetryDataBlock:
+    return TelemetryDataBlock(
+        DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(mission_time, 100_000, 22.5, 120.0)  # type: ignore
+    )
+
+
+@pytest.fixture
+def recording(tmp_path: Path) -> Path:
+    """Returns a recording of altitude blocks, with mission times counting up from 5 ms by 10 ms."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH)
+    for i in range(NUM_BLOCKS):
+        mission_recorder.write_block(altitude_block(5 + 10 * i))
+    mission_recorder.close()
+    return path
+
+
+def block_time(path: Path, offset: int) -> int:
+    """Returns the mission time of the telemetry block at the offset in the file."""
+    data = path.read_bytes()
+    _, _, length = parse_sd_block_header(data[offset : offset + 4])
+    return AltitudeDataBlock.from_payload(data[offset + 4 : offset + length]).mission_time
+
+
+def test_recorded_index(recording: Path):
+    """Test that the index written while recording is up to date once the recording is closed."""
+    address, superblock = find_superblock(recording)  # type: ignore
+    index = load_index(recording, address, superblock)
+    assert index is not None
+
+    (flight,) = index.flights
+    assert (flight.min_time, flight.max_time) == (5, 5 + 10 * (NUM_BLOCKS - 1))
+    assert index.mission_length == 10 * NUM_BLOCKS - 6
+    assert len(flight.times) == -(-NUM_BLOCKS // INDEX_INTERVAL)
+    assert all(block_time(recording, offset) == time for time, offset in zip(flight.times, flight.offsets))
+
+
+def test_built_index_matches_recorded(recording: Path):
+    """Test that indexing a recording from scratch gives the index written while it was recorded."""
+    recorded = index_path(recording).read_bytes()
+    index_path(recording).unlink()
+
+    assert get_time_index(recording) == TimeIndex.from_bytes(recorded)
+    assert index_path(recording).read_bytes() == recorded
+
+
+def test_seek(recording: Path):
+    """Test that seeking finds the last indexed block at or before the mission time."""
+    (flight,) = get_time_index(recording).flights  # type: ignore
+
+    assert flight.seek(0) == BLOCK_SIZE  # Before the first block
+    assert flight.seek(5) == BLOCK_SIZE
+    for mission_time in (5 + 10 * INDEX_INTERVAL, 3333, 10 * NUM_BLOCKS - 5):
+        offset = flight.seek(mission_time)
+        assert mission_time - 10 * INDEX_INTERVAL < block_time(recording, offset) <= mission_time
+    assert flight.seek(10 * NUM_BLOCKS + 1000) == flight.offsets[-1]  # Past the last block
+
+
+def test_outdated_index(recording: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that indexes of another length of flight, or that cannot be read, are built again."""
+    builds: list[Path] = []
+    build_index = time_index.build_index
+
+    def counted(mission_file: Path, *args) -> TimeIndex:
+        builds.append(mission_file)
+        return build_index(mission_file, *args)
+
+    monkeypatch.setattr(time_index, "build_index", counted)
+    assert read_mission(recording).length == 10 * NUM_BLOCKS - 6  # type: ignore
+    assert builds == []
+
+    index = TimeIndex.from_bytes(index_path(recording).read_bytes())
+    index.flights[0].num_blocks -= 1
+    index_path(recording).write_bytes(index.to_bytes())
+    assert read_mission(recording).length == 10 * NUM_BLOCKS - 6  # type: ignore
+    index_path(recording).write_bytes(b"CUInIndx")
+    assert read_mission(recording).length == 10 * NUM_BLOCKS - 6  # type: ignore
+    assert builds == [recording, recording]
+
+    # The rebuilt index was saved
+    assert read_mission(recording).length == 10 * NUM_BLOCKS - 6  # type: ignore
+    assert len(builds) == 2
+
+
+def test_index_during_recording(tmp_path: Path):
+    """Test that the index of a recording only holds entries for the blocks covered by its superblock."""
+    path = tmp_path.joinpath("Devil The Rocket.mission")
+    mission_recorder = MissionRecorder(path, EPOCH, superblock_interval=0.0)
+    for i in range(NUM_BLOCKS):
+        mission_recorder.write_block(altitude_block(5 + 10 * i))
+    mission_recorder.chunks.join()
+
+    index = TimeIndex.from_bytes(index_path(path).read_bytes())
+    (flight,) = index.flights
+    assert flight.num_blocks == mission_recorder.written_blocks
+    assert flight.offsets[-1] < BLOCK_SIZE * (1 + flight.num_blocks)
+    assert read_mission(path, save_index=False).length > 0  # type: ignore
+    mission_recorder.close()
@@ -78,6 +78,33 @@ def test_update_command() -> None:
     assert parsed_command == cmd.WebsocketCommand.UPDATE
 
 
+def test_resync_command() -> None:
+    """Test parsing the resync websocket command."""
+
+    parsed_command, parameters = command_parser("resync")
+
+    assert parameters == []
+    assert parsed_command == cmd.WebsocketCommand.RESYNC
+
+
+def test_samples_command() -> None:
+    """Test parsing the command that turns binary sample frames on."""
+
+    parsed_command, parameters = command_parser("samples on")
+
+    assert parsed_command == cmd.WebsocketCommand.SAMPLES
+    assert parameters == ["on"]
+
+
+def test_catalog_command() -> None:
+    """Test parsing the command that requests a page of the mission catalog."""
+
+    parsed_command, parameters = command_parser("catalog 2 20")
+
+    assert parsed_command == cmd.WebsocketCommand.CATALOG
+    assert parameters == ["2", "20"]
+
+
 def test_start_recording_command() -> None:
     """Tests the start recording command."""
 
@@ -148,3 +175,21 @@ def test_replay_speed_command() -> None:
 
     assert parsed_command == cmd.WebsocketCommand.REPLAY.value.SPEED
     assert parameters == ["2"]
+
+
+def test_replay_seek_command() -> None:
+    """Tests the replay seek command to a mission time."""
+
+    parsed_command, parameters = command_parser("replay seek 12000")
+
+    assert parsed_command == cmd.WebsocketCommand.REPLAY.value.SEEK
+    assert parameters == ["12000"]
+
+
+def test_replay_skip_command() -> None:
+    """Tests the replay skip command, backwards by a number of milliseconds."""
+
+    parsed_command, parameters = command_parser("replay skip -5000")
+
+    assert parsed_command == cmd.WebsocketCommand.REPLAY.value.SKIP
+    assert parameters == ["-5000"]
@@ -0,0 +1,80 @@
+# Tests compressing websocket frames once for every client that negotiated permessage-deflate
+
+# Imports
+import json
+import zlib
+import pytest
+from tornado.httputil import HTTPHeaders
+from modules.websocket.compression import DEFLATE_TAIL, deflate, offer_shared_deflate
+from modules.websocket.subscription import FrameEncodings, parse_subscription
+
+
+def inflate(decompressor, message: bytes) -> bytes:
+    """Decompresses a permessage-deflate message the way a client does (RFC 7692 section 7.2.2)."""
+    return decompressor.decompress(message + DEFLATE_TAIL)
+
+
+@pytest.mark.parametrize(
+    "offer, rewritten, accepted",
+    [
+        (
+            "permessage-deflate; client_max_window_bits",
+            "permessage-deflate; client_max_window_bits; server_no_context_takeover",
+            True,
+        ),
+        ("permessage-deflate; server_no_context_takeover", "permessage-deflate; server_no_context_takeover", True),
+        (
+            "permessage-deflate; server_max_window_bits=15",
+            "permessage-deflate; server_max_window_bits=15; server_no_context_takeover",
+            True,
+        ),
+        ("permessage-deflate; server_max_window_bits=10, x-webkit-deflate-frame", "x-webkit-deflate-frame", False),
+    ],
+)
+def test_offer_shared_deflate(offer: str, rewritten: str, accepted: bool):
+    """Test that offers are accepted without server context takeover, unless they limit the server window."""
+    headers = HTTPHeaders({"Sec-WebSocket-Extensions": offer})
+    assert offer_shared_deflate(headers) == accepted
+    assert headers["Sec-WebSocket-Extensions"] == rewritten
+
+
+def test_no_offer():
+    """Test that requests without extensions are left without extensions."""
+    headers = HTTPHeaders()
+    assert not offer_shared_deflate(headers)
+    assert "Sec-WebSocket-Extensions" not in headers
+
+    headers = HTTPHeaders({"Sec-WebSocket-Extensions": "permessage-deflate; server_max_window_bits=9"})
+    assert not offer_shared_deflate(headers)
+    assert "Sec-WebSocket-Extensions" not in headers
+
+
+def test_deflate_context_takeover():
+    """Test that messages compressed separately decompress on a client that keeps its context between messages."""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    messages = [json.dumps({"seq": seq, "telemetry": {"altitude": [{"metres": 1234}] * seq}}) for seq in range(20)]
+
+    for message in messages:
+        compressed = deflate(message)
+        assert not compressed.endswith(DEFLATE_TAIL)
+        assert inflate(decompressor, compressed) == message.encode("utf-8")
+
+
+def test_compressed_once():
+    """Test that a frame is compressed once for every subscription of the clients that negotiated compression."""
+    message = json.dumps({"type": "delta", "seq": 1, "status": {}, "telemetry": {"altitude": [{"mission_time": 1}]}})
+    encodings = FrameEncodings(message)
+    subscription = parse_subscription("websocket subscribe status")
+
+    compressed = encodings.get(None, compress=True)
+    assert encodings.get(None, compress=True) is compressed
+    assert encodings.get(None) is message
+    assert inflate(zlib.decompressobj(-zlib.MAX_WBITS), compressed) == message.encode("utf-8")
+
+    filtered = encodings.get(subscription, compress=True)
+    assert encodings.get(parse_subscription("websocket subscribe status"), compress=True) is filtered
+    assert len(encodings.compressed) == 2
+    assert json.loads(inflate(zlib.decompressobj(-zlib.MAX_WBITS), filtered))["telemetry"] == {}
+
+    # Frames a subscription does not receive are not compressed either
+    assert FrameEncodings(b"\x03" + bytes(15)).get(subscription, compress=True) is None
@@ -0,0 +1,390 @@
+# Tests the snapshot and delta frames the telemetry process sends to the websocket
+
+# Imports
+import json
+import math
+import multiprocessing as mp
+import signal
+import struct
+import sys
+import time
+from pathlib import Path
+from queue import Queue
+from typing import Iterator
+import pytest
+import modules.telemetry.json_packets as jsp
+from modules.misc.config import Config
+from modules.misc.ring_buffer import SharedRingBuffer
+from modules.telemetry.block import DataBlockSubtype, RadioBlockType
+from modules.telemetry.catalog import MissionCatalog
+from modules.telemetry.superblock import Flight, SuperBlock
+from modules.telemetry.data_block import AltitudeDataBlock, KX134AccelerometerDataBlock
+from modules.telemetry.replay import REPLAY_FRAME_HEADER, REPLAY_SEEK_FRAME, SEEK_TIME
+from modules.telemetry.sample_stream import decode_sample_frame
+from modules.telemetry.sd_block import LoggingMetadataSpacerBlock, TelemetryDataBlock
+from modules.telemetry import telemetry_utils
+from modules.telemetry.telemetry_utils import Telemetry, changed_fields
+from modules.websocket.commands import WebsocketCommand
+
+
+def start_telemetry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, config: Config) -> Iterator[Telemetry]:
+    """
+    Builds a telemetry object through its constructor, without running its loop. Mission recordings are listed from an
+    empty missions folder in tmp_path, so that the status does not depend on the missions directory.
+    """
+    monkeypatch.setattr(telemetry_utils, "signal", lambda *_: None)
+    monkeypatch.setattr(Telemetry, "run", lambda self: None)
+    monkeypatch.chdir(tmp_path)
+
+    radio_payloads = SharedRingBuffer()
+    telemetry = Telemetry(Queue(), radio_payloads, Queue(), Queue(), Queue(), Queue(), config)
+    try:
+        yield telemetry
+    finally:
+        telemetry.signal_wakeup.close()
+        telemetry.mission_watcher.close()
+        telemetry.replay_output.close()
+        radio_payloads.close()
+
+
+@pytest.fixture
+def telemetry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Telemetry]:
+    """
+    Returns a started telemetry object, without a rate limit and with a history depth of 3, once it has sent its first
+    snapshot.
+    """
+    config = Config(approved_callsigns={"VA3INI": "linguini1"}, telemetry_buffer_size=3, websocket_max_rate=math.inf)
+    for telemetry in start_telemetry(tmp_path, monkeypatch, config):
+        (snapshot,) = sent_frames(telemetry)
+        assert (snapshot["type"], snapshot["seq"]) == ("snapshot", 1)
+        yield telemetry
+
+
+def sent_frames(telemetry: Telemetry) -> list[dict]:
+    """Returns the decoded frames the telemetry object has put on its JSON output queue."""
+    frames = []
+    while not telemetry.telemetry_json_output.empty():
+        frame_type, message, *_ = telemetry.telemetry_json_output.get()
+        frame = json.loads(message)
+        assert frame["type"] == frame_type or (frame["type"], frame_type) in (
+            ("delta", "reply"),
+            ("catalog", "page"),
+            ("snapshot", "resync"),
+        )
+        frames.append(frame)
+    return frames
+
+
+def test_initial_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that a newly started telemetry process publishes a snapshot before it starts processing its queues."""
+    for telemetry in start_telemetry(tmp_path, monkeypatch, Config(approved_callsigns={"VA3INI": "linguini1"})):
+        frame_type, message = telemetry.telemetry_json_output.get_nowait()
+        assert frame_type == "snapshot"
+        assert json.loads(message)["seq"] == 1
+        assert json.loads(message)["status"]["replay"] == {"state": jsp.ReplayState.DNE, "speed": 1.0}
+        assert telemetry.publish_timeout() is None
+        assert telemetry.missions_dir == tmp_path.joinpath("missions")
+
+
+def test_changed_fields():
+    """Test that only the status fields that differ are reported, grouped by section."""
+    previous = {"mission": {"name": "", "epoch": -1}, "serial": {"available_ports": ["COM1"]}}
+    current = {"mission": {"name": "Devil", "epoch": -1}, "serial": {"available_ports": ["COM1"]}}
+
+    assert changed_fields(previous, current) == {"mission": {"name": "Devil"}}
+    assert changed_fields({}, current) == current
+    assert changed_fields(current, current) == {}
+
+
+def test_snapshot_then_deltas(telemetry: Telemetry):
+    """Test that a snapshot is followed by deltas holding only new entries, with increasing sequence numbers."""
+    telemetry.telemetry.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(1000, 100810, 22000, 1234567)))
+    telemetry.snapshot_pending = True  # As after a reset
+    telemetry.update_websocket()
+    telemetry.update_websocket()  # Nothing changed, so nothing is sent
+
+    telemetry.status.mission.last_mission_time = 1050
+    new_entry = dict(AltitudeDataBlock(1050, 100800, 22000, 1234600))
+    telemetry.telemetry.append(DataBlockSubtype.ALTITUDE, new_entry)
+    telemetry.update_websocket()
+
+    snapshot, delta = sent_frames(telemetry)
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["seq"] == 2
+    assert snapshot["status"]["mission"]["last_mission_time"] == -1
+    assert len(snapshot["telemetry"]["altitude"]) == 1
+
+    assert delta == {
+        "type": "delta",
+        "seq": 3,
+        "status": {"mission": {"last_mission_time": 1050}},
+        "telemetry": {"altitude": [new_entry]},
+    }
+
+
+def test_resync_and_reset(telemetry: Telemetry):
+    """Test that a reset makes the next frame a full snapshot for every client."""
+    telemetry.update_websocket()  # Nothing changed since the first snapshot, so nothing is sent
+    telemetry.status.mission.name = "Devil"
+    telemetry.reset_data()
+    telemetry.update_websocket()
+    telemetry.reset_data()
+    telemetry.update_websocket()
+
+    assert [(frame["type"], frame["seq"]) for frame in sent_frames(telemetry)] == [("snapshot", 2), ("snapshot", 3)]
+
+
+def test_resync_command(telemetry: Telemetry):
+    """
+    Test that a resync sends the changes held back by the rate limit first, then a snapshot that keeps the sequence
+    number of the last frame, so that clients already in sync are not sent it.
+    """
+    telemetry.publish_interval = 3600
+    telemetry.telemetry.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(1000, 100810, 22000, 1234567)))
+    telemetry.update_websocket()
+    telemetry.execute_command(WebsocketCommand.RESYNC, [])
+
+    frame_types = [frame_type for frame_type, _ in list(telemetry.telemetry_json_output.queue)]
+    reply, snapshot = sent_frames(telemetry)
+    assert frame_types == ["reply", "resync"]
+    assert (reply["seq"], snapshot["seq"]) == (2, 2)
+    assert snapshot["telemetry"] == dict(telemetry.telemetry)
+
+    # Without changes, only the snapshot is sent, and the next delta carries on from the sequence number
+    telemetry.execute_command(WebsocketCommand.RESYNC, [])
+    telemetry.status.mission.name = "Devil"
+    telemetry.update_websocket(immediate=True)
+    assert [(frame["type"], frame["seq"]) for frame in sent_frames(telemetry)] == [("snapshot", 2), ("delta", 3)]
+
+
+def test_delta_after_overflow(telemetry: Telemetry):
+    """Test that a delta holds at most the history depth when more entries arrived than the history keeps."""
+    telemetry.update_websocket()
+    for mission_time in range(5):
+        telemetry.telemetry.append(DataBlockSubtype.ANGULAR_VELOCITY, {"mission_time": mission_time})
+    telemetry.update_websocket()
+
+    (delta,) = sent_frames(telemetry)
+    assert delta["telemetry"] == {"angular_velocity": [{"mission_time": 2}, {"mission_time": 3}, {"mission_time": 4}]}
+
+
+def test_rate_limited_updates(telemetry: Telemetry):
+    """Test that updates within the publish interval are coalesced into one frame, unless they must be immediate."""
+    telemetry.publish_interval = 3600  # The first snapshot was just published
+
+    for mission_time in range(10):
+        telemetry.telemetry.append(DataBlockSubtype.ANGULAR_VELOCITY, {"mission_time": mission_time})
+        telemetry.update_websocket()
+    assert sent_frames(telemetry) == []
+    assert telemetry.publish_timeout() == pytest.approx(3600, abs=5)
+
+    telemetry.update_websocket(immediate=True)  # A command acknowledgement flushes everything held back
+    assert telemetry.telemetry_json_output.queue[0][0] == "reply"
+    (delta,) = sent_frames(telemetry)
+    assert [entry["mission_time"] for entry in delta["telemetry"]["angular_velocity"]] == [7, 8, 9]
+    assert telemetry.publish_timeout() is None
+    assert telemetry.frame_counters.stats() == {"updates": 12, "frames": 2}  # Counting the first snapshot
+
+
+def test_held_back_changes_published(telemetry: Telemetry):
+    """Test that changes held back by the rate limit are published once the interval has passed."""
+    telemetry.publish_interval = 3600  # The first snapshot was just published
+    telemetry.status.mission.last_mission_time = 500
+    telemetry.update_websocket()
+    telemetry.publish_websocket()
+    assert sent_frames(telemetry) == []
+
+    telemetry.last_publish -= 3600  # As if the interval had passed
+    assert telemetry.publish_timeout() == 0.0
+    telemetry.publish_websocket()
+    assert sent_frames(telemetry)[0]["status"] == {"mission": {"last_mission_time": 500}}
+
+
+def test_snapshot_matches_dictionaries(telemetry: Telemetry):
+    """Test that the snapshot joined from cached encodings decodes to the dictionaries it replaced."""
+    for mission_time in range(5):
+        telemetry.telemetry.append(DataBlockSubtype.ALTITUDE, dict(AltitudeDataBlock(mission_time, 100810, 22000, 5)))
+    telemetry.snapshot_pending = True  # As after a reset
+    telemetry.update_websocket()
+
+    (snapshot,) = sent_frames(telemetry)
+    assert snapshot == {
+        "type": "snapshot",
+        "seq": 2,
+        "version": "0.5.0-DEV",
+        "org": "CUInSpace",
+        "status": json.loads(json.dumps(dict(telemetry.status))),
+        "telemetry": dict(telemetry.telemetry),
+    }
+
+
+def test_sample_frames(telemetry: Telemetry):
+    """Test that binary sample frames are only queued while streaming samples is turned on."""
+    block = KX134AccelerometerDataBlock.from_payload(struct.pack("<IH", 1000, 7 | (1 << 7)) + b"\x01\x00" * 30)
+    telemetry.parse_data_block(block)
+    assert telemetry.telemetry_json_output.empty()
+
+    telemetry.stream_samples = True
+    telemetry.parse_data_block(block)
+    frame_type, frame = telemetry.telemetry_json_output.get()
+    assert frame_type == "samples"
+    assert decode_sample_frame(frame)[0] == DataBlockSubtype.KX134_1211_ACCEL
+
+
+def test_catalog(telemetry: Telemetry):
+    """
+    Test that the mission catalog is sent in pages to the client that asks for them, and not as part of the status.
+    """
+    missions = [jsp.MissionEntry(name=f"Flight {index}", length=1000 * index, epoch=1668434478) for index in range(7)]
+    telemetry.status.replay.mission_list = missions
+    telemetry.sent_catalog = missions
+    telemetry.execute_command(WebsocketCommand.CATALOG, ["4", "2", "3"])
+
+    # The status did not change, so the acknowledgement is empty and not sent
+    frame_type, message, client = telemetry.telemetry_json_output.get_nowait()
+    assert (frame_type, client) == ("page", 4)
+    assert telemetry.telemetry_json_output.empty()
+    assert json.loads(message) == {
+        "type": "catalog",
+        "page": 2,
+        "pages": 3,
+        "page_size": 3,
+        "total": 7,
+        "missions": [{"name": "Flight 6", "length": 6000, "epoch": 1668434478, "repair": False}],
+    }
+    assert "mission_list" not in telemetry.sent_status["replay"]
+
+    # Pages that can not exist, or that no client asked for, are not sent
+    telemetry.execute_command(WebsocketCommand.CATALOG, ["4", "-1"])
+    telemetry.execute_command(WebsocketCommand.CATALOG, ["4", "first"])
+    telemetry.execute_command(WebsocketCommand.CATALOG, [])
+    assert sent_frames(telemetry) == []
+
+
+def test_catalog_changes(telemetry: Telemetry):
+    """Test that the first page of the catalog is sent whenever the mission recordings change."""
+    telemetry.sent_catalog = [jsp.MissionEntry(name="Deleted Flight")]
+    telemetry.execute_command(WebsocketCommand.UPDATE, [])  # Lists the recordings of an empty folder
+
+    frames = sent_frames(telemetry)
+    assert frames[-1] == {"type": "catalog", "page": 0, "pages": 1, "page_size": 50, "total": 0, "missions": []}
+
+    telemetry.execute_command(WebsocketCommand.UPDATE, [])
+    assert all(frame["type"] != "catalog" for frame in sent_frames(telemetry))
+
+
+def test_reset_keeps_catalog(telemetry: Telemetry, monkeypatch: pytest.MonkeyPatch):
+    """Test that resetting the live data keeps the mission recordings without reading the missions folder again."""
+    missions = [jsp.MissionEntry(name="Devil The Rocket", length=3598549, epoch=1668434478)]
+    telemetry.status.replay.mission_list = missions
+    telemetry.sent_catalog = missions
+    telemetry.status.replay.speed = 2.0
+    monkeypatch.setattr(MissionCatalog, "scan", lambda self: pytest.fail("The missions folder was scanned"))
+
+    telemetry.reset_data()
+    assert telemetry.status.replay.mission_list == missions
+    assert telemetry.status.replay.speed == 1.0
+    assert telemetry.telemetry_json_output.empty()
+
+
+def test_watched_missions(telemetry: Telemetry):
+    """Test that recordings reported by the missions folder watcher update the catalog sent to clients."""
+    missions_dir = telemetry.missions_dir
+    superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=1, timestamp=1668434478)])
+    missions_dir.joinpath("Devil The Rocket.mission").write_bytes(superblock.to_bytes() + bytes(512))
+
+    telemetry.update_missions({"Devil The Rocket.mission"})
+    (catalog,) = sent_frames(telemetry)
+    assert catalog["missions"] == [{"name": "Devil The Rocket", "length": -1, "epoch": 1668434478, "repair": False}]
+    assert telemetry.status.replay.mission_files_list == [missions_dir.joinpath("Devil The Rocket.mission")]
+
+    # Changes that leave the catalog as it was are not sent
+    telemetry.update_missions({"Devil The Rocket.mission"})
+    missions_dir.joinpath("Devil The Rocket.mission").unlink()
+    telemetry.update_missions(None)
+    (catalog,) = sent_frames(telemetry)
+    assert catalog["missions"] == []
+
+
+def test_repair_command(telemetry: Telemetry):
+    """Test that recordings flagged by the catalog are only repaired when a client asks, and are backed up first."""
+    blocks = b"".join(
+        TelemetryDataBlock(DataBlockSubtype.ALTITUDE, data=AltitudeDataBlock(10 * i, 100810, 22000, 1234567)).to_bytes()
+        for i in range(50)
+    )
+    superblock = SuperBlock(flights=[Flight(first_block=1, num_blocks=1, timestamp=1668434478)])
+    crashed = superblock.to_bytes() + blocks + LoggingMetadataSpacerBlock(2 * 512 - len(blocks)).to_bytes()
+    mission_file = telemetry.missions_dir.joinpath("Devil The Rocket.mission")
+    mission_file.write_bytes(crashed)
+
+    telemetry.update_missions(None)
+    (catalog,) = sent_frames(telemetry)
+    assert [mission["repair"] for mission in catalog["missions"]] == [True]
+    assert mission_file.read_bytes() == crashed
+
+    telemetry.execute_command(WebsocketCommand.REPAIR, ["Devil", "The", "Rocket"])
+    (catalog,) = sent_frames(telemetry)
+    assert [(mission["repair"], mission["length"]) for mission in catalog["missions"]] == [(False, 489)]
+    assert SuperBlock.from_bytes(mission_file.read_bytes()[:512]).flights[0].num_blocks == 2
+    assert mission_file.with_name("Devil The Rocket.mission.bak").read_bytes() == crashed
+
+
+def test_replay_seek(telemetry: Telemetry):
+    """Test that the history is dropped when the replay reports a seek, and is rebuilt from the blocks that follow."""
+    telemetry.replay = object()  # type: ignore
+    telemetry.replay_input = Queue()
+    telemetry.status.mission.state = jsp.MissionState.RECORDED
+
+    def altitude_frame(mission_time: int) -> bytes:
+        block = AltitudeDataBlock(mission_time, 100810, 22000, 1234567)
+        return REPLAY_FRAME_HEADER.pack(RadioBlockType.DATA, DataBlockSubtype.ALTITUDE) + block.to_payload()
+
+    for mission_time in (1000, 1050):
+        telemetry.parse_replay_output(altitude_frame(mission_time))
+    telemetry.update_websocket()
+    telemetry.execute_command(WebsocketCommand.REPLAY.value.SKIP, ["-5000"])
+    telemetry.execute_command(WebsocketCommand.REPLAY.value.SEEK, ["apogee"])  # Not a mission time, so not sent
+    assert telemetry.replay_input.get_nowait() == "skip -5000"
+    assert telemetry.replay_input.empty()
+
+    telemetry.parse_replay_output(REPLAY_FRAME_HEADER.pack(REPLAY_SEEK_FRAME, 0) + SEEK_TIME.pack(400))
+    telemetry.parse_replay_output(altitude_frame(400))
+    telemetry.update_websocket()
+
+    snapshot = sent_frames(telemetry)[-1]
+    assert snapshot["type"] == "snapshot"
+    assert snapshot["status"]["mission"]["last_mission_time"] == 400
+    assert [entry["mission_time"] for entry in snapshot["telemetry"]["altitude"]] == [400]
+
+
+def late_replay(replay_output: SharedRingBuffer, stop_delay: float | None) -> None:
+    """
+    Stands in for a replay that outputs one more frame stop_delay seconds after it is asked to stop, or that ignores
+    being asked to stop if stop_delay is None.
+    """
+
+    def stop(*_) -> None:
+        if stop_delay is not None:
+            time.sleep(stop_delay)
+            replay_output.put(b"late")
+            sys.exit()
+
+    _ = signal.signal(signal.SIGTERM, stop)
+    replay_output.put(b"started")
+    while True:
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("stop_delay", [0.2, None], ids=["late", "stuck"])
+def test_stop_replay(telemetry: Telemetry, monkeypatch: pytest.MonkeyPatch, stop_delay: float | None):
+    """Test that the replay output is only cleared once the replay process has exited, killing it if it must."""
+    monkeypatch.setattr(telemetry_utils, "REPLAY_STOP_TIMEOUT", 0.5)
+    replay = mp.Process(target=late_replay, args=(telemetry.replay_output, stop_delay))
+    replay.start()
+    telemetry.replay = replay
+    assert telemetry.replay_output.get(timeout=5.0) == b"started"
+
+    telemetry.stop_replay()
+    assert replay.exitcode is not None
+    assert telemetry.replay is None
+    assert telemetry.replay_output.empty()
@@ -0,0 +1,83 @@
+# Tests the bounded outbox of frames waiting to be written to a websocket client
+
+# Imports
+from modules.websocket.outbox import ClientOutbox
+
+
+def queued(outbox: ClientOutbox) -> list[tuple[str, str | bytes]]:
+    """Returns the type and message of every queued frame, oldest first."""
+    return [(frame.frame_type, frame.message) for frame in outbox.frames]
+
+
+def test_within_limits():
+    """Tests that frames are delivered in order while the outbox is within its limits."""
+    outbox = ClientOutbox(max_frames=4)
+    assert outbox.put("delta", "1")
+    assert outbox.put("samples", b"\x00" * 16)
+    assert outbox.put("reply", "2")
+
+    assert outbox.get().message == "1"
+    assert queued(outbox) == [("samples", b"\x00" * 16), ("reply", "2")]
+    assert outbox.stats()["sent"] == 1
+    assert outbox.queued_bytes == 17
+
+
+def test_snapshot_supersedes():
+    """Tests that a snapshot replaces the queued snapshots, deltas and replies, but not sample frames."""
+    outbox = ClientOutbox()
+    for message in ("snapshot 1", "delta 2", "reply 3", "delta 4"):
+        _ = outbox.put(message.split()[0], message)
+    _ = outbox.put("samples", b"\x01")
+    _ = outbox.put("snapshot", "snapshot 5")
+
+    assert queued(outbox) == [("samples", b"\x01"), ("snapshot", "snapshot 5")]
+    assert outbox.dropped == 4
+
+
+def test_samples_dropped_first():
+    """Tests that the oldest sample frames are dropped first when the outbox is full."""
+    outbox = ClientOutbox(max_frames=3)
+    for index in range(3):
+        assert outbox.put("samples", bytes([index]))
+    assert outbox.put("delta", "delta")
+
+    assert queued(outbox) == [("samples", b"\x01"), ("samples", b"\x02"), ("delta", "delta")]
+    assert outbox.dropped == 1
+
+
+def test_overflow_resync():
+    """
+    Tests that deltas and the replies numbered along with them are dropped and a resync requested once dropping sample
+    frames is not enough.
+    """
+    outbox = ClientOutbox(max_frames=10, max_bytes=100)
+    assert outbox.put("catalog", "c" * 20)
+    assert outbox.put("reply", "r" * 40)
+    assert outbox.put("delta", "d" * 30)
+    assert not outbox.put("delta", "d" * 30)
+
+    assert queued(outbox) == [("catalog", "c" * 20)]
+    assert outbox.stats()["resyncs"] == 1
+    assert outbox.queued_bytes == 20
+
+    # Replies are kept past the limits until a snapshot is queued
+    assert outbox.put("reply", "r" * 100)
+    assert outbox.put("reply", "r" * 100)
+    assert len(outbox) == 3
+    assert outbox.lag() >= 0.0
+
+
+def test_resync_without_gaps():
+    """Tests that no reply is left queued ahead of the snapshot a client is resynced with, skipping seq numbers."""
+    outbox = ClientOutbox(max_frames=4)
+    resynced = True
+    for seq in range(1, 7):
+        resynced &= outbox.put("reply" if seq == 3 else "delta", f"{seq}")
+    assert not resynced
+
+    # The server then queues the snapshot it resyncs the client with, and the frames that followed it
+    for frame_type, seq in (("snapshot", 5), ("delta", 6), ("reply", 7)):
+        assert outbox.put(frame_type, f"{seq}")
+    seqs = [int(frame.message) for frame in outbox.frames]
+    assert seqs == list(range(seqs[0], seqs[0] + len(seqs)))
+    assert outbox.frames[0].frame_type == "snapshot"
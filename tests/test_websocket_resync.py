@@ -0,0 +1,199 @@
+# Tests the frames the websocket process sends to single clients: resyncs from the snapshot it keeps, catalog pages,
+# and frames compressed beforehand. Also tests the stats it reports about them
+
+# Imports
+import asyncio
+import json
+import multiprocessing as mp
+from itertools import count
+from queue import Queue
+import pytest
+import tornado.httpclient
+import tornado.httpserver
+import tornado.web
+import tornado.websocket
+from tornado.testing import bind_unused_port
+import modules.websocket.compression as compression
+import modules.websocket.websocket as websocket
+from modules.misc.frame_counters import FrameCounters
+from modules.websocket.compression import PrecompressedDeflate
+from modules.websocket.websocket import TornadoWSServer, WebsocketStatsHandler
+
+# Constants
+TIMEOUT: float = 5.0
+
+
+def frame(frame_type: str, seq: int) -> tuple[str, str]:
+    """Returns a telemetry frame, as queued by the telemetry process."""
+    json_type = {"resync": "snapshot", "reply": "delta"}.get(frame_type, frame_type)
+    return frame_type, json.dumps({"type": json_type, "seq": seq, "status": {}, "telemetry": {}})
+
+
+@pytest.fixture
+def commands(monkeypatch: pytest.MonkeyPatch) -> Queue:
+    """Returns the queue of commands the websocket process sends, with the server state of a new process."""
+    queue: Queue = Queue()
+    monkeypatch.setattr(websocket, "ws_commands_queue", queue, raising=False)
+    monkeypatch.setattr(websocket, "MAX_KEPT_FRAMES", 2)
+    for name in ("clients", "synced_clients", "sample_clients"):
+        monkeypatch.setattr(TornadoWSServer, name, set())
+    monkeypatch.setattr(TornadoWSServer, "clients_by_id", {})
+    monkeypatch.setattr(TornadoWSServer, "client_ids", count(1))
+    monkeypatch.setattr(TornadoWSServer, "snapshot", None)
+    monkeypatch.setattr(TornadoWSServer, "kept_frames", [])
+    monkeypatch.setattr(TornadoWSServer, "snapshot_requested", False)
+    return queue
+
+
+def sent_commands(commands: Queue) -> list[str]:
+    return [commands.get_nowait() for _ in range(commands.qsize())]
+
+
+async def received(client: tornado.websocket.WebSocketClientConnection, number: int) -> list[tuple[str, int]]:
+    """Returns the type and sequence number of the next number frames the client receives."""
+    frames: list[tuple[str, int]] = []
+    for _ in range(number):
+        message = await asyncio.wait_for(client.read_message(), TIMEOUT)
+        assert isinstance(message, str)
+        frames.append((json.loads(message)["type"], json.loads(message)["seq"]))
+    return frames
+
+
+def start_server(frame_counters: FrameCounters | None = None) -> tuple[tornado.httpserver.HTTPServer, str]:
+    """Starts a websocket server on an unused port, and returns it with the URL clients connect to."""
+    sock, port = bind_unused_port()
+    routes = [
+        (r"/websocket", TornadoWSServer),
+        (r"/websocket/stats", WebsocketStatsHandler, {"frame_counters": frame_counters or FrameCounters()}),
+    ]
+    server = tornado.httpserver.HTTPServer(tornado.web.Application(routes))  # type: ignore
+    server.add_sockets([sock])
+    return server, f"ws://127.0.0.1:{port}/websocket"
+
+
+async def resync_clients(commands: Queue) -> None:
+    server, url = start_server()
+
+    # The first client waits for the first snapshot, which telemetry sends to every client
+    first = await tornado.websocket.websocket_connect(url)
+    await asyncio.sleep(0.1)
+    assert sent_commands(commands) == ["telemetry resync", "telemetry catalog 1"]
+    TornadoWSServer.send_frames([frame("snapshot", 1), frame("delta", 2)])
+    assert await received(first, 2) == [("snapshot", 1), ("delta", 2)]
+
+    # Clients that connect or ask to resync are sent the kept frames, without telemetry or the other clients
+    second = await tornado.websocket.websocket_connect(url)
+    assert await received(second, 2) == [("snapshot", 1), ("delta", 2)]
+    await second.write_message("telemetry resync")
+    assert await received(second, 2) == [("snapshot", 1), ("delta", 2)]
+    TornadoWSServer.send_frames([frame("reply", 3)])
+    assert await received(first, 1) == await received(second, 1) == [("delta", 3)]
+    assert sent_commands(commands) == ["telemetry catalog 2"]
+
+    # Once too many frames followed the snapshot, telemetry is asked for a new one for the waiting client only
+    TornadoWSServer.send_frames([frame("delta", 4)])
+    await second.write_message("telemetry resync")
+    await asyncio.sleep(0.1)
+    assert sent_commands(commands) == ["telemetry resync"]
+    TornadoWSServer.send_frames([frame("delta", 5), frame("resync", 5), frame("delta", 6)])
+    assert await received(first, 3) == [("delta", 4), ("delta", 5), ("delta", 6)]
+    assert await received(second, 3) == [("delta", 4), ("snapshot", 5), ("delta", 6)]
+
+    first.close()
+    second.close()
+    server.stop()
+
+
+def test_resync_single_client(commands: Queue):
+    """Test that clients are resynced from the kept snapshot and frames, and only ask telemetry once they run out."""
+    asyncio.run(resync_clients(commands))
+
+
+def catalog(page: int) -> str:
+    return json.dumps({"type": "catalog", "page": page, "pages": 3, "page_size": 1, "total": 3, "missions": []})
+
+
+async def catalog_pages(commands: Queue) -> None:
+    server, url = start_server()
+    first = await tornado.websocket.websocket_connect(url)
+    second = await tornado.websocket.websocket_connect(url)
+    await asyncio.sleep(0.1)
+    assert sent_commands(commands) == ["telemetry resync", "telemetry catalog 1", "telemetry catalog 2"]
+
+    # Pages go to the client that asked for them, and changes to the catalog go to every client
+    await second.write_message("telemetry catalog 2 1")
+    await asyncio.sleep(0.1)
+    assert sent_commands(commands) == ["telemetry catalog 2 2 1"]
+    TornadoWSServer.send_frames([("page", catalog(2), 2), ("page", catalog(0), 3), ("catalog", catalog(0))])
+    first_pages = [json.loads(await asyncio.wait_for(first.read_message(), TIMEOUT))["page"]]  # type: ignore
+    second_pages = [json.loads(await asyncio.wait_for(second.read_message(), TIMEOUT))["page"] for _ in range(2)]
+    assert (first_pages, second_pages) == ([0], [2, 0])
+
+    first.close()
+    second.close()
+    server.stop()
+
+
+def test_catalog_pages(commands: Queue):
+    """Test that catalog pages are only sent to the client that asked for them."""
+    asyncio.run(catalog_pages(commands))
+
+
+async def compressed_frames(shared: bool) -> None:
+    server, url = start_server()
+    client = await tornado.websocket.websocket_connect(url, compression_options={})
+    await asyncio.sleep(0.1)
+    TornadoWSServer.send_frames([frame("snapshot", 1), frame("delta", 2)])
+    assert await received(client, 2) == [("snapshot", 1), ("delta", 2)]
+
+    (connection,) = TornadoWSServer.clients
+    assert connection.deflate == shared
+    # Fails once Tornado no longer compresses messages with the compressor that is replaced to send precompressed ones
+    assert isinstance(connection.ws_connection._compressor, PrecompressedDeflate) == shared  # type: ignore
+
+    client.close()
+    server.stop()
+
+
+@pytest.mark.parametrize("shared", [True, False], ids=["shared", "fallback"])
+def test_compressed_frames(commands: Queue, monkeypatch: pytest.MonkeyPatch, shared: bool):
+    """
+    Test that clients that negotiated compression receive frames compressed once for every client, or compressed by
+    Tornado on versions whose compressor is not replaced.
+    """
+    assert compression.SHARED_DEFLATE  # The installed Tornado must be one the compressor is replaced on
+    monkeypatch.setattr(compression, "SHARED_DEFLATE", shared)
+    asyncio.run(compressed_frames(shared))
+
+
+def count_frames(frame_counters: FrameCounters) -> None:
+    frame_counters.updates += 40
+    frame_counters.frames += 3
+
+
+async def stats(commands: Queue) -> None:
+    frame_counters = FrameCounters()
+    server, url = start_server(frame_counters)
+    client = await tornado.websocket.websocket_connect(url)
+    await asyncio.sleep(0.1)
+    TornadoWSServer.send_frames([frame("snapshot", 1), frame("delta", 2)])
+    assert await received(client, 2) == [("snapshot", 1), ("delta", 2)]
+
+    # The counters are written by the telemetry process
+    process = mp.Process(target=count_frames, args=(frame_counters,))
+    process.start()
+    process.join(TIMEOUT)
+
+    response = await tornado.httpclient.AsyncHTTPClient().fetch(url.replace("ws://", "http://") + "/stats")
+    reported = json.loads(response.body)
+    assert reported["telemetry"] == {"updates": 40, "frames": 3}
+    (client_stats,) = reported["clients"]
+    assert (client_stats["sent"], client_stats["dropped"]) == (2, 0)
+
+    client.close()
+    server.stop()
+
+
+def test_stats(commands: Queue):
+    """Test that the stats report the updates and frames counted by telemetry, and the frames sent to each client."""
+    asyncio.run(stats(commands))
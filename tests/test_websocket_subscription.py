@@ -0,0 +1,98 @@
+# Tests filtering the websocket frames down to the subscription of each client
+
+# Imports
+import json
+import pytest
+from modules.telemetry.block import DataBlockSubtype
+from modules.telemetry.sample_stream import SAMPLE_FRAME_HEADER
+from modules.websocket.subscription import (
+    FrameEncodings,
+    InvalidSubscriptionError,
+    Subscription,
+    parse_subscription,
+)
+
+ALTITUDE = {
+    "mission_time": 1000,
+    "pressure": {"pascals": 100810, "psi": 14.62},
+    "altitude": {"metres": 1234, "feet": 4050},
+    "temperature": {"celsius": 22, "fahrenheit": 71},
+}
+FRAME = {
+    "type": "delta",
+    "seq": 7,
+    "status": {"mission": {"last_mission_time": 1000}, "rocket": {"deployment_state": 1}},
+    "telemetry": {"altitude": [ALTITUDE, ALTITUDE], "angular_velocity": [{"mission_time": 1000, "x": 1}]},
+}
+
+
+def test_parse_subscription():
+    """Test that selections are grouped into whole status sections, whole subtypes and subtype fields."""
+    subscription = parse_subscription("websocket subscribe status.rocket altitude.altitude mpu9250_imu")
+    assert subscription == Subscription(
+        status=frozenset({"rocket"}),
+        telemetry=frozenset({"mpu9250_imu"}),
+        fields=frozenset({("altitude", frozenset({"mission_time", "altitude"}))}),
+    )
+
+    # The status data block records are selected along with the status sections
+    subscription = parse_subscription("websocket subscribe status")
+    assert subscription.status == {"mission", "serial", "rn2483_radio", "rocket", "replay"}
+    assert subscription.telemetry == {"status"}
+    assert parse_subscription("websocket subscribe status.kx134_state").fields == {
+        ("status", frozenset({"mission_time", "kx134_state"}))
+    }
+    assert parse_subscription("websocket subscribe altitude.altitude altitude") == parse_subscription(
+        "websocket subscribe altitude"
+    )
+    assert parse_subscription("websocket subscribe") is None
+
+
+@pytest.mark.parametrize("selection", ["gps", "rocket", "telemetry"])
+def test_invalid_subscription(selection: str):
+    """Test that selecting members that frames never contain is rejected."""
+    with pytest.raises(InvalidSubscriptionError):
+        _ = parse_subscription(f"websocket subscribe {selection}")
+
+
+def test_filter_frame():
+    """Test that frames keep their type and sequence number, and only the subscribed sections, subtypes and fields."""
+    subscription = parse_subscription("websocket subscribe status.mission altitude.altitude")
+    assert subscription is not None
+
+    assert subscription.filter(FRAME) == {
+        "type": "delta",
+        "seq": 7,
+        "status": {"mission": {"last_mission_time": 1000}},
+        "telemetry": {"altitude": [{"mission_time": 1000, "altitude": {"metres": 1234, "feet": 4050}}] * 2},
+    }
+    assert subscription.filter({"type": "delta", "seq": 8}) == {"type": "delta", "seq": 8}
+
+
+def test_shared_encodings():
+    """Test that a frame is encoded once per distinct subscription, and passed through for unsubscribed clients."""
+    message = json.dumps(FRAME)
+    encodings = FrameEncodings(message)
+    first = parse_subscription("websocket subscribe angular_velocity")
+    second = parse_subscription("websocket subscribe angular_velocity")
+
+    assert encodings.get(None) is message
+    encoded = encodings.get(first)
+    assert encodings.get(second) is encoded
+    assert len(encodings.encodings) == 1
+    assert json.loads(encoded) == {
+        "type": "delta",
+        "seq": 7,
+        "status": {},
+        "telemetry": {"angular_velocity": [{"mission_time": 1000, "x": 1}]},
+    }
+
+
+def test_sample_frames():
+    """Test that binary sample frames are only sent to clients subscribed to their subtype, and never re-encoded."""
+    frame = SAMPLE_FRAME_HEADER.pack(DataBlockSubtype.MPU9250_IMU, 2, 1, 1000, 1, 1.0) + b"\x00\x00\x80\x3f"
+    encodings = FrameEncodings(frame)
+
+    assert encodings.get(parse_subscription("websocket subscribe mpu9250_imu")) is frame
+    assert encodings.get(parse_subscription("websocket subscribe mpu9250_imu.accel")) is frame
+    assert encodings.get(parse_subscription("websocket subscribe altitude")) is None